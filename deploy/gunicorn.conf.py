@@ -0,0 +1,37 @@
+"""
+gunicorn settings for the Pi, used by gunicorn.service.
+
+The app is loaded and warmed up once in the master before the workers are
+forked, so they share its memory and the first requests after a reboot are
+as fast as the rest.
+"""
+
+bind = "unix:/run/gunicorn.sock"
+workers = 3
+# Long enough to write a season's export the first time /export is asked for,
+# nginx sends the file itself after that, see SURVEY_EXPORT_ACCEL
+timeout = 300
+accesslog = "-"
+preload_app = True
+
+
+def when_ready(server):
+    # Runs in the master after the app is loaded, before any worker is forked
+    from survey import warmup
+
+    server.log.info("Warmed up in %.2fs", warmup.warm_up())
+
+
+def post_worker_init(worker):
+    # gunicorn has just reset the worker's signals, let SIGUSR2 toggle profiling
+    from survey import metrics, middleware
+
+    middleware.install_signal()
+    metrics.start()
+
+
+def child_exit(server, worker):
+    # Runs in the master, a new worker given the same pid starts from zero
+    from survey import metrics
+
+    metrics.remove(worker.pid)
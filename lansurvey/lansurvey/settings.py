@@ -12,6 +12,8 @@ https://docs.djangoproject.com/en/5.0/ref/settings/
 
 import logging
 import os
+import socket
+import tempfile
 from pathlib import Path
 
 logger = logging.getLogger(__name__)
@@ -49,6 +51,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "survey.middleware.ProfilingMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -90,7 +93,13 @@ DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": BASE_DIR / "db.sqlite3",
-    }
+    },
+    # Read only, the live responses and the archived seasons, see survey.archive
+    "all_seasons": {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": BASE_DIR / "db.sqlite3",
+        "TEST": {"MIRROR": "default"},
+    },
 }
 
 
@@ -136,3 +145,54 @@ STATICFILES_DIRS = (os.path.join(str(BASE_DIR), "static"),)
 # https://docs.djangoproject.com/en/5.0/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
+
+# Sessions and messages
+# Respondents are anonymous and only need the paged survey draft and the
+# "submitted" message, so both live in signed cookies instead of django_session
+# rows in the same SQLite file as the responses. SURVEY_DB_SESSIONS=1 goes back
+# to database sessions.
+SURVEY_DB_SESSIONS = os.environ.get("SURVEY_DB_SESSIONS", "") not in ("", "0")
+if not SURVEY_DB_SESSIONS:
+    SESSION_ENGINE = "django.contrib.sessions.backends.signed_cookies"
+MESSAGE_STORAGE = "django.contrib.messages.storage.cookie.CookieStorage"
+
+# Survey
+# Seconds each worker buffers autosaved drafts before writing them
+SURVEY_AUTOSAVE_INTERVAL = float(os.environ.get("SURVEY_AUTOSAVE_INTERVAL", 2))
+# Seconds after its last change that a draft is still given back to the browser,
+# after that a shared tablet starts the next respondent on a new, blank draft
+SURVEY_DRAFT_IDLE = float(os.environ.get("SURVEY_DRAFT_IDLE", 300))
+
+# ZIP code index built by build_zip_index, geocoding is skipped without it
+SURVEY_ZIP_INDEX = os.environ.get("SURVEY_ZIP_INDEX", BASE_DIR / "data" / "zipcodes.idx")
+
+# Each process writes its metrics here, /metrics adds them up
+SURVEY_METRICS_DIR = os.environ.get(
+    "SURVEY_METRICS_DIR", os.path.join(tempfile.gettempdir(), "lansurvey-metrics")
+)
+
+# Name of this Pi in merged data, see merge_responses and export_delta
+SURVEY_DEVICE = os.environ.get("SURVEY_DEVICE", socket.gethostname())
+
+# Past seasons moved out of the live tables by archive_responses
+SURVEY_ARCHIVE = os.environ.get("SURVEY_ARCHIVE", BASE_DIR / "archive.sqlite3")
+
+# Token for downloading the export from /export, the endpoint is off without it
+SURVEY_EXPORT_TOKEN = os.environ.get("SURVEY_EXPORT_TOKEN", "")
+
+# /export writes each export here once and serves the downloads from the file
+SURVEY_EXPORT_DIR = os.environ.get(
+    "SURVEY_EXPORT_DIR", os.path.join(tempfile.gettempdir(), "lansurvey-exports")
+)
+# nginx location serving SURVEY_EXPORT_DIR, /export hands the download over to
+# nginx with X-Accel-Redirect instead of sending it from a worker, see deploy/survey
+SURVEY_EXPORT_ACCEL = os.environ.get("SURVEY_EXPORT_ACCEL", "")
+
+# Sampling profiler, off unless SURVEY_PROFILE is set or a worker gets SIGUSR2
+SURVEY_PROFILE = os.environ.get("SURVEY_PROFILE", "") not in ("", "0")
+SURVEY_PROFILE_RATE = float(os.environ.get("SURVEY_PROFILE_RATE", 0.1))
+SURVEY_PROFILE_INTERVAL = float(os.environ.get("SURVEY_PROFILE_INTERVAL", 0.005))
+SURVEY_PROFILE_PATHS = ("/park/survey",)
+SURVEY_PROFILE_DIR = os.environ.get(
+    "SURVEY_PROFILE_DIR", os.path.join(tempfile.gettempdir(), "lansurvey-profiles")
+)
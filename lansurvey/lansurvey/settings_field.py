@@ -0,0 +1,48 @@
+"""
+Lean settings for serving the survey on the Pi.
+
+Only loads what the survey pages need: no admin, auth or contenttypes, one
+crispy template pack and a shorter middleware stack. Each gunicorn worker
+boots faster and uses less memory. Management commands like migrate and
+collectstatic still use lansurvey.settings.
+
+Use it with DJANGO_SETTINGS_MODULE=lansurvey.settings_field, see
+deploy/gunicorn.service. Compare the two with
+python3 manage.py importtime_report --compare lansurvey.settings_field
+"""
+
+from .settings import *  # noqa: F401,F403
+from .settings import INSTALLED_APPS, MIDDLEWARE, SURVEY_DB_SESSIONS, TEMPLATES
+
+# Signed cookie sessions don't need the sessions app, database ones do
+unused_apps = (
+    "django.contrib.admin",
+    "django.contrib.auth",
+    "django.contrib.contenttypes",
+    "crispy_bootstrap4",
+    *(() if SURVEY_DB_SESSIONS else ("django.contrib.sessions",)),
+)
+
+INSTALLED_APPS = [app for app in INSTALLED_APPS if app not in unused_apps]
+
+MIDDLEWARE = [
+    middleware
+    for middleware in MIDDLEWARE
+    if middleware != "django.contrib.auth.middleware.AuthenticationMiddleware"
+]
+
+TEMPLATES = [
+    {
+        **TEMPLATES[0],
+        "OPTIONS": {
+            **TEMPLATES[0]["OPTIONS"],
+            "context_processors": [
+                "django.template.context_processors.request",
+                "django.contrib.messages.context_processors.messages",
+            ],
+        },
+    },
+]
+
+# Respondents never log in. Sessions follow SURVEY_DB_SESSIONS like settings.py.
+AUTH_PASSWORD_VALIDATORS = []
@@ -0,0 +1,186 @@
+// Autosave of unfinished survey answers.
+// Only the questions that changed since the last save are sent, a short while
+// after the respondent stops clicking. See survey/drafts.py for the server side.
+(function () {
+    "use strict";
+
+    var DEBOUNCE_MS = 1500;
+    var STORAGE_KEY = "survey-draft-token";
+
+    var form = document.querySelector("form[data-autosave-url]");
+    if (!form || !window.fetch) {
+        return;
+    }
+    var url = form.dataset.autosaveUrl;
+    var csrf = form.querySelector("[name='csrfmiddlewaretoken']");
+
+    function newToken() {
+        if (window.crypto && window.crypto.randomUUID) {
+            return window.crypto.randomUUID();
+        }
+        return Date.now().toString(36) + Math.random().toString(36).slice(2);
+    }
+
+    var token = form.dataset.draftToken || window.localStorage.getItem(STORAGE_KEY) || newToken();
+    window.localStorage.setItem(STORAGE_KEY, token);
+
+    var hidden = document.createElement("input");
+    hidden.type = "hidden";
+    hidden.name = "draft_token";
+    hidden.value = token;
+    form.appendChild(hidden);
+
+    function questionNames() {
+        var names = {};
+        Array.prototype.forEach.call(form.elements, function (el) {
+            if (/^q\d/.test(el.name)) {
+                names[el.name] = true;
+            }
+        });
+        return Object.keys(names);
+    }
+
+    function read(name) {
+        var elements = form.querySelectorAll("[name='" + name + "']");
+        var first = elements[0];
+        if (first.type === "checkbox") {
+            return Array.prototype.filter.call(elements, function (el) {
+                return el.checked;
+            }).map(function (el) {
+                return el.value;
+            });
+        }
+        if (first.type === "radio") {
+            var checked = Array.prototype.find.call(elements, function (el) {
+                return el.checked;
+            });
+            return checked ? checked.value : "";
+        }
+        return first.value;
+    }
+
+    function write(name, value) {
+        var elements = form.querySelectorAll("[name='" + name + "']");
+        elements.forEach(function (el) {
+            if (el.type === "checkbox") {
+                el.checked = Array.isArray(value) && value.indexOf(el.value) !== -1;
+            } else if (el.type === "radio") {
+                el.checked = el.value === value;
+            } else {
+                el.value = value;
+            }
+        });
+    }
+
+    function isEmpty(value) {
+        return value === "" || (Array.isArray(value) && !value.length);
+    }
+
+    var names = questionNames();
+    var sent = {};
+
+    function snapshot() {
+        names.forEach(function (name) {
+            sent[name] = JSON.stringify(read(name));
+        });
+    }
+
+    function changes() {
+        var delta = {};
+        names.forEach(function (name) {
+            var value = read(name);
+            var serialized = JSON.stringify(value);
+            if (serialized !== sent[name]) {
+                delta[name] = value;
+            }
+        });
+        return delta;
+    }
+
+    // Set once the server has said which draft this page continues
+    var loaded = false;
+
+    function save() {
+        if (!loaded) {
+            schedule();
+            return;
+        }
+        var delta = changes();
+        var keys = Object.keys(delta);
+        if (!keys.length) {
+            return;
+        }
+        keys.forEach(function (name) {
+            sent[name] = JSON.stringify(delta[name]);
+        });
+        fetch(url, {
+            method: "POST",
+            keepalive: true,
+            headers: {
+                "Content-Type": "application/json",
+                "X-CSRFToken": csrf ? csrf.value : "",
+            },
+            body: JSON.stringify({ token: token, changes: delta }),
+        }).catch(function () {
+            // Try again with the next change
+            keys.forEach(function (name) {
+                delete sent[name];
+            });
+        });
+    }
+
+    var timeout = null;
+    function schedule() {
+        window.clearTimeout(timeout);
+        timeout = window.setTimeout(save, DEBOUNCE_MS);
+    }
+
+    // Fill in answers from an interrupted session, without touching the ones already given
+    function restore(data) {
+        names.forEach(function (name) {
+            if (name in data && isEmpty(read(name))) {
+                write(name, data[name]);
+            }
+        });
+        form.dispatchEvent(new Event("change"));
+    }
+
+    snapshot();
+    fetch(url + "?token=" + encodeURIComponent(token))
+        .then(function (response) {
+            return response.ok ? response.json() : { data: {} };
+        })
+        .then(function (payload) {
+            if (payload.token && payload.token !== token) {
+                // The stored draft was submitted or left alone too long, on a
+                // shared tablet it's someone else's, so start a new one
+                token = payload.token;
+                hidden.value = token;
+                window.localStorage.setItem(STORAGE_KEY, token);
+            }
+            restore(payload.data || {});
+            snapshot();
+            loaded = true;
+        })
+        .catch(function () {
+            loaded = true;
+        });
+
+    form.addEventListener("input", schedule);
+    form.addEventListener("change", schedule);
+    document.addEventListener("visibilitychange", function () {
+        if (document.visibilityState === "hidden") {
+            save();
+        }
+    });
+    form.addEventListener("submit", function () {
+        window.clearTimeout(timeout);
+        if (form.dataset.final !== undefined) {
+            // The next respondent gets a new draft, the server sends the token
+            // back if the answers need fixing
+            window.localStorage.removeItem(STORAGE_KEY);
+        } else {
+            save();
+        }
+    });
+})();
@@ -0,0 +1,2 @@
+// Generated by `python3 manage.py build_survey_rules`, do not edit.
+window.SURVEY_RULES = {"fields":{"q1":{"kind":"radio","choices":["1","2","3","4","5","6"]},"q2":{"kind":"radio","choices":["M","F","N","P"]},"q3":{"kind":"radio","choices":["Y","N"]},"q4":{"kind":"checkbox","choices":["AA","A","B","N","W","T"]},"q5":{"kind":"radio","choices":["1","2","3","4","5","6","7","8","9","10"]},"q6":{"kind":"radio","choices":["1","2","3","4","5","6","7","8"]},"q7":{"kind":"integer","min":0,"max":9999},"q8":{"kind":"radio","choices":["Y","N"]},"q9":{"kind":"text"},"q10_1":{"kind":"text"},"q10_2":{"kind":"integer","min":0,"max":99999},"q11_1":{"kind":"radio","choices":["1","2","3"]},"q11_2":{"kind":"radio","choices":["1","2","3"]},"q11_3":{"kind":"radio","choices":["1","2","3"]},"q11_4":{"kind":"radio","choices":["1","2","3"]},"q11_5":{"kind":"radio","choices":["1","2","3"]},"q11_6":{"kind":"radio","choices":["1","2","3"]},"q11_7":{"kind":"radio","choices":["1","2","3"]},"q11_8":{"kind":"radio","choices":["1","2","3"]},"q11_9":{"kind":"radio","choices":["1","2","3"]},"q11_10":{"kind":"radio","choices":["1","2","3"]},"q11_11":{"kind":"radio","choices":["1","2","3"]},"q12":{"kind":"checkbox","choices":["A","B","C","CR","Z","G","R","M","RB","NB","GC","BE","H","GS","CB","MV","FC","LV","SL","P","D","PS","OTHER"]},"q12_23_text":{"kind":"text"},"q13":{"kind":"integer","min":0,"max":9999},"q14":{"kind":"integer","min":0,"max":9999},"q15":{"kind":"integer","min":0,"max":9999},"q16":{"kind":"checkbox","choices":["K","F","FR","A","S","T","P"]},"q17_1":{"kind":"radio","choices":["1","2","3","4","5"]},"q17_2":{"kind":"radio","choices":["1","2","3","4","5"]},"q17_3":{"kind":"radio","choices":["1","2","3","4","5"]},"q17_4":{"kind":"radio","choices":["1","2","3","4","5"]},"q17_5":{"kind":"radio","choices":["1","2","3","4","5"]},"q17_6":{"kind":"radio","choices":["1","2","3","4","5"]},"q17_7":{"kind":"radio","choices":["1","2","3","4","5"]},"q17_8":{"kind":"radio","choices":["1","2","3","4","5"]},"q17_9":{"kind":"radio","choices":["1","2","3","4","5"]},"q17_10":{"kind":"radio","choices":["1","2","3","4","5"]},"q17_11":{"kind":"radio","choices":["1","2","3","4","5"]},"q17_12":{"kind":"radio","choices":["1","2","3","4","5"]},"q17_13":{"kind":"radio","choices":["1","2","3","4","5"]},"q18_1":{"kind":"radio","choices":["1","2","3","4","5"]},"q18_2":{"kind":"radio","choices":["1","2","3","4","5"]},"q18_3":{"kind":"radio","choices":["1","2","3","4","5"]},"q18_4":{"kind":"radio","choices":["1","2","3","4","5"]},"q18_5":{"kind":"radio","choices":["1","2","3","4","5"]},"q18_6":{"kind":"radio","choices":["1","2","3","4","5"]},"q18_7":{"kind":"radio","choices":["1","2","3","4","5"]},"q18_8":{"kind":"radio","choices":["1","2","3","4","5"]},"q18_9":{"kind":"radio","choices":["1","2","3","4","5"]},"q18_10":{"kind":"radio","choices":["1","2","3","4","5"]},"q18_11":{"kind":"radio","choices":["1","2","3","4","5"]},"q18_12":{"kind":"radio","choices":["1","2","3","4","5"]},"q18_13":{"kind":"radio","choices":["1","2","3","4","5"]},"q19":{"kind":"checkbox","choices":["PV","RC","RV","BS","AP","OTHER"]},"q19_6_text":{"kind":"text"},"q20":{"kind":"radio","choices":["SLC","SGU","LAS","DEN","PHX","CNY","OGD","PVU","CDC","O"]},"q20_10_text":{"kind":"text"},"q21_1":{"kind":"integer","min":0,"max":9999},"q21_2":{"kind":"integer","min":0,"max":9999},"q21_3":{"kind":"integer","min":0,"max":9999},"q21_4":{"kind":"integer","min":0,"max":9999},"q21_5":{"kind":"integer","min":0,"max":9999},"q21_6":{"kind":"integer","min":0,"max":9999},"q21_7":{"kind":"integer","min":0,"max":9999},"q21_8":{"kind":"integer","min":0,"max":9999},"q22_1_1":{"kind":"radio","choices":["1","2","3","4"]},"q22_2_1":{"kind":"radio","choices":["1","2","3","4","5"]},"q22_1_2":{"kind":"radio","choices":["1","2","3","4"]},"q22_2_2":{"kind":"radio","choices":["1","2","3","4","5"]},"q22_1_3":{"kind":"radio","choices":["1","2","3","4"]},"q22_2_3":{"kind":"radio","choices":["1","2","3","4","5"]},"q22_1_4":{"kind":"radio","choices":["1","2","3","4"]},"q22_2_4":{"kind":"radio","choices":["1","2","3","4","5"]},"q22_1_5":{"kind":"radio","choices":["1","2","3","4"]},"q22_2_5":{"kind":"radio","choices":["1","2","3","4","5"]},"q22_1_6":{"kind":"radio","choices":["1","2","3","4"]},"q22_2_6":{"kind":"radio","choices":["1","2","3","4","5"]},"q22_1_7":{"kind":"radio","choices":["1","2","3","4"]},"q22_2_7":{"kind":"radio","choices":["1","2","3","4","5"]},"q22_1_8":{"kind":"radio","choices":["1","2","3","4"]},"q22_2_8":{"kind":"radio","choices":["1","2","3","4","5"]},"q22_1_9":{"kind":"radio","choices":["1","2","3","4"]},"q22_2_9":{"kind":"radio","choices":["1","2","3","4","5"]},"q22_1_10":{"kind":"radio","choices":["1","2","3","4"]},"q22_2_10":{"kind":"radio","choices":["1","2","3","4","5"]},"q22_1_11":{"kind":"radio","choices":["1","2","3","4"]},"q22_2_11":{"kind":"radio","choices":["1","2","3","4","5"]},"q22_1_12":{"kind":"radio","choices":["1","2","3","4"]},"q22_2_12":{"kind":"radio","choices":["1","2","3","4","5"]},"q22_1_13":{"kind":"radio","choices":["1","2","3","4"]},"q22_2_13":{"kind":"radio","choices":["1","2","3","4","5"]},"q22_1_14":{"kind":"radio","choices":["1","2","3","4"]},"q22_2_14":{"kind":"radio","choices":["1","2","3","4","5"]},"q22_1_15":{"kind":"radio","choices":["1","2","3","4"]},"q22_2_15":{"kind":"radio","choices":["1","2","3","4","5"]},"q22_1_16":{"kind":"radio","choices":["1","2","3","4"]},"q22_2_16":{"kind":"radio","choices":["1","2","3","4","5"]},"q22_1_17":{"kind":"radio","choices":["1","2","3","4"]},"q22_2_17":{"kind":"radio","choices":["1","2","3","4","5"]},"q22_1_18":{"kind":"radio","choices":["1","2","3","4"]},"q22_2_18":{"kind":"radio","choices":["1","2","3","4","5"]},"q22_1_19":{"kind":"radio","choices":["1","2","3","4"]},"q22_2_19":{"kind":"radio","choices":["1","2","3","4","5"]},"q22_1_20":{"kind":"radio","choices":["1","2","3","4"]},"q22_2_20":{"kind":"radio","choices":["1","2","3","4","5"]},"q22_1_21":{"kind":"radio","choices":["1","2","3","4"]},"q22_2_21":{"kind":"radio","choices":["1","2","3","4","5"]},"q22_1_22":{"kind":"radio","choices":["1","2","3","4"]},"q22_2_22":{"kind":"radio","choices":["1","2","3","4","5"]},"q22_1_23":{"kind":"radio","choices":["1","2","3","4"]},"q22_2_23":{"kind":"radio","choices":["1","2","3","4","5"]},"q22_1_24":{"kind":"radio","choices":["1","2","3","4"]},"q22_2_24":{"kind":"radio","choices":["1","2","3","4","5"]},"q22_1_25":{"kind":"radio","choices":["1","2","3","4"]},"q22_2_25":{"kind":"radio","choices":["1","2","3","4","5"]},"q22_1_26":{"kind":"radio","choices":["1","2","3","4"]},"q22_2_26":{"kind":"radio","choices":["1","2","3","4","5"]},"q22_1_27":{"kind":"radio","choices":["1","2","3","4"]},"q22_2_27":{"kind":"radio","choices":["1","2","3","4","5"]},"q22_1_28":{"kind":"radio","choices":["1","2","3","4"]},"q22_2_28":{"kind":"radio","choices":["1","2","3","4","5"]},"q22_1_29":{"kind":"radio","choices":["1","2","3","4"]},"q22_2_29":{"kind":"radio","choices":["1","2","3","4","5"]},"q23":{"kind":"radio","choices":["1","2","3","4","5"]},"q24_1":{"kind":"radio","choices":["1","2","3","4","5","6"]},"q24_2":{"kind":"radio","choices":["1","2","3","4","5","6"]},"q24_3":{"kind":"radio","choices":["1","2","3","4","5","6"]},"q24_4":{"kind":"radio","choices":["1","2","3","4","5","6"]},"q24_5":{"kind":"radio","choices":["1","2","3","4","5","6"]},"q24_6":{"kind":"radio","choices":["1","2","3","4","5","6"]},"q24_7":{"kind":"radio","choices":["1","2","3","4","5","6"]},"q24_8":{"kind":"radio","choices":["1","2","3","4","5","6"]},"q24_9":{"kind":"radio","choices":["1","2","3","4","5","6"]},"q24_10":{"kind":"radio","choices":["1","2","3","4","5","6"]},"q24_11":{"kind":"radio","choices":["1","2","3","4","5","6"]},"q24_12":{"kind":"radio","choices":["1","2","3","4","5","6"]},"q24_13":{"kind":"radio","choices":["1","2","3","4","5","6"]},"q25":{"kind":"integer","min":0,"max":9999},"q26":{"kind":"radio","choices":["Y","N"]},"q27":{"kind":"radio","choices":["1","2","3","4"]},"q28_1":{"kind":"radio","choices":["1","2","3","4","5","6","7","8","9","10"]},"q28_2":{"kind":"radio","choices":["1","2","3","4","5","6","7","8","9","10"]},"q28_3":{"kind":"radio","choices":["1","2","3","4","5","6","7","8","9","10"]},"q28_4":{"kind":"radio","choices":["1","2","3","4","5","6","7","8","9","10"]},"q28_5":{"kind":"radio","choices":["1","2","3","4","5","6","7","8","9","10"]},"q28_6":{"kind":"radio","choices":["1","2","3","4","5","6","7","8","9","10"]},"q28_7":{"kind":"radio","choices":["1","2","3","4","5","6","7","8","9","10"]},"q28_8":{"kind":"radio","choices":["1","2","3","4","5","6","7","8","9","10"]},"q28_9":{"kind":"radio","choices":["1","2","3","4","5","6","7","8","9","10"]},"q28_10":{"kind":"radio","choices":["1","2","3","4","5","6","7","8","9","10"]}},"showIf":{"q9":["q8","N"],"q10_1":["q8","Y"],"q10_2":["q8","Y"],"q12_23_text":["q12","OTHER"],"q19_6_text":["q19","OTHER"],"q20":["q19","AP"],"q20_10_text":["q20","O"]},"unique":{"q11":["q11_1","q11_2","q11_3","q11_4","q11_5","q11_6","q11_7","q11_8","q11_9","q11_10","q11_11"],"q28":["q28_1","q28_2","q28_3","q28_4","q28_5","q28_6","q28_7","q28_8","q28_9","q28_10"]},"version":"25d5992de584"};
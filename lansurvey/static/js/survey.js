@@ -0,0 +1,155 @@
+// Client side validation and skip logic for the national park survey.
+// The rules come from survey-rules.js, built by `manage.py build_survey_rules`.
+(function () {
+    "use strict";
+
+    var rules = window.SURVEY_RULES;
+    var form = document.querySelector("form[data-survey]");
+    if (!rules || !form) {
+        return;
+    }
+
+    function inputs(name) {
+        return form.querySelectorAll("[name='" + name + "']");
+    }
+
+    function container(name) {
+        return document.getElementById("div_id_" + name);
+    }
+
+    function value(name) {
+        var field = rules.fields[name];
+        var elements = inputs(name);
+        if (!field || !elements.length) {
+            return null;
+        }
+        if (field.kind === "checkbox") {
+            return Array.prototype.filter.call(elements, function (el) {
+                return el.checked;
+            }).map(function (el) {
+                return el.value;
+            });
+        }
+        if (field.kind === "radio") {
+            var checked = Array.prototype.find.call(elements, function (el) {
+                return el.checked;
+            });
+            return checked ? checked.value : "";
+        }
+        return elements[0].value;
+    }
+
+    function isShown(name) {
+        var condition = rules.showIf[name];
+        if (!condition) {
+            return true;
+        }
+        if (!isShown(condition[0])) {
+            return false;
+        }
+        var current = value(condition[0]);
+        if (Array.isArray(current)) {
+            return current.indexOf(condition[1]) !== -1;
+        }
+        return current === condition[1];
+    }
+
+    function clear(name) {
+        inputs(name).forEach(function (el) {
+            if (el.type === "checkbox" || el.type === "radio") {
+                el.checked = false;
+            } else {
+                el.value = "";
+            }
+        });
+    }
+
+    function applySkipLogic() {
+        Object.keys(rules.showIf).forEach(function (name) {
+            var div = container(name);
+            if (!div) {
+                return;
+            }
+            var shown = isShown(name);
+            div.hidden = !shown;
+            if (!shown) {
+                clear(name);
+            }
+        });
+    }
+
+    function setError(name, message) {
+        var div = container(name);
+        if (!div) {
+            return;
+        }
+        var feedback = div.querySelector(".survey-error");
+        if (!message) {
+            if (feedback) {
+                feedback.remove();
+            }
+            return;
+        }
+        if (!feedback) {
+            feedback = document.createElement("div");
+            feedback.className = "survey-error invalid-feedback d-block";
+            div.appendChild(feedback);
+        }
+        feedback.textContent = message;
+    }
+
+    // Mirrors survey.rules.check
+    function check() {
+        var errors = {};
+        Object.keys(rules.fields).forEach(function (name) {
+            var field = rules.fields[name];
+            if (field.kind !== "integer") {
+                return;
+            }
+            var raw = value(name);
+            if (raw === null || raw === "") {
+                return;
+            }
+            var number = Number(raw);
+            if (!Number.isInteger(number) || number < field.min || number > field.max) {
+                errors[name] = "Please enter a number between " + field.min + " and " + field.max + ".";
+            }
+        });
+        Object.keys(rules.unique).forEach(function (group) {
+            var seen = {};
+            rules.unique[group].forEach(function (name) {
+                var current = value(name);
+                if (!current) {
+                    return;
+                }
+                if (seen[current]) {
+                    errors[name] = "This answer has already been used.";
+                }
+                seen[current] = true;
+            });
+        });
+        Object.keys(rules.fields).forEach(function (name) {
+            setError(name, errors[name]);
+        });
+        return errors;
+    }
+
+    form.addEventListener("change", function () {
+        applySkipLogic();
+        check();
+    });
+
+    form.addEventListener("submit", function (event) {
+        applySkipLogic();
+        var errors = Object.keys(check());
+        if (errors.length) {
+            event.preventDefault();
+            var first = container(errors[0]);
+            if (first) {
+                first.scrollIntoView({ behavior: "smooth", block: "center" });
+            }
+        }
+    });
+
+    applySkipLogic();
+})();
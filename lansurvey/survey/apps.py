@@ -1,6 +1,13 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
 
 
 class SurveyConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'survey'
+
+    def ready(self):
+        from . import archive, metrics
+
+        connection_created.connect(metrics.install_wrapper)
+        connection_created.connect(archive.attach_to_all_seasons)
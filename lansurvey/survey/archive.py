@@ -0,0 +1,124 @@
+"""
+Past seasons moved out of the live tables into a separate SQLite file.
+
+archive_responses moves the rows. The "all_seasons" database alias reads
+the same database with the archive attached. On that connection, temporary
+views named like the live tables union the two. SQLite looks for a name in
+the temp schema first, so ordinary ORM queries with .using(ALIAS), like
+survey.queries and export_survey --all-seasons, see every season without
+knowing about the archive.
+
+Everything else, the pages, /export, /responses and the search index, reads
+the live tables only, so archived responses are gone from them.
+"""
+
+import logging
+from pathlib import Path
+
+from django.conf import settings
+
+from . import models
+
+logger = logging.getLogger(__name__)
+
+ALIAS = "all_seasons"
+SCHEMA = "archive"
+# Places first would break their foreign key, responses go in first
+MODELS = (models.NationalParkSatisfactionBehavior, models.ResponsePlace)
+
+
+def exists():
+    return Path(settings.SURVEY_ARCHIVE).is_file()
+
+
+def attach(cursor, read_only=True):
+    """
+    Attaches the archive as the "archive" schema, creating it unless read_only.
+    Returns False when there is no archive to read.
+    """
+    if read_only and not exists():
+        return False
+    mode = "ro" if read_only else "rwc"
+    uri = f"{Path(settings.SURVEY_ARCHIVE).resolve().as_uri()}?mode={mode}"
+    cursor.execute(f"ATTACH DATABASE %s AS {SCHEMA}", [uri])
+    return True
+
+
+def detach(cursor):
+    cursor.execute(f"DETACH DATABASE {SCHEMA}")
+
+
+def quote(name):
+    return f'"{name}"'
+
+
+def columns(cursor, schema, table):
+    cursor.execute(f"PRAGMA {schema}.table_info({quote(table)})")
+    return [(row[1], row[2]) for row in cursor.fetchall()]
+
+
+def create_views(cursor):
+    """
+    Creates the temporary union views. A column added to the live table
+    after a season was archived reads as NULL for the archived rows.
+    """
+    for model in MODELS:
+        table = model._meta.db_table
+        archived = {name for name, _ in columns(cursor, SCHEMA, table)}
+        if not archived:
+            continue
+        live = [name for name, _ in columns(cursor, "main", table)]
+        live_columns = ", ".join(quote(name) for name in live)
+        archived_columns = ", ".join(
+            quote(name) if name in archived else f"NULL AS {quote(name)}"
+            for name in live
+        )
+        cursor.execute(
+            f"CREATE TEMP VIEW IF NOT EXISTS {quote(table)} AS "
+            f"SELECT {live_columns} FROM main.{quote(table)} UNION ALL "
+            f"SELECT {archived_columns} FROM {SCHEMA}.{quote(table)}"
+        )
+
+
+def create_tables(cursor):
+    """
+    Creates the archived tables and their indexes like the live ones, and
+    adds any columns the live tables have gained since.
+    """
+    for model in MODELS:
+        table = model._meta.db_table
+        archived = {name for name, _ in columns(cursor, SCHEMA, table)}
+        if not archived:
+            cursor.execute(
+                "SELECT sql FROM main.sqlite_master "
+                "WHERE type = 'table' AND name = %s",
+                [table],
+            )
+            sql = cursor.fetchone()[0]
+            cursor.execute(sql.replace(quote(table), f"{SCHEMA}.{quote(table)}", 1))
+        else:
+            for name, kind in columns(cursor, "main", table):
+                if name not in archived:
+                    cursor.execute(
+                        f"ALTER TABLE {SCHEMA}.{quote(table)} "
+                        f"ADD COLUMN {quote(name)} {kind}"
+                    )
+        cursor.execute(
+            "SELECT name, sql FROM main.sqlite_master "
+            "WHERE type = 'index' AND tbl_name = %s AND sql IS NOT NULL",
+            [table],
+        )
+        for name, sql in cursor.fetchall():
+            index = f"INDEX IF NOT EXISTS {SCHEMA}.{quote(name)}"
+            cursor.execute(sql.replace(f"INDEX {quote(name)}", index))
+
+
+def attach_to_all_seasons(sender, connection, **kwargs):
+    """
+    connection_created receiver, sets up the all_seasons connection.
+    """
+    if connection.alias != ALIAS:
+        return
+    with connection.cursor() as cursor:
+        if attach(cursor):
+            create_views(cursor)
@@ -0,0 +1,61 @@
+"""
+Token auth for the data download endpoints.
+
+There are no user accounts on the Pi, so whoever collects the data is given
+SURVEY_EXPORT_TOKEN. It can be sent as a bearer token or as the password of
+HTTP basic auth, which is what a browser prompts for. Without the setting the
+endpoints are turned off.
+"""
+
+import base64
+import binascii
+import hmac
+from functools import wraps
+
+from django.conf import settings
+from django.http import Http404, HttpResponse
+
+REALM = "survey data"
+
+
+def request_token(request):
+    """
+    The token sent with the request, or None.
+    """
+    scheme, _, credentials = request.headers.get("Authorization", "").partition(" ")
+    match scheme.lower():
+        case "bearer":
+            return credentials.strip()
+        case "basic":
+            try:
+                decoded = base64.b64decode(credentials.strip(), validate=True)
+            except (binascii.Error, ValueError):
+                return None
+            return decoded.decode("utf-8", "replace").partition(":")[2]
+        case _:
+            return None
+
+
+def is_authorized(request):
+    token = request_token(request)
+    return bool(token) and hmac.compare_digest(
+        token.encode(), settings.SURVEY_EXPORT_TOKEN.encode()
+    )
+
+
+def token_required(view):
+    """
+    Returns 404 when no token is set and 401 when the request doesn't have it.
+    """
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not settings.SURVEY_EXPORT_TOKEN:
+            raise Http404
+        if not is_authorized(request):
+            response = HttpResponse("Unauthorized", status=401)
+            response["WWW-Authenticate"] = f'Basic realm="{REALM}", charset="UTF-8"'
+            return response
+        return view(request, *args, **kwargs)
+
+    return wrapper
@@ -0,0 +1,87 @@
+"""
+The read only response browser, newest first, one page at a time.
+
+Pages are found by id (keyset pagination) rather than OFFSET, so the last
+page costs the same as the first. Only the shown columns are read, and
+codes are turned into labels with the cached choice maps from schema.
+"""
+
+import logging
+
+from . import export, models, schema
+
+logger = logging.getLogger(__name__)
+
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+COLUMNS = (
+    ("submitted_at", "Submitted"),
+    ("q1", "Age"),
+    ("q2", "Gender"),
+    ("q8", "US resident"),
+    ("q9", "Country"),
+    ("q10_1", "State"),
+    ("q12", "Places"),
+    ("source_device", "Device"),
+)
+
+
+def label(name, value):
+    """
+    The display label of an answer, checkbox answers joined with commas.
+    """
+    spec = schema.field_specs().get(name)
+    labels = spec.labels if spec is not None else {}
+    if isinstance(value, list):
+        return ", ".join(labels.get(item, item) for item in value if item)
+    if value is None:
+        return ""
+    return labels.get(str(value), value)
+
+
+def page(before=None, after=None, size=PAGE_SIZE):
+    """
+    Returns (rows, newer, older). rows are (id, labels) newest first, newer
+    and older are the ids to page from, or None on the first or last page.
+    """
+    responses = models.NationalParkSatisfactionBehavior.objects
+    queryset = responses.values_list("pk", *(name for name, _ in COLUMNS))
+    if after is not None:
+        # Going back towards the newest, read upwards and turn it around
+        rows = list(queryset.filter(pk__gt=after).order_by("pk")[:size])[::-1]
+    else:
+        if before is not None:
+            queryset = queryset.filter(pk__lt=before)
+        rows = list(queryset.order_by("-pk")[:size])
+
+    if not rows:
+        return [], None, None
+    newest, oldest = rows[0][0], rows[-1][0]
+    newer = newest if responses.filter(pk__gt=newest).exists() else None
+    older = oldest if responses.filter(pk__lt=oldest).exists() else None
+    return (
+        [
+            (row[0], [label(name, value) for (name, _), value in zip(COLUMNS, row[1:])])
+            for row in rows
+        ],
+        newer,
+        older,
+    )
+
+
+def answers(pk):
+    """
+    Returns [(question, answer label)] for one response, or None.
+    """
+    values = (
+        models.NationalParkSatisfactionBehavior.objects.filter(pk=pk)
+        .values(*export.DATA_COLUMNS)
+        .first()
+    )
+    if values is None:
+        return None
+    meta = models.NationalParkSatisfactionBehavior._meta
+    return [
+        (meta.get_field(name).verbose_name, label(name, value))
+        for name, value in values.items()
+    ]
@@ -0,0 +1,115 @@
+"""
+Fast bulk reads of the responses as plain tuples.
+
+Building a model instance for every row runs from_db_value on each checkbox
+field and sets around 190 attributes, most of which the reader never looks
+at. Readers that only need the values, like the export, read the raw rows
+instead and decode each column with a plan worked out once.
+"""
+
+import logging
+from functools import cache, partial
+
+from django.db import connections
+from django.db.models.sql.constants import MULTI
+
+from . import models, schema
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 2000
+
+
+def _split(value):
+    # Same as MultipleChoiceField.from_db_value
+    return None if value is None else value.split(",")
+
+
+def _decoder(name, labels):
+    spec = schema.field_specs().get(name)
+    kind = spec.kind if spec is not None else None
+    if kind == schema.CHECKBOX and labels:
+        get = spec.labels.get
+        return lambda value: ",".join(
+            get(code, code) for code in ("" if value is None else value).split(",")
+        )
+    if kind == schema.CHECKBOX:
+        return _split
+    if kind == schema.RADIO and labels:
+        get = spec.labels.get
+        return lambda value: value if value is None else get(value, value)
+    return None
+
+
+def _convert(function, expression, connection, value):
+    return function(value, expression, connection)
+
+
+@cache
+def plan(names, labels=False):
+    """
+    Returns a decoder, or None to keep the value as it is, for each column.
+    With labels=True choice codes become their labels, the same as the
+    model's get_FIELD_display and get_FIELD_display_custom.
+    """
+    return tuple(_decoder(name, labels) for name in names)
+
+
+def _column_converters(compiler, connection, decoders):
+    # The checkbox columns are decoded by the plan, the rest of the converters,
+    # like the database's datetime parsing, still run. Column 0 is the id.
+    converters = compiler.get_converters(
+        [column for column, _, _ in compiler.select[: len(decoders) + 1]]
+    )
+    columns = []
+    for index, decode in enumerate(decoders, start=1):
+        if decode is None and index in converters:
+            functions, expression = converters[index]
+            for function in functions:
+                columns.append(
+                    (index, partial(_convert, function, expression, connection))
+                )
+        elif decode is not None:
+            columns.append((index, decode))
+    return columns
+
+
+def rows(names, queryset=None, labels=False, chunk_size=CHUNK_SIZE):
+    """
+    Yields a tuple of the named columns for each response in queryset, in id
+    order, without building model instances. Checkbox answers are lists of
+    codes, or a comma separated string of labels with labels=True.
+
+    Each chunk is its own query, read to the end before its rows are handed
+    on. An open cursor would keep SQLite's read lock, and block every
+    submission, for as long as a slow reader takes.
+    """
+    names = tuple(names)
+    if queryset is None:
+        queryset = models.NationalParkSatisfactionBehavior.objects.all()
+    queryset = queryset.order_by("pk")
+    connection = connections[queryset.db]
+    decoders = plan(names, labels)
+    columns = None
+    last = None
+    while True:
+        chunk = queryset if last is None else queryset.filter(pk__gt=last)
+        chunk = chunk.values_list("pk", *names)[:chunk_size]
+        # The compiler hands back the cursor's rows as they are, values_list
+        # would also run every field's converters on every value
+        compiler = chunk.query.get_compiler(chunk.db)
+        results = [
+            raw
+            for block in compiler.execute_sql(MULTI, chunked_fetch=False)
+            for raw in block
+        ]
+        if columns is None:
+            columns = _column_converters(compiler, connection, decoders)
+        for raw in results:
+            values = list(raw)
+            for index, decode in columns:
+                values[index] = decode(values[index])
+            yield tuple(values[1:])
+        if len(results) < chunk_size:
+            return
+        last = results[-1][0]
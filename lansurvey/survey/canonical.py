@@ -0,0 +1,130 @@
+"""
+Canonicalization of the free text country (q9) and state (q10_1) answers.
+
+Answers are normalized and looked up in precomputed tables of names, codes and
+aliases. Unknown answers fall back to a prefix trie ("united sta") and then to
+a fuzzy match ("Untied States"), which is cached since the same misspellings
+come up over and over.
+"""
+
+import difflib
+import logging
+import re
+import unicodedata
+from functools import lru_cache
+
+from . import canonical_data
+
+logger = logging.getLogger(__name__)
+
+# Shortest prefix the trie will complete, "u" or "ne" are too ambiguous
+MIN_PREFIX_LENGTH = 3
+FUZZY_CUTOFF = 0.8
+# Shorter answers are codes or abbreviations, a fuzzy match would just guess
+MIN_FUZZY_LENGTH = 4
+FUZZY_CACHE_SIZE = 4096
+
+_PUNCTUATION = re.compile(r"[^\w\s]")
+_SPACES = re.compile(r"\s+")
+
+
+def normalize(text):
+    """
+    Lower case, no accents, no punctuation and single spaces.
+    """
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    text = text.lower().replace("&", " and ")
+    text = _PUNCTUATION.sub("", text)
+    text = _SPACES.sub(" ", text).strip()
+    if text.startswith("the "):
+        text = text[4:]
+    return text
+
+
+class PrefixTrie:
+    """
+    Maps prefixes of the known names to the codes they could be.
+    """
+
+    def __init__(self):
+        self.root = {}
+
+    def add(self, key, code):
+        node = self.root
+        for char in key:
+            node = node.setdefault(char, {})
+            node.setdefault("", set()).add(code)
+
+    def complete(self, prefix):
+        """
+        Returns the code if exactly one name starts with the prefix.
+        """
+        node = self.root
+        for char in prefix:
+            node = node.get(char)
+            if node is None:
+                return None
+        codes = node.get("", ())
+        if len(codes) == 1:
+            return next(iter(codes))
+        return None
+
+
+class Canonicalizer:
+    def __init__(self, entries, other_codes=None):
+        self.lookup = {}
+        self.trie = PrefixTrie()
+        codes = {}
+        for code, name, aliases in entries:
+            codes[normalize(code)] = code
+            if other_codes:
+                codes[normalize(other_codes[code])] = code
+            for key in (name, *aliases):
+                key = normalize(key)
+                self.lookup[key] = code
+                self.trie.add(key, code)
+        # Only the names are fuzzy matched, "aus" is closer to "us" than to
+        # "australia". The codes are only looked up exactly.
+        self.keys = [key for key in self.lookup if len(key) >= MIN_FUZZY_LENGTH]
+        self.lookup = {**codes, **self.lookup}
+        self.fuzzy = lru_cache(maxsize=FUZZY_CACHE_SIZE)(self._fuzzy)
+
+    def __call__(self, text):
+        """
+        Returns the code for the text or None if it doesn't look like any.
+        """
+        if not text:
+            return None
+        key = normalize(str(text))
+        if not key:
+            return None
+
+        code = self.lookup.get(key)
+        if code is not None:
+            return code
+        if len(key) >= MIN_PREFIX_LENGTH:
+            code = self.trie.complete(key)
+            if code is not None:
+                return code
+        if len(key) >= MIN_FUZZY_LENGTH:
+            return self.fuzzy(key)
+        return None
+
+    def _fuzzy(self, key):
+        matches = difflib.get_close_matches(key, self.keys, n=1, cutoff=FUZZY_CUTOFF)
+        if matches:
+            return self.lookup[matches[0]]
+        return None
+
+
+country_code = Canonicalizer(canonical_data.COUNTRIES, canonical_data.COUNTRY_ALPHA3)
+state_code = Canonicalizer(canonical_data.US_STATES)
+
+
+def fill_codes(response):
+    """
+    Sets the canonical codes on a response from its free text answers.
+    """
+    response.country_code = country_code(response.q9)
+    response.state_code = state_code(response.q10_1)
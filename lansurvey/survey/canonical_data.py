@@ -0,0 +1,571 @@
+"""
+Lookup tables for canonicalizing free text answers.
+
+Countries are ISO 3166-1 alpha-2 codes, states are USPS codes.
+"""
+
+# (code, name, aliases)
+COUNTRIES = (
+    ("AD", "Andorra", ()),
+    ("AE", "United Arab Emirates", ("UAE", "Emirates")),
+    ("AF", "Afghanistan", ()),
+    ("AG", "Antigua and Barbuda", ()),
+    ("AI", "Anguilla", ()),
+    ("AL", "Albania", ()),
+    ("AM", "Armenia", ()),
+    ("AO", "Angola", ()),
+    ("AQ", "Antarctica", ()),
+    ("AR", "Argentina", ()),
+    ("AS", "American Samoa", ()),
+    ("AT", "Austria", ()),
+    ("AU", "Australia", ()),
+    ("AW", "Aruba", ()),
+    ("AX", "Åland Islands", ()),
+    ("AZ", "Azerbaijan", ()),
+    ("BA", "Bosnia and Herzegovina", ("Bosnia",)),
+    ("BB", "Barbados", ()),
+    ("BD", "Bangladesh", ()),
+    ("BE", "Belgium", ()),
+    ("BF", "Burkina Faso", ()),
+    ("BG", "Bulgaria", ()),
+    ("BH", "Bahrain", ()),
+    ("BI", "Burundi", ()),
+    ("BJ", "Benin", ()),
+    ("BL", "Saint Barthelemy", ()),
+    ("BM", "Bermuda", ()),
+    ("BN", "Brunei", ()),
+    ("BO", "Bolivia", ()),
+    ("BQ", "Caribbean Netherlands", ()),
+    ("BR", "Brazil", ()),
+    ("BS", "Bahamas", ("The Bahamas",)),
+    ("BT", "Bhutan", ()),
+    ("BV", "Bouvet Island", ()),
+    ("BW", "Botswana", ()),
+    ("BY", "Belarus", ()),
+    ("BZ", "Belize", ()),
+    ("CA", "Canada", ("Kanada",)),
+    ("CC", "Cocos (Keeling) Islands", ()),
+    ("CD", "Democratic Republic of the Congo", ("DR Congo", "DRC", "Congo Kinshasa")),
+    ("CF", "Central African Republic", ()),
+    ("CG", "Republic of the Congo", ("Congo", "Congo Brazzaville")),
+    ("CH", "Switzerland", ("Suisse", "Schweiz")),
+    ("CI", "Côte d'Ivoire", ("Ivory Coast",)),
+    ("CK", "Cook Islands", ()),
+    ("CL", "Chile", ()),
+    ("CM", "Cameroon", ()),
+    ("CN", "China", ("PRC", "People's Republic of China")),
+    ("CO", "Colombia", ()),
+    ("CR", "Costa Rica", ()),
+    ("CU", "Cuba", ()),
+    ("CV", "Cape Verde", ("Cabo Verde",)),
+    ("CW", "Curaçao", ()),
+    ("CX", "Christmas Island", ()),
+    ("CY", "Cyprus", ()),
+    ("CZ", "Czechia", ("Czech Republic",)),
+    ("DE", "Germany", ("Deutschland",)),
+    ("DJ", "Djibouti", ()),
+    ("DK", "Denmark", ()),
+    ("DM", "Dominica", ()),
+    ("DO", "Dominican Republic", ()),
+    ("DZ", "Algeria", ()),
+    ("EC", "Ecuador", ()),
+    ("EE", "Estonia", ()),
+    ("EG", "Egypt", ()),
+    ("EH", "Western Sahara", ()),
+    ("ER", "Eritrea", ()),
+    ("ES", "Spain", ("Espana",)),
+    ("ET", "Ethiopia", ()),
+    ("FI", "Finland", ()),
+    ("FJ", "Fiji", ()),
+    ("FK", "Falkland Islands", ()),
+    ("FM", "Micronesia", ("Federated States of Micronesia",)),
+    ("FO", "Faroe Islands", ()),
+    ("FR", "France", ()),
+    ("GA", "Gabon", ()),
+    ("GB", "United Kingdom", ("UK", "Great Britain", "Britain", "England", "Scotland", "Wales", "Northern Ireland", "U.K.")),
+    ("GD", "Grenada", ()),
+    ("GE", "Georgia", ()),
+    ("GF", "French Guiana", ()),
+    ("GG", "Guernsey", ()),
+    ("GH", "Ghana", ()),
+    ("GI", "Gibraltar", ()),
+    ("GL", "Greenland", ()),
+    ("GM", "Gambia", ("The Gambia",)),
+    ("GN", "Guinea", ()),
+    ("GP", "Guadeloupe", ()),
+    ("GQ", "Equatorial Guinea", ()),
+    ("GR", "Greece", ()),
+    ("GS", "South Georgia and the South Sandwich Islands", ()),
+    ("GT", "Guatemala", ()),
+    ("GU", "Guam", ()),
+    ("GW", "Guinea-Bissau", ()),
+    ("GY", "Guyana", ()),
+    ("HK", "Hong Kong", ()),
+    ("HM", "Heard Island and McDonald Islands", ()),
+    ("HN", "Honduras", ()),
+    ("HR", "Croatia", ()),
+    ("HT", "Haiti", ()),
+    ("HU", "Hungary", ()),
+    ("ID", "Indonesia", ()),
+    ("IE", "Ireland", ("Eire",)),
+    ("IL", "Israel", ()),
+    ("IM", "Isle of Man", ()),
+    ("IN", "India", ()),
+    ("IO", "British Indian Ocean Territory", ()),
+    ("IQ", "Iraq", ()),
+    ("IR", "Iran", ("Persia",)),
+    ("IS", "Iceland", ()),
+    ("IT", "Italy", ()),
+    ("JE", "Jersey", ()),
+    ("JM", "Jamaica", ()),
+    ("JO", "Jordan", ()),
+    ("JP", "Japan", ()),
+    ("KE", "Kenya", ()),
+    ("KG", "Kyrgyzstan", ()),
+    ("KH", "Cambodia", ()),
+    ("KI", "Kiribati", ()),
+    ("KM", "Comoros", ()),
+    ("KN", "Saint Kitts and Nevis", ()),
+    ("KP", "North Korea", ("Korea North", "DPRK")),
+    ("KR", "South Korea", ("Korea", "Republic of Korea", "Korea South")),
+    ("KW", "Kuwait", ()),
+    ("KY", "Cayman Islands", ()),
+    ("KZ", "Kazakhstan", ()),
+    ("LA", "Laos", ("Lao",)),
+    ("LB", "Lebanon", ()),
+    ("LC", "Saint Lucia", ()),
+    ("LI", "Liechtenstein", ()),
+    ("LK", "Sri Lanka", ()),
+    ("LR", "Liberia", ()),
+    ("LS", "Lesotho", ()),
+    ("LT", "Lithuania", ()),
+    ("LU", "Luxembourg", ()),
+    ("LV", "Latvia", ()),
+    ("LY", "Libya", ()),
+    ("MA", "Morocco", ()),
+    ("MC", "Monaco", ()),
+    ("MD", "Moldova", ()),
+    ("ME", "Montenegro", ()),
+    ("MF", "Saint Martin", ()),
+    ("MG", "Madagascar", ()),
+    ("MH", "Marshall Islands", ()),
+    ("MK", "North Macedonia", ("Macedonia",)),
+    ("ML", "Mali", ()),
+    ("MM", "Myanmar", ("Burma",)),
+    ("MN", "Mongolia", ()),
+    ("MO", "Macau", ()),
+    ("MP", "Northern Mariana Islands", ()),
+    ("MQ", "Martinique", ()),
+    ("MR", "Mauritania", ()),
+    ("MS", "Montserrat", ()),
+    ("MT", "Malta", ()),
+    ("MU", "Mauritius", ()),
+    ("MV", "Maldives", ()),
+    ("MW", "Malawi", ()),
+    ("MX", "Mexico", ("Mexique", "Mejico")),
+    ("MY", "Malaysia", ()),
+    ("MZ", "Mozambique", ()),
+    ("NA", "Namibia", ()),
+    ("NC", "New Caledonia", ()),
+    ("NE", "Niger", ()),
+    ("NF", "Norfolk Island", ()),
+    ("NG", "Nigeria", ()),
+    ("NI", "Nicaragua", ()),
+    ("NL", "Netherlands", ("Holland", "The Netherlands")),
+    ("NO", "Norway", ()),
+    ("NP", "Nepal", ()),
+    ("NR", "Nauru", ()),
+    ("NU", "Niue", ()),
+    ("NZ", "New Zealand", ("Aotearoa",)),
+    ("OM", "Oman", ()),
+    ("PA", "Panama", ()),
+    ("PE", "Peru", ()),
+    ("PF", "French Polynesia", ()),
+    ("PG", "Papua New Guinea", ()),
+    ("PH", "Philippines", ("The Philippines",)),
+    ("PK", "Pakistan", ()),
+    ("PL", "Poland", ()),
+    ("PM", "Saint Pierre and Miquelon", ()),
+    ("PN", "Pitcairn", ()),
+    ("PR", "Puerto Rico", ()),
+    ("PS", "Palestine", ("Palestinian Territories",)),
+    ("PT", "Portugal", ()),
+    ("PW", "Palau", ()),
+    ("PY", "Paraguay", ()),
+    ("QA", "Qatar", ()),
+    ("RE", "Réunion", ()),
+    ("RO", "Romania", ()),
+    ("RS", "Serbia", ()),
+    ("RU", "Russia", ("Russian Federation",)),
+    ("RW", "Rwanda", ()),
+    ("SA", "Saudi Arabia", ()),
+    ("SB", "Solomon Islands", ()),
+    ("SC", "Seychelles", ()),
+    ("SD", "Sudan", ()),
+    ("SE", "Sweden", ()),
+    ("SG", "Singapore", ()),
+    ("SH", "Saint Helena", ()),
+    ("SI", "Slovenia", ()),
+    ("SJ", "Svalbard and Jan Mayen", ()),
+    ("SK", "Slovakia", ()),
+    ("SL", "Sierra Leone", ()),
+    ("SM", "San Marino", ()),
+    ("SN", "Senegal", ()),
+    ("SO", "Somalia", ()),
+    ("SR", "Suriname", ()),
+    ("SS", "South Sudan", ()),
+    ("ST", "Sao Tome and Principe", ()),
+    ("SV", "El Salvador", ()),
+    ("SX", "Sint Maarten", ()),
+    ("SY", "Syria", ("Syrian Arab Republic",)),
+    ("SZ", "Eswatini", ("Swaziland",)),
+    ("TC", "Turks and Caicos Islands", ()),
+    ("TD", "Chad", ()),
+    ("TF", "French Southern Territories", ()),
+    ("TG", "Togo", ()),
+    ("TH", "Thailand", ()),
+    ("TJ", "Tajikistan", ()),
+    ("TK", "Tokelau", ()),
+    ("TL", "Timor-Leste", ("East Timor",)),
+    ("TM", "Turkmenistan", ()),
+    ("TN", "Tunisia", ()),
+    ("TO", "Tonga", ()),
+    ("TR", "Turkey", ("Turkiye",)),
+    ("TT", "Trinidad and Tobago", ()),
+    ("TV", "Tuvalu", ()),
+    ("TW", "Taiwan", ("Republic of China",)),
+    ("TZ", "Tanzania", ()),
+    ("UA", "Ukraine", ()),
+    ("UG", "Uganda", ()),
+    ("UM", "US Minor Outlying Islands", ()),
+    ("US", "United States", ("USA", "United States of America", "America", "U.S.", "U.S.A.", "US of A", "The States")),
+    ("UY", "Uruguay", ()),
+    ("UZ", "Uzbekistan", ()),
+    ("VA", "Vatican City", ("Vatican", "Holy See")),
+    ("VC", "Saint Vincent and the Grenadines", ()),
+    ("VE", "Venezuela", ()),
+    ("VG", "British Virgin Islands", ()),
+    ("VI", "US Virgin Islands", ()),
+    ("VN", "Vietnam", ("Viet Nam",)),
+    ("VU", "Vanuatu", ()),
+    ("WF", "Wallis and Futuna", ()),
+    ("WS", "Samoa", ()),
+    ("YE", "Yemen", ()),
+    ("YT", "Mayotte", ()),
+    ("ZA", "South Africa", ()),
+    ("ZM", "Zambia", ()),
+    ("ZW", "Zimbabwe", ()),
+)
+
+# ISO 3166-1 alpha-3 codes of the COUNTRIES, looked up as exact aliases
+COUNTRY_ALPHA3 = {
+    "AD": "AND",
+    "AE": "ARE",
+    "AF": "AFG",
+    "AG": "ATG",
+    "AI": "AIA",
+    "AL": "ALB",
+    "AM": "ARM",
+    "AO": "AGO",
+    "AQ": "ATA",
+    "AR": "ARG",
+    "AS": "ASM",
+    "AT": "AUT",
+    "AU": "AUS",
+    "AW": "ABW",
+    "AX": "ALA",
+    "AZ": "AZE",
+    "BA": "BIH",
+    "BB": "BRB",
+    "BD": "BGD",
+    "BE": "BEL",
+    "BF": "BFA",
+    "BG": "BGR",
+    "BH": "BHR",
+    "BI": "BDI",
+    "BJ": "BEN",
+    "BL": "BLM",
+    "BM": "BMU",
+    "BN": "BRN",
+    "BO": "BOL",
+    "BQ": "BES",
+    "BR": "BRA",
+    "BS": "BHS",
+    "BT": "BTN",
+    "BV": "BVT",
+    "BW": "BWA",
+    "BY": "BLR",
+    "BZ": "BLZ",
+    "CA": "CAN",
+    "CC": "CCK",
+    "CD": "COD",
+    "CF": "CAF",
+    "CG": "COG",
+    "CH": "CHE",
+    "CI": "CIV",
+    "CK": "COK",
+    "CL": "CHL",
+    "CM": "CMR",
+    "CN": "CHN",
+    "CO": "COL",
+    "CR": "CRI",
+    "CU": "CUB",
+    "CV": "CPV",
+    "CW": "CUW",
+    "CX": "CXR",
+    "CY": "CYP",
+    "CZ": "CZE",
+    "DE": "DEU",
+    "DJ": "DJI",
+    "DK": "DNK",
+    "DM": "DMA",
+    "DO": "DOM",
+    "DZ": "DZA",
+    "EC": "ECU",
+    "EE": "EST",
+    "EG": "EGY",
+    "EH": "ESH",
+    "ER": "ERI",
+    "ES": "ESP",
+    "ET": "ETH",
+    "FI": "FIN",
+    "FJ": "FJI",
+    "FK": "FLK",
+    "FM": "FSM",
+    "FO": "FRO",
+    "FR": "FRA",
+    "GA": "GAB",
+    "GB": "GBR",
+    "GD": "GRD",
+    "GE": "GEO",
+    "GF": "GUF",
+    "GG": "GGY",
+    "GH": "GHA",
+    "GI": "GIB",
+    "GL": "GRL",
+    "GM": "GMB",
+    "GN": "GIN",
+    "GP": "GLP",
+    "GQ": "GNQ",
+    "GR": "GRC",
+    "GS": "SGS",
+    "GT": "GTM",
+    "GU": "GUM",
+    "GW": "GNB",
+    "GY": "GUY",
+    "HK": "HKG",
+    "HM": "HMD",
+    "HN": "HND",
+    "HR": "HRV",
+    "HT": "HTI",
+    "HU": "HUN",
+    "ID": "IDN",
+    "IE": "IRL",
+    "IL": "ISR",
+    "IM": "IMN",
+    "IN": "IND",
+    "IO": "IOT",
+    "IQ": "IRQ",
+    "IR": "IRN",
+    "IS": "ISL",
+    "IT": "ITA",
+    "JE": "JEY",
+    "JM": "JAM",
+    "JO": "JOR",
+    "JP": "JPN",
+    "KE": "KEN",
+    "KG": "KGZ",
+    "KH": "KHM",
+    "KI": "KIR",
+    "KM": "COM",
+    "KN": "KNA",
+    "KP": "PRK",
+    "KR": "KOR",
+    "KW": "KWT",
+    "KY": "CYM",
+    "KZ": "KAZ",
+    "LA": "LAO",
+    "LB": "LBN",
+    "LC": "LCA",
+    "LI": "LIE",
+    "LK": "LKA",
+    "LR": "LBR",
+    "LS": "LSO",
+    "LT": "LTU",
+    "LU": "LUX",
+    "LV": "LVA",
+    "LY": "LBY",
+    "MA": "MAR",
+    "MC": "MCO",
+    "MD": "MDA",
+    "ME": "MNE",
+    "MF": "MAF",
+    "MG": "MDG",
+    "MH": "MHL",
+    "MK": "MKD",
+    "ML": "MLI",
+    "MM": "MMR",
+    "MN": "MNG",
+    "MO": "MAC",
+    "MP": "MNP",
+    "MQ": "MTQ",
+    "MR": "MRT",
+    "MS": "MSR",
+    "MT": "MLT",
+    "MU": "MUS",
+    "MV": "MDV",
+    "MW": "MWI",
+    "MX": "MEX",
+    "MY": "MYS",
+    "MZ": "MOZ",
+    "NA": "NAM",
+    "NC": "NCL",
+    "NE": "NER",
+    "NF": "NFK",
+    "NG": "NGA",
+    "NI": "NIC",
+    "NL": "NLD",
+    "NO": "NOR",
+    "NP": "NPL",
+    "NR": "NRU",
+    "NU": "NIU",
+    "NZ": "NZL",
+    "OM": "OMN",
+    "PA": "PAN",
+    "PE": "PER",
+    "PF": "PYF",
+    "PG": "PNG",
+    "PH": "PHL",
+    "PK": "PAK",
+    "PL": "POL",
+    "PM": "SPM",
+    "PN": "PCN",
+    "PR": "PRI",
+    "PS": "PSE",
+    "PT": "PRT",
+    "PW": "PLW",
+    "PY": "PRY",
+    "QA": "QAT",
+    "RE": "REU",
+    "RO": "ROU",
+    "RS": "SRB",
+    "RU": "RUS",
+    "RW": "RWA",
+    "SA": "SAU",
+    "SB": "SLB",
+    "SC": "SYC",
+    "SD": "SDN",
+    "SE": "SWE",
+    "SG": "SGP",
+    "SH": "SHN",
+    "SI": "SVN",
+    "SJ": "SJM",
+    "SK": "SVK",
+    "SL": "SLE",
+    "SM": "SMR",
+    "SN": "SEN",
+    "SO": "SOM",
+    "SR": "SUR",
+    "SS": "SSD",
+    "ST": "STP",
+    "SV": "SLV",
+    "SX": "SXM",
+    "SY": "SYR",
+    "SZ": "SWZ",
+    "TC": "TCA",
+    "TD": "TCD",
+    "TF": "ATF",
+    "TG": "TGO",
+    "TH": "THA",
+    "TJ": "TJK",
+    "TK": "TKL",
+    "TL": "TLS",
+    "TM": "TKM",
+    "TN": "TUN",
+    "TO": "TON",
+    "TR": "TUR",
+    "TT": "TTO",
+    "TV": "TUV",
+    "TW": "TWN",
+    "TZ": "TZA",
+    "UA": "UKR",
+    "UG": "UGA",
+    "UM": "UMI",
+    "US": "USA",
+    "UY": "URY",
+    "UZ": "UZB",
+    "VA": "VAT",
+    "VC": "VCT",
+    "VE": "VEN",
+    "VG": "VGB",
+    "VI": "VIR",
+    "VN": "VNM",
+    "VU": "VUT",
+    "WF": "WLF",
+    "WS": "WSM",
+    "YE": "YEM",
+    "YT": "MYT",
+    "ZA": "ZAF",
+    "ZM": "ZMB",
+    "ZW": "ZWE",
+}
+
+# (code, name, aliases)
+US_STATES = (
+    ("AL", "Alabama", ()),
+    ("AK", "Alaska", ()),
+    ("AZ", "Arizona", ()),
+    ("AR", "Arkansas", ()),
+    ("CA", "California", ("Calif", "Cali")),
+    ("CO", "Colorado", ()),
+    ("CT", "Connecticut", ()),
+    ("DE", "Delaware", ()),
+    ("FL", "Florida", ()),
+    ("GA", "Georgia", ()),
+    ("HI", "Hawaii", ()),
+    ("ID", "Idaho", ()),
+    ("IL", "Illinois", ()),
+    ("IN", "Indiana", ()),
+    ("IA", "Iowa", ()),
+    ("KS", "Kansas", ()),
+    ("KY", "Kentucky", ()),
+    ("LA", "Louisiana", ()),
+    ("ME", "Maine", ()),
+    ("MD", "Maryland", ()),
+    ("MA", "Massachusetts", ("Mass",)),
+    ("MI", "Michigan", ()),
+    ("MN", "Minnesota", ()),
+    ("MS", "Mississippi", ()),
+    ("MO", "Missouri", ()),
+    ("MT", "Montana", ()),
+    ("NE", "Nebraska", ()),
+    ("NV", "Nevada", ()),
+    ("NH", "New Hampshire", ()),
+    ("NJ", "New Jersey", ()),
+    ("NM", "New Mexico", ()),
+    ("NY", "New York", ("New York State",)),
+    ("NC", "North Carolina", ()),
+    ("ND", "North Dakota", ()),
+    ("OH", "Ohio", ()),
+    ("OK", "Oklahoma", ()),
+    ("OR", "Oregon", ()),
+    ("PA", "Pennsylvania", ("Penn",)),
+    ("RI", "Rhode Island", ()),
+    ("SC", "South Carolina", ()),
+    ("SD", "South Dakota", ()),
+    ("TN", "Tennessee", ()),
+    ("TX", "Texas", ()),
+    ("UT", "Utah", ()),
+    ("VT", "Vermont", ()),
+    ("VA", "Virginia", ()),
+    ("WA", "Washington", ("Washington State",)),
+    ("WV", "West Virginia", ()),
+    ("WI", "Wisconsin", ()),
+    ("WY", "Wyoming", ()),
+    ("DC", "District of Columbia", ("Washington DC", "Washington D.C.", "D.C.")),
+    ("AS", "American Samoa", ()),
+    ("GU", "Guam", ()),
+    ("MP", "Northern Mariana Islands", ()),
+    ("PR", "Puerto Rico", ("Porto Rico",)),
+    ("VI", "US Virgin Islands", ("Virgin Islands",)),
+)
@@ -0,0 +1,197 @@
+"""
+Autosave of unfinished responses.
+
+Browsers send only the answers that changed since their last autosave. The
+changes are merged in memory and written to SurveyDraft in one transaction at
+most every SURVEY_AUTOSAVE_INTERVAL seconds per worker, so a room full of
+tablets costs a handful of SQLite writes instead of one per click.
+
+Submitting marks the draft as submitted rather than deleting it. Another
+worker may still have changes for it in its buffer, and writing them must
+not bring the answers back.
+"""
+
+import logging
+import secrets
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DatabaseError, connections, transaction
+from django.utils import timezone
+
+from . import models, schema
+
+logger = logging.getLogger(__name__)
+
+MAX_TOKEN_LENGTH = 64
+MAX_VALUE_LENGTH = 255
+
+# SQLite limits the number of parameters in a query
+LOOKUP_BATCH_SIZE = 500
+
+
+def clean_changes(changes):
+    """
+    Returns only the changes to known questions with sane values.
+    """
+    specs = schema.field_specs()
+    cleaned = {}
+    for name, value in changes.items():
+        if name not in specs:
+            continue
+        if isinstance(value, list):
+            value = [str(item)[:MAX_VALUE_LENGTH] for item in value]
+        elif value is None:
+            value = ""
+        else:
+            value = str(value)[:MAX_VALUE_LENGTH]
+        cleaned[name] = value
+    return cleaned
+
+
+class DraftBuffer:
+    """
+    Coalesces draft changes in memory and writes them in batches.
+    """
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.pending = {}
+        self.lock = threading.Lock()
+        self.last_flush = time.monotonic()
+        self.timer = None
+
+    def add(self, token, changes):
+        with self.lock:
+            self.pending.setdefault(token, {}).update(changes)
+            due = time.monotonic() - self.last_flush >= self.interval
+            if not due and self.timer is None:
+                # Make sure the change is written even if no other request comes
+                self.timer = threading.Timer(self.interval, self._flush_from_timer)
+                self.timer.daemon = True
+                self.timer.start()
+        if due:
+            self.flush()
+
+    def get(self, token):
+        with self.lock:
+            return dict(self.pending.get(token, {}))
+
+    def discard(self, token):
+        with self.lock:
+            self.pending.pop(token, None)
+
+    def flush(self):
+        """
+        Writes all pending changes, returns the number of drafts written.
+        """
+        with self.lock:
+            pending, self.pending = self.pending, {}
+            self.last_flush = time.monotonic()
+            if self.timer is not None:
+                self.timer.cancel()
+                self.timer = None
+
+        if not pending:
+            return 0
+
+        try:
+            write_drafts(pending)
+        except DatabaseError:
+            logger.exception("Could not write %s survey drafts", len(pending))
+            # Put the changes back under anything newer that came in meanwhile
+            with self.lock:
+                for token, changes in pending.items():
+                    changes.update(self.pending.get(token, {}))
+                    self.pending[token] = changes
+            return 0
+        return len(pending)
+
+    def _flush_from_timer(self):
+        try:
+            self.flush()
+        finally:
+            # The timer thread has its own connection, don't leak it
+            connections.close_all()
+
+
+def write_drafts(pending):
+    """
+    Merges the changes for each token into its draft in a single transaction,
+    skipping the drafts already submitted.
+    """
+    tokens = list(pending)
+    with transaction.atomic():
+        existing = {}
+        for start in range(0, len(tokens), LOOKUP_BATCH_SIZE):
+            batch = tokens[start : start + LOOKUP_BATCH_SIZE]
+            for draft in models.SurveyDraft.objects.filter(token__in=batch):
+                existing[draft.token] = draft
+
+        updated, created = [], []
+        for token, changes in pending.items():
+            draft = existing.get(token)
+            if draft is None:
+                created.append(models.SurveyDraft(token=token, data=changes))
+            elif draft.submitted:
+                continue
+            else:
+                draft.data.update(changes)
+                updated.append(draft)
+
+        models.SurveyDraft.objects.bulk_create(created)
+        # bulk_update skips auto_now, keep the timestamp right for cleanup
+        now = timezone.now()
+        for draft in updated:
+            draft.updated = now
+        models.SurveyDraft.objects.bulk_update(
+            updated, ["data", "updated"], batch_size=LOOKUP_BATCH_SIZE
+        )
+
+
+buffer = DraftBuffer(settings.SURVEY_AUTOSAVE_INTERVAL)
+
+
+def save_changes(token, changes):
+    buffer.add(token, changes)
+
+
+def load(token):
+    """
+    Returns the saved answers for a token, including unwritten changes, or
+    None when the draft was submitted or left alone for SURVEY_DRAFT_IDLE
+    seconds and the browser should start a new one.
+    """
+    data, updated, submitted = (
+        models.SurveyDraft.objects.filter(token=token)
+        .values_list("data", "updated", "submitted")
+        .first()
+    ) or ({}, None, False)
+    pending = buffer.get(token)
+    if submitted:
+        return None
+    idle_since = timezone.now() - timedelta(seconds=settings.SURVEY_DRAFT_IDLE)
+    if not pending and updated is not None and updated < idle_since:
+        return None
+    data.update(pending)
+    return data
+
+
+def new_token():
+    return secrets.token_urlsafe(24)
+
+
+def delete(token):
+    """
+    Clears the answers of a submitted response's draft and marks it submitted.
+    maintain_db deletes it once no autosave can come in for it any more.
+    """
+    buffer.discard(token)
+    models.SurveyDraft.objects.bulk_create(
+        [models.SurveyDraft(token=token, submitted=True)],
+        update_conflicts=True,
+        unique_fields=["token"],
+        update_fields=["data", "updated", "submitted"],
+    )
@@ -0,0 +1,647 @@
+"""
+The CSV export in the layout of the Qualtrics import file.
+
+Shared by the export_survey command and the export download view. Rows are
+read from the database in chunks and written one at a time, so an export of
+any size never needs the whole table, or the whole file, in memory.
+"""
+
+import csv
+import gzip
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import cache
+from multiprocessing import get_context
+
+from django.conf import settings
+from django.db import connections
+
+from . import bulk, metrics, models
+
+logger = logging.getLogger(__name__)
+
+# The first three rows of this file are the Qualtrics header rows
+HEADER_FILE = "parkexample.csv"
+CHUNK_SIZE = 2000
+# Bytes handed to the response at a time
+BLOCK_SIZE = 64 * 1024
+# File name endings for each --compress choice
+EXTENSIONS = {"none": "", "gzip": ".gz", "zstd": ".zst"}
+# Id ranges per worker process for write_csv(workers=...)
+PARTS_PER_WORKER = 4
+# Fewer rows than this are written in one process, forking the workers and
+# copying their parts costs more than it saves
+PARALLEL_MIN_ROWS = 20_000
+
+# The Qualtrics question ids, the import file's own header rows are used instead
+HEADERS = [
+    "startDate",
+    "endDate",
+    "status",
+    "ipAddress",
+    "progress",
+    "duration",
+    "finished",
+    "recordedDate",
+    "_recordId",
+    "recipientLastName",
+    "recipientFirstName",
+    "recipientEmail",
+    "externalDataReference",
+    "locationLatitude",
+    "locationLongitude",
+    "distributionChannel",
+    "userLanguage",
+    "QID1",
+    "QID2",
+    "QID3",
+    "QID4",
+    "QID5",
+    "QID6",
+    "QID7_TEXT",
+    "QID8",
+    "QID9_TEXT",
+    "QID10_1",
+    "QID10_2",
+    "QID11_1",
+    "QID11_2",
+    "QID11_3",
+    "QID11_4",
+    "QID11_5",
+    "QID11_6",
+    "QID11_7",
+    "QID11_8",
+    "QID11_9",
+    "QID11_10",
+    "QID11_11",
+    "QID12",
+    "QID12_23_TEXT",
+    "QID13_TEXT",
+    "QID14_TEXT",
+    "QID15_TEXT",
+    "QID17",
+    "QID16_1",
+    "QID16_2",
+    "QID16_3",
+    "QID16_4",
+    "QID16_5",
+    "QID16_6",
+    "QID16_7",
+    "QID16_8",
+    "QID16_9",
+    "QID16_10",
+    "QID16_11",
+    "QID16_12",
+    "QID16_13",
+    "QID18_1",
+    "QID18_2",
+    "QID18_3",
+    "QID18_4",
+    "QID18_5",
+    "QID18_6",
+    "QID18_7",
+    "QID18_8",
+    "QID18_9",
+    "QID18_10",
+    "QID18_11",
+    "QID18_12",
+    "QID18_13",
+    "QID19",
+    "QID19_6_TEXT",
+    "QID20",
+    "QID20_10_TEXT",
+    "QID21_1",
+    "QID21_2",
+    "QID21_3",
+    "QID21_4",
+    "QID21_5",
+    "QID21_6",
+    "QID21_7",
+    "QID21_8",
+    "QID22#1_1",
+    "QID22#1_2",
+    "QID22#1_3",
+    "QID22#1_4",
+    "QID22#1_5",
+    "QID22#1_6",
+    "QID22#1_7",
+    "QID22#1_8",
+    "QID22#1_9",
+    "QID22#1_10",
+    "QID22#1_11",
+    "QID22#1_12",
+    "QID22#1_13",
+    "QID22#1_14",
+    "QID22#1_15",
+    "QID22#1_16",
+    "QID22#1_17",
+    "QID22#1_18",
+    "QID22#1_19",
+    "QID22#1_20",
+    "QID22#1_21",
+    "QID22#1_22",
+    "QID22#1_23",
+    "QID22#1_24",
+    "QID22#1_25",
+    "QID22#1_26",
+    "QID22#1_27",
+    "QID22#1_28",
+    "QID22#1_29",
+    "QID22#2_1",
+    "QID22#2_2",
+    "QID22#2_3",
+    "QID22#2_4",
+    "QID22#2_5",
+    "QID22#2_6",
+    "QID22#2_7",
+    "QID22#2_8",
+    "QID22#2_9",
+    "QID22#2_10",
+    "QID22#2_11",
+    "QID22#2_12",
+    "QID22#2_13",
+    "QID22#2_14",
+    "QID22#2_15",
+    "QID22#2_16",
+    "QID22#2_17",
+    "QID22#2_18",
+    "QID22#2_19",
+    "QID22#2_20",
+    "QID22#2_21",
+    "QID22#2_22",
+    "QID22#2_23",
+    "QID22#2_24",
+    "QID22#2_25",
+    "QID22#2_26",
+    "QID22#2_27",
+    "QID22#2_28",
+    "QID22#2_29",
+    "QID23",
+    "QID24_1",
+    "QID24_2",
+    "QID24_3",
+    "QID24_4",
+    "QID24_5",
+    "QID24_6",
+    "QID24_7",
+    "QID24_8",
+    "QID24_9",
+    "QID24_10",
+    "QID24_11",
+    "QID24_12",
+    "QID24_13",
+    "QID25_TEXT",
+    "QID26",
+    "QID27",
+    "QID28_1",
+    "QID28_2",
+    "QID28_3",
+    "QID28_4",
+    "QID28_5",
+    "QID28_6",
+    "QID28_7",
+    "QID28_8",
+    "QID28_9",
+    "QID28_10",
+]
+
+# Blank Qualtrics metadata columns, StartDate to userLanguage, before the answers
+METADATA_COLUMNS = 17
+
+DATA_COLUMNS = [
+    "q1",
+    "q2",
+    "q3",
+    "q4",
+    "q5",
+    "q6",
+    "q7",
+    "q8",
+    "q9",
+    "q10_1",
+    "q10_2",
+    "q11_1",
+    "q11_2",
+    "q11_3",
+    "q11_4",
+    "q11_5",
+    "q11_6",
+    "q11_7",
+    "q11_8",
+    "q11_9",
+    "q11_10",
+    "q11_11",
+    "q12",
+    "q12_23_text",
+    "q13",
+    "q14",
+    "q15",
+    "q16",
+    "q17_1",
+    "q17_2",
+    "q17_3",
+    "q17_4",
+    "q17_5",
+    "q17_6",
+    "q17_7",
+    "q17_8",
+    "q17_9",
+    "q17_10",
+    "q17_11",
+    "q17_12",
+    "q17_13",
+    "q18_1",
+    "q18_2",
+    "q18_3",
+    "q18_4",
+    "q18_5",
+    "q18_6",
+    "q18_7",
+    "q18_8",
+    "q18_9",
+    "q18_10",
+    "q18_11",
+    "q18_12",
+    "q18_13",
+    "q19",
+    "q19_6_text",
+    "q20",
+    "q20_10_text",
+    "q21_1",
+    "q21_2",
+    "q21_3",
+    "q21_4",
+    "q21_5",
+    "q21_6",
+    "q21_7",
+    "q21_8",
+    "q22_1_1",
+    "q22_1_2",
+    "q22_1_3",
+    "q22_1_4",
+    "q22_1_5",
+    "q22_1_6",
+    "q22_1_7",
+    "q22_1_8",
+    "q22_1_9",
+    "q22_1_10",
+    "q22_1_11",
+    "q22_1_12",
+    "q22_1_13",
+    "q22_1_14",
+    "q22_1_15",
+    "q22_1_16",
+    "q22_1_17",
+    "q22_1_18",
+    "q22_1_19",
+    "q22_1_20",
+    "q22_1_21",
+    "q22_1_22",
+    "q22_1_23",
+    "q22_1_24",
+    "q22_1_25",
+    "q22_1_26",
+    "q22_1_27",
+    "q22_1_28",
+    "q22_1_29",
+    "q22_2_1",
+    "q22_2_2",
+    "q22_2_3",
+    "q22_2_4",
+    "q22_2_5",
+    "q22_2_6",
+    "q22_2_7",
+    "q22_2_8",
+    "q22_2_9",
+    "q22_2_10",
+    "q22_2_11",
+    "q22_2_12",
+    "q22_2_13",
+    "q22_2_14",
+    "q22_2_15",
+    "q22_2_16",
+    "q22_2_17",
+    "q22_2_18",
+    "q22_2_19",
+    "q22_2_20",
+    "q22_2_21",
+    "q22_2_22",
+    "q22_2_23",
+    "q22_2_24",
+    "q22_2_25",
+    "q22_2_26",
+    "q22_2_27",
+    "q22_2_28",
+    "q22_2_29",
+    "q23",
+    "q24_1",
+    "q24_2",
+    "q24_3",
+    "q24_4",
+    "q24_5",
+    "q24_6",
+    "q24_7",
+    "q24_8",
+    "q24_9",
+    "q24_10",
+    "q24_11",
+    "q24_12",
+    "q24_13",
+    "q25",
+    "q26",
+    "q27",
+    "q28_1",
+    "q28_2",
+    "q28_3",
+    "q28_4",
+    "q28_5",
+    "q28_6",
+    "q28_7",
+    "q28_8",
+    "q28_9",
+    "q28_10",
+]
+
+
+def header_rows():
+    with open(settings.BASE_DIR / HEADER_FILE, mode="r", newline="") as file:
+        reader = csv.reader(file)
+        return [next(reader) for _ in range(3)]
+
+
+def rows(queryset):
+    """
+    Yields the export row of each response: blank metadata, then the answers
+    with choice codes turned into their labels. Read as tuples, see bulk.
+    """
+    blank = ("",) * METADATA_COLUMNS
+    for values in bulk.rows(DATA_COLUMNS, queryset, labels=True, chunk_size=CHUNK_SIZE):
+        yield blank + values
+
+
+def responses(until=None, using=None):
+    """
+    The responses to export in id order, up to and including the until id.
+    Use using=archive.ALIAS to include the archived seasons.
+    """
+    queryset = models.NationalParkSatisfactionBehavior.objects.using(using).order_by(
+        "pk"
+    )
+    if until is not None:
+        queryset = queryset.filter(pk__lte=until)
+    return queryset
+
+
+@cache
+def _zstandard():
+    # Optional, only needed for --compress zstd
+    try:
+        import zstandard
+    except ImportError:
+        return None
+    return zstandard
+
+
+def compressor(file, compress):
+    """
+    A binary writer that compresses into file, or file itself for "none".
+    """
+    match compress:
+        case "none":
+            return file
+        case "gzip":
+            # No time or name in the header, so the same rows give the same file
+            return gzip.GzipFile(filename="", mode="wb", fileobj=file, mtime=0)
+        case "zstd":
+            zstandard = _zstandard()
+            if zstandard is None:
+                raise ValueError("zstd compression needs the zstandard package.")
+            return zstandard.ZstdCompressor(level=9).stream_writer(
+                file, closefd=False
+            )
+        case _:
+            raise ValueError(f"Unknown compression {compress!r}.")
+
+
+def decompressor(file, compress):
+    match compress:
+        case "none":
+            return file
+        case "gzip":
+            return gzip.GzipFile(mode="rb", fileobj=file)
+        case "zstd":
+            zstandard = _zstandard()
+            if zstandard is None:
+                raise ValueError("zstd compression needs the zstandard package.")
+            return zstandard.ZstdDecompressor().stream_reader(file, closefd=False)
+        case _:
+            raise ValueError(f"Unknown compression {compress!r}.")
+
+
+@cache
+def schema_version():
+    """
+    A short hash of the header rows and columns, changes whenever they do.
+    """
+    digest = hashlib.sha256()
+    for values in [*header_rows(), DATA_COLUMNS]:
+        digest.update("\x1f".join(values).encode("utf-8") + b"\n")
+    return digest.hexdigest()[:12]
+
+
+class _HashingWriter:
+    """
+    Passes bytes on to a file, keeping their SHA-256 and length.
+    """
+
+    def __init__(self, file):
+        self.file = file
+        self.sha256 = hashlib.sha256()
+        self.size = 0
+
+    def write(self, data):
+        self.sha256.update(data)
+        self.size += len(data)
+        return self.file.write(data)
+
+    def flush(self):
+        self.file.flush()
+
+
+class _TextWriter:
+    def __init__(self, file):
+        self.file = file
+
+    def write(self, value):
+        return self.file.write(value.encode("utf-8"))
+
+
+def _write_part(using, query, path):
+    # Runs in a worker process, forked with the column plan already built
+    queryset = models.NationalParkSatisfactionBehavior.objects.using(using).all()
+    queryset.query = query
+    count = 0
+    with open(path, mode="wb") as file:
+        writer = csv.writer(_TextWriter(file))
+        for values in rows(queryset):
+            writer.writerow(values)
+            count += 1
+    connections.close_all()
+    return count
+
+
+def _write_parallel(file, queryset, workers, directory):
+    """
+    Splits queryset into id ranges, formats them in worker processes and
+    copies the parts into file in id order. Returns the number of rows.
+    """
+    ids = list(queryset.order_by("pk").values_list("pk", flat=True))
+    if not ids:
+        return 0
+    # A few parts per worker, so the first can be copied while the rest are
+    # still being formatted
+    size = max(CHUNK_SIZE, -(-len(ids) // (workers * PARTS_PER_WORKER)))
+    ranges = [
+        (ids[start], ids[min(start + size, len(ids)) - 1])
+        for start in range(0, len(ids), size)
+    ]
+    queries = [
+        queryset.filter(pk__gte=first, pk__lte=last).order_by("pk").query
+        for first, last in ranges
+    ]
+
+    # Warm up what the workers share, and don't hand them this connection
+    header_rows()
+    bulk.plan(tuple(DATA_COLUMNS), labels=True)
+    connections.close_all()
+    count = 0
+    with (
+        tempfile.TemporaryDirectory(dir=directory) as scratch,
+        ProcessPoolExecutor(workers, mp_context=get_context("fork")) as pool,
+    ):
+        paths = [os.path.join(scratch, f"{index}.csv") for index in range(len(queries))]
+        results = pool.map(_write_part, [queryset.db] * len(queries), queries, paths)
+        for part, rows_written in zip(paths, results):
+            with open(part, mode="rb") as source:
+                shutil.copyfileobj(source, file)
+            os.unlink(part)
+            count += rows_written
+    return count
+
+
+def write_csv(path, queryset=None, compress="none", workers=1):
+    """
+    Writes the export to a file and returns its manifest: row count, schema
+    version, and the size and SHA-256 of both the file and the CSV in it.
+    With workers above 1 the rows are formatted in that many processes, at
+    most one per core and only for PARALLEL_MIN_ROWS rows or more. The file
+    comes out the same.
+    """
+    if queryset is None:
+        queryset = responses()
+    workers = min(workers, os.cpu_count() or 1)
+    if workers > 1 and queryset.count() < PARALLEL_MIN_ROWS:
+        workers = 1
+    count = 0
+    with open(path, mode="wb") as file:
+        written = _HashingWriter(file)
+        stream = compressor(written, compress)
+        content = _HashingWriter(stream)
+        writer = csv.writer(_TextWriter(content))
+        writer.writerows(header_rows())
+        if workers > 1:
+            directory = os.path.dirname(os.path.abspath(path))
+            count = _write_parallel(content, queryset, workers, directory)
+        else:
+            for values in rows(queryset):
+                writer.writerow(values)
+                count += 1
+        if stream is not written:
+            stream.close()
+    return {
+        "file": os.path.basename(path),
+        "rows": count,
+        "schema_version": schema_version(),
+        "compression": compress,
+        "bytes": written.size,
+        "sha256": written.sha256.hexdigest(),
+        "csv_bytes": content.size,
+        "csv_sha256": content.sha256.hexdigest(),
+    }
+
+
+def manifest_path(path):
+    return f"{path}.manifest.json"
+
+
+def write_manifest(path, manifest):
+    with open(manifest_path(path), mode="w", encoding="utf-8") as file:
+        json.dump(manifest, file, indent=2)
+        file.write("\n")
+
+
+def export_file(until, count, compress=False):
+    """
+    The path of the export of the responses up to the until id, count of
+    them, gzipped if compress is set. It's written the first time it's asked
+    for and then shared by every download and worker, and the files of
+    older exports are removed.
+    """
+    directory = settings.SURVEY_EXPORT_DIR
+    os.makedirs(directory, exist_ok=True)
+    stem = f"export-{until}-{count}."
+    path = os.path.join(directory, stem + ("csv.gz" if compress else "csv"))
+    if os.path.exists(path):
+        return path
+
+    # Written under another name first, a worker asking for it at the same
+    # time never sees half a file
+    handle, partial_path = tempfile.mkstemp(dir=directory, prefix=".export-")
+    os.close(handle)
+    started = time.perf_counter()
+    try:
+        manifest = write_csv(
+            partial_path, responses(until), "gzip" if compress else "none"
+        )
+        # mkstemp makes it private, nginx reads it for SURVEY_EXPORT_ACCEL
+        os.chmod(partial_path, 0o640)
+        os.replace(partial_path, path)
+    except BaseException:
+        os.unlink(partial_path)
+        raise
+    elapsed = time.perf_counter() - started
+    metrics.EXPORT_DURATION.observe(elapsed)
+    metrics.EXPORT_ROWS.inc(manifest["rows"])
+    if elapsed:
+        metrics.EXPORT_ROW_RATE.set(manifest["rows"] / elapsed)
+
+    # A download still reading an old file keeps it until it's done
+    for name in os.listdir(directory):
+        if name.startswith("export-") and not name.startswith(stem):
+            try:
+                os.unlink(os.path.join(directory, name))
+            except FileNotFoundError:
+                pass
+    return path
+
+
+def read_range(file, start, end):
+    """
+    Yields bytes start to end (inclusive) of an open binary file in blocks of
+    up to BLOCK_SIZE bytes, and closes it.
+    """
+    with file:
+        file.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            block = file.read(min(BLOCK_SIZE, remaining))
+            if not block:
+                return
+            remaining -= len(block)
+            yield block
@@ -0,0 +1,44 @@
+"""
+Content hashes of responses, so the same response merged from two devices,
+or from one device under two names, is only stored once.
+"""
+
+import hashlib
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def _value(value):
+    match value:
+        case None:
+            return ""
+        case list() | tuple():
+            return ",".join(str(item) for item in value)
+        case _:
+            return value.isoformat() if hasattr(value, "isoformat") else str(value)
+
+
+def content_hash(response):
+    """
+    SHA-256 of every answer and the submission time, with the fields sorted by
+    name so it doesn't change when a field is added or moved.
+    """
+    digest = hashlib.sha256()
+    for field in sorted(response._meta.concrete_fields, key=lambda f: f.name):
+        if field.name.startswith("q") or field.name == "submitted_at":
+            value = _value(field.value_from_object(response))
+            digest.update(f"{field.name}\x1f{value}\x1e".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def fill_hash(response):
+    """
+    Responses saved before there was a submission time are left without a
+    hash, two respondents who gave the same answers would share it. Those are
+    only told apart by device and id.
+    """
+    if response.submitted_at is None:
+        response.content_hash = None
+    else:
+        response.content_hash = content_hash(response)
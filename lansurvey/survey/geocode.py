@@ -0,0 +1,232 @@
+"""
+Offline geocoding of the q10_2 ZIP codes.
+
+The ZIP table is a sorted file of fixed size records, built once with the
+build_zip_index command and memory mapped, so a lookup is a binary search over
+pages the OS shares between the gunicorn workers. Nothing here needs a network.
+"""
+
+import logging
+import math
+import mmap
+import struct
+from dataclasses import dataclass
+from functools import cache
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"ZIPIDX1\0"
+HEADER = struct.Struct("<8sII")  # magic, record count, county table offset
+RECORD = struct.Struct("<Iff2sH")  # zip, latitude, longitude, state, county index
+EARTH_RADIUS_KM = 6371.0088
+
+# Rough centers of the places in q12
+PARK_LOCATIONS = {
+    "A": (38.7331, -109.5925),
+    "B": (37.5930, -112.1871),
+    "C": (38.3269, -109.8783),
+    "CR": (38.3670, -111.2615),
+    "Z": (37.2982, -113.0263),
+    "G": (36.1069, -112.1129),
+    "R": (40.3428, -105.6836),
+    "M": (37.2309, -108.4618),
+    "RB": (37.0775, -110.9645),
+    "NB": (37.6018, -110.0137),
+    "GC": (37.0000, -111.5000),
+    "BE": (37.5000, -109.9000),
+    "H": (37.3836, -109.0753),
+    "GS": (37.5000, -111.7000),
+    "CB": (37.6357, -112.8451),
+    "MV": (36.9980, -110.0985),
+    "FC": (36.9990, -109.0452),
+    "LV": (36.1699, -115.1398),
+    "SL": (40.7608, -111.8910),
+    "P": (33.4484, -112.0740),
+    "D": (39.7392, -104.9903),
+    "PS": (36.8625, -112.7370),
+}
+
+
+@dataclass(frozen=True)
+class ZipLocation:
+    latitude: float
+    longitude: float
+    county: str
+    state: str
+
+
+def build_index(rows, path):
+    """
+    Writes an index file from (zip, latitude, longitude, county, state) rows.
+    Later rows win when a ZIP code is repeated. Returns the number of records.
+    """
+    records = {}
+    for zip_code, latitude, longitude, county, state in rows:
+        records[int(zip_code)] = (float(latitude), float(longitude), county, state)
+
+    counties = sorted({county for _, _, county, _ in records.values()})
+    county_index = {county: i for i, county in enumerate(counties)}
+    if len(counties) > 0xFFFF:
+        raise ValueError("Too many counties for the index format.")
+
+    county_offset = HEADER.size + RECORD.size * len(records)
+    with open(path, mode="wb") as file:
+        file.write(HEADER.pack(MAGIC, len(records), county_offset))
+        for zip_code in sorted(records):
+            latitude, longitude, county, state = records[zip_code]
+            file.write(
+                RECORD.pack(
+                    zip_code,
+                    latitude,
+                    longitude,
+                    state.encode("ascii")[:2].ljust(2),
+                    county_index[county],
+                )
+            )
+        file.write("\n".join(counties).encode("utf-8"))
+    return len(records)
+
+
+class ZipIndex:
+    def __init__(self, path):
+        with open(path, mode="rb") as file:
+            self.map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.count, county_offset = HEADER.unpack_from(self.map, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a ZIP index.")
+        self.counties = self.map[county_offset:].decode("utf-8").split("\n")
+
+    def __len__(self):
+        return self.count
+
+    def _zip_at(self, i):
+        return struct.unpack_from("<I", self.map, HEADER.size + RECORD.size * i)[0]
+
+    def lookup(self, zip_code):
+        """
+        Returns the ZipLocation for a ZIP code or None.
+        """
+        if zip_code is None:
+            return None
+        zip_code = int(zip_code)
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if self._zip_at(middle) < zip_code:
+                low = middle + 1
+            else:
+                high = middle
+        if low == self.count or self._zip_at(low) != zip_code:
+            return None
+        _, latitude, longitude, state, county = RECORD.unpack_from(
+            self.map, HEADER.size + RECORD.size * low
+        )
+        return ZipLocation(
+            latitude, longitude, self.counties[county], state.decode("ascii").strip()
+        )
+
+    def geocode(self, zip_codes):
+        """
+        Returns a dict of ZIP code to ZipLocation for every code that is known.
+        """
+        locations = {}
+        for zip_code in sorted({int(z) for z in zip_codes if z is not None}):
+            location = self.lookup(zip_code)
+            if location is not None:
+                locations[zip_code] = location
+        return locations
+
+
+@cache
+def get_index():
+    """
+    Returns the ZipIndex from settings.SURVEY_ZIP_INDEX or None if there isn't one.
+    """
+    try:
+        return ZipIndex(settings.SURVEY_ZIP_INDEX)
+    except FileNotFoundError:
+        logger.info("No ZIP index at %s", settings.SURVEY_ZIP_INDEX)
+        return None
+
+
+def geocode(zip_codes):
+    index = get_index()
+    if index is None:
+        return {}
+    return index.geocode(zip_codes)
+
+
+def fill_location(response):
+    """
+    Sets the origin fields on a response from its ZIP code, if the index is installed.
+    """
+    index = get_index()
+    if index is None:
+        return
+    location = index.lookup(response.q10_2)
+    if location is None:
+        response.origin_latitude = response.origin_longitude = None
+        response.origin_county = response.origin_state = None
+        return
+    response.origin_latitude = location.latitude
+    response.origin_longitude = location.longitude
+    response.origin_county = location.county
+    response.origin_state = location.state
+
+
+@cache
+def _numpy():
+    # Imported on first use, numpy is slow to import and the workers rarely need it
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+def distances_km(latitudes, longitudes, to):
+    """
+    Great circle distances from every (latitude, longitude) pair to one point.
+    Uses numpy when it is installed.
+    """
+    to_latitude, to_longitude = (math.radians(value) for value in to)
+    numpy = _numpy()
+    if numpy is not None:
+        latitudes = numpy.radians(numpy.asarray(latitudes, dtype=float))
+        longitudes = numpy.radians(numpy.asarray(longitudes, dtype=float))
+        a = (
+            numpy.sin((latitudes - to_latitude) / 2) ** 2
+            + numpy.cos(latitudes)
+            * math.cos(to_latitude)
+            * numpy.sin((longitudes - to_longitude) / 2) ** 2
+        )
+        return (2 * EARTH_RADIUS_KM * numpy.arcsin(numpy.sqrt(a))).tolist()
+
+    cos_to = math.cos(to_latitude)
+    distances = []
+    for latitude, longitude in zip(latitudes, longitudes):
+        latitude, longitude = math.radians(latitude), math.radians(longitude)
+        a = (
+            math.sin((latitude - to_latitude) / 2) ** 2
+            + math.cos(latitude) * cos_to * math.sin((longitude - to_longitude) / 2) ** 2
+        )
+        distances.append(2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a)))
+    return distances
+
+
+def distances_to_park(park, queryset):
+    """
+    Returns a dict of response id to distance in km from the respondent's ZIP
+    code to a q12 place, for every geocoded response in the queryset.
+    """
+    rows = list(
+        queryset.filter(origin_latitude__isnull=False).values_list(
+            "id", "origin_latitude", "origin_longitude"
+        )
+    )
+    if not rows:
+        return {}
+    ids, latitudes, longitudes = zip(*rows)
+    return dict(zip(ids, distances_km(latitudes, longitudes, PARK_LOCATIONS[park])))
@@ -0,0 +1,107 @@
+import logging
+import time
+from datetime import date, datetime
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+from survey import archive, models
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = (
+        "Command to move responses from past seasons into the archive database. "
+        "Archived responses only show up in export_survey --all-seasons and "
+        "queries on the all_seasons connection."
+    )
+    model = models.NationalParkSatisfactionBehavior
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--before",
+            type=date.fromisoformat,
+            required=True,
+            help="Move responses submitted before this day, YYYY-MM-DD.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Responses moved per transaction, the live table is locked while "
+            "one is moved.",
+        )
+
+    def handle(self, *args, **options):
+        if not 0 < options["batch_size"] <= 10_000:
+            raise CommandError("--batch-size must be between 1 and 10000.")
+        cutoff = timezone.make_aware(
+            datetime.combine(options["before"], datetime.min.time())
+        )
+        queryset = self.model.objects.filter(submitted_at__lt=cutoff).order_by("pk")
+        total = queryset.count()
+        if not total:
+            self.stdout.write(f"No responses before {options['before']}")
+            return
+
+        started = time.perf_counter()
+        moved = 0
+        with connection.cursor() as cursor:
+            archive.attach(cursor, read_only=False)
+            try:
+                with transaction.atomic():
+                    archive.create_tables(cursor)
+                tables = [
+                    (
+                        model._meta.db_table,
+                        key,
+                        ", ".join(
+                            archive.quote(name)
+                            for name, _ in archive.columns(
+                                cursor, "main", model._meta.db_table
+                            )
+                        ),
+                    )
+                    for model, key in zip(archive.MODELS, ("id", "response_id"))
+                ]
+                while ids := list(
+                    queryset.values_list("pk", flat=True)[: options["batch_size"]]
+                ):
+                    self.move(cursor, tables, ids)
+                    moved += len(ids)
+                    self.stdout.write(f"{moved}/{total} responses archived")
+
+                # The archive is written once a season and read from then on
+                cursor.execute(f"VACUUM {archive.SCHEMA}")
+                cursor.execute(f"ANALYZE {archive.SCHEMA}")
+            finally:
+                archive.detach(cursor)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Moved {moved} responses to {settings.SURVEY_ARCHIVE} in "
+                f"{time.perf_counter() - started:.1f}s. maintain_db gives the "
+                "space in the live database back."
+            )
+        )
+
+    def move(self, cursor, tables, ids):
+        placeholders = ", ".join(["%s"] * len(ids))
+        with transaction.atomic():
+            for table, key, columns in tables:
+                table = archive.quote(table)
+                cursor.execute(
+                    f"INSERT INTO {archive.SCHEMA}.{table} ({columns}) "
+                    f"SELECT {columns} FROM main.{table} "
+                    f"WHERE {key} IN ({placeholders})",
+                    ids,
+                )
+            # Places before their responses, the search index triggers follow
+            for table, key, _ in reversed(tables):
+                cursor.execute(
+                    f"DELETE FROM main.{archive.quote(table)} "
+                    f"WHERE {key} IN ({placeholders})",
+                    ids,
+                )
@@ -0,0 +1,219 @@
+import json
+import logging
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+from django.core.management.base import BaseCommand
+from django.db import connections, transaction
+from django.db.models import Q
+from survey import models, queries, schema
+
+logger = logging.getLogger(__name__)
+
+ALIAS = "benchmark"
+INSERT_BATCH_SIZE = 10000
+
+
+def scan_parks(queryset, parks):
+    """
+    The q12 filter without ResponsePlace, a LIKE scan over the comma separated codes.
+    """
+    condition = Q()
+    for code in parks:
+        condition |= (
+            Q(q12=code)
+            | Q(q12__startswith=f"{code},")
+            | Q(q12__endswith=f",{code}")
+            | Q(q12__contains=f",{code},")
+        )
+    return queryset.filter(condition)
+
+
+class Command(BaseCommand):
+    help = "Command to benchmark the common response filters with and without indexes."
+    model = models.NationalParkSatisfactionBehavior
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=1_000_000)
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--path", help="SQLite file to use, a temporary file by default."
+        )
+        parser.add_argument(
+            "--json", action="store_true", help="Print the results as JSON."
+        )
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        if path is None:
+            descriptor, path = tempfile.mkstemp(suffix=".sqlite3")
+            os.close(descriptor)
+            os.unlink(path)
+
+        connections.settings[ALIAS] = {**connections.settings["default"], "NAME": path}
+        connection = connections[ALIAS]
+        try:
+            self.create_schema(connection)
+            now = datetime.now(timezone.utc)
+            self.fill(connection, options["rows"], now, random.Random(options["seed"]))
+
+            cases = self.get_cases(now)
+            before = self.run_cases(cases, options["repeat"], indexed=False)
+            self.add_indexes(connection)
+            after = self.run_cases(cases, options["repeat"], indexed=True)
+        finally:
+            connection.close()
+            del connections[ALIAS]
+            if not options["path"]:
+                os.unlink(path)
+
+        results = []
+        for name, _ in cases:
+            (count_before, ms_before), (count_after, ms_after) = before[name], after[name]
+            if count_before != count_after:
+                logger.warning(
+                    "%s counted %s without and %s with indexes",
+                    name,
+                    count_before,
+                    count_after,
+                )
+            results.append(
+                {
+                    "query": name,
+                    "count": count_after,
+                    "before_ms": round(ms_before, 3),
+                    "after_ms": round(ms_after, 3),
+                    "speedup": round(ms_before / ms_after, 1) if ms_after else None,
+                }
+            )
+
+        if options["json"]:
+            self.stdout.write(json.dumps({"rows": options["rows"], "results": results}))
+            return
+
+        self.stdout.write(f"{options['rows']} rows, best of {options['repeat']}")
+        self.stdout.write(f"{'query':<24}{'count':>10}{'before ms':>12}{'after ms':>12}")
+        for result in results:
+            self.stdout.write(
+                f"{result['query']:<24}{result['count']:>10}"
+                f"{result['before_ms']:>12.2f}{result['after_ms']:>12.2f}"
+                f"  x{result['speedup']}"
+            )
+
+    def create_schema(self, connection):
+        """
+        Creates the tables the way 0001_initial did, without any indexes.
+        """
+        with connection.schema_editor() as editor:
+            for model in (self.model, models.ResponsePlace):
+                editor.create_model(model)
+        # The Meta indexes are created when the first editor exits
+        with connection.schema_editor() as editor:
+            for model in (self.model, models.ResponsePlace):
+                for index in model._meta.indexes:
+                    editor.remove_index(model, index)
+
+    def add_indexes(self, connection):
+        started = time.perf_counter()
+        with connection.schema_editor() as editor:
+            for model in (self.model, models.ResponsePlace):
+                for index in model._meta.indexes:
+                    editor.add_index(model, index)
+        responses = self.model.objects.using(ALIAS).only("id", "q12").iterator()
+        with transaction.atomic(using=ALIAS):
+            batch = []
+            for response in responses:
+                batch.append(response)
+                if len(batch) >= INSERT_BATCH_SIZE:
+                    models.ResponsePlace.sync(batch, replace=False, using=ALIAS)
+                    batch = []
+            models.ResponsePlace.sync(batch, replace=False, using=ALIAS)
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+        logger.info("Built indexes in %.1fs", time.perf_counter() - started)
+
+    def fill(self, connection, rows, now, rng):
+        """
+        Inserts rows with every question answered, so the table is as wide as
+        the real one. Only the filtered columns vary from row to row.
+        """
+        started = time.perf_counter()
+        specs = schema.field_specs()
+        columns = [name for name in specs if name not in ("q1", "q8", "q12")]
+        templates = [
+            [self.random_answer(specs[name], rng) for name in columns]
+            for _ in range(97)
+        ]
+        ages = specs["q1"].codes
+        parks = specs["q12"].codes
+        adapt = connection.ops.adapt_datetimefield_value
+
+        table = connection.ops.quote_name(self.model._meta.db_table)
+        names = ", ".join(
+            connection.ops.quote_name(name)
+            for name in ["q1", "q8", "q12", "submitted_at", *columns]
+        )
+        sql = (
+            f"INSERT INTO {table} ({names}) "
+            f"VALUES ({', '.join(['%s'] * (len(columns) + 4))})"
+        )
+        with transaction.atomic(using=ALIAS), connection.cursor() as cursor:
+            for start in range(0, rows, INSERT_BATCH_SIZE):
+                batch = []
+                for i in range(start, min(rows, start + INSERT_BATCH_SIZE)):
+                    submitted = now - timedelta(seconds=rng.randrange(120 * 86400))
+                    batch.append(
+                        [
+                            rng.choice(ages),
+                            "Y" if rng.random() < 0.8 else "N",
+                            ",".join(rng.sample(parks, rng.randint(1, 4))),
+                            adapt(submitted),
+                            *templates[i % len(templates)],
+                        ]
+                    )
+                cursor.executemany(sql, batch)
+        logger.info("Inserted %s rows in %.1fs", rows, time.perf_counter() - started)
+
+    def random_answer(self, spec, rng):
+        match spec.kind:
+            case schema.RADIO:
+                return rng.choice(spec.codes)
+            case schema.CHECKBOX:
+                return ",".join(rng.sample(spec.codes, rng.randint(1, 3)))
+            case schema.INTEGER:
+                return rng.randint(0, 10)
+            case _:
+                return "Lorem ipsum dolor sit amet"
+
+    def get_cases(self, now):
+        month = now - timedelta(days=30)
+        week = now - timedelta(days=7)
+        return [
+            ("age", {"ages": ["3"]}),
+            ("resident", {"resident": "N"}),
+            ("park", {"parks": ["Z"]}),
+            ("last_week", {"since": week}),
+            ("age_resident_month", {"ages": ["2", "3"], "resident": "Y", "since": month}),
+            ("park_age_month", {"parks": ["Z", "B"], "ages": ["4"], "since": month}),
+        ]
+
+    def run_cases(self, cases, repeat, indexed):
+        results = {}
+        for name, filters in cases:
+            filters = {**filters, "using": ALIAS}
+            parks = filters.pop("parks", None)
+            best = None
+            for _ in range(repeat):
+                started = time.perf_counter()
+                if parks and not indexed:
+                    total = scan_parks(queries.responses(**filters), parks).count()
+                else:
+                    total = queries.count(parks=parks, **filters)
+                elapsed = (time.perf_counter() - started) * 1000
+                best = elapsed if best is None else min(best, elapsed)
+            results[name] = (total, best)
+        return results
@@ -0,0 +1,267 @@
+import io
+import json
+import logging
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+import tracemalloc
+
+import django
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Model
+from django.template.loader import render_to_string
+from django.test import RequestFactory
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.utils import timezone
+from survey import (
+    bulk,
+    canonical,
+    export,
+    fingerprint,
+    forms,
+    geocode,
+    models,
+    schema,
+    synthetic,
+)
+
+logger = logging.getLogger(__name__)
+
+TEMPLATE = "survey/national_park.html"
+
+
+def timed(run, repeat, setup=None):
+    """
+    Runs run(setup()) repeat times and returns the times in ms, only run is timed.
+    """
+    times = []
+    for _ in range(repeat):
+        value = setup() if setup else None
+        started = time.perf_counter()
+        run(value)
+        times.append((time.perf_counter() - started) * 1000)
+    return times
+
+
+class Command(BaseCommand):
+    help = "Command to benchmark the survey form, page, save and export."
+    model = models.NationalParkSatisfactionBehavior
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=1000, help="Rows to export.")
+        parser.add_argument("--repeat", type=int, default=20)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--workers",
+            type=int,
+            nargs="*",
+            default=[],
+            help="Also time export_survey --workers with each of these counts.",
+        )
+        parser.add_argument("--output", help="Write the JSON here instead of stdout.")
+        parser.add_argument(
+            "--baseline", help="JSON from an earlier run to compare against."
+        )
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0)
+        try:
+            results = self.run(options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        report = {
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "machine": platform.machine(),
+            "rows": options["rows"],
+            "repeat": options["repeat"],
+            "results": results,
+        }
+        if options["baseline"]:
+            self.compare(results, options["baseline"])
+
+        output = json.dumps(report, indent=2)
+        if options["output"]:
+            with open(options["output"], mode="w") as file:
+                file.write(output + "\n")
+        else:
+            self.stdout.write(output)
+
+    def run(self, options):
+        repeat = options["repeat"]
+        rng = random.Random(options["seed"])
+        form_class = forms.NationalParkSatisfactionBehaviorForm
+        request = RequestFactory().get("/park/survey")
+        payloads = [
+            synthetic.form_data(synthetic.answers(rng)) for _ in range(repeat)
+        ]
+        payload = iter(payloads * 3)
+
+        def bound():
+            return form_class(data=next(payload))
+
+        def validated():
+            form = bound()
+            form.is_valid()
+            return form
+
+        # Build and render once first so template and form caches are warm
+        render_to_string(TEMPLATE, {"form": form_class()}, request)
+
+        cases = {
+            "form_construct": timed(lambda _: form_class(), repeat),
+            "render_unbound": timed(
+                lambda form: render_to_string(TEMPLATE, {"form": form}, request),
+                repeat,
+                form_class,
+            ),
+            "render_bound": timed(
+                lambda form: render_to_string(TEMPLATE, {"form": form}, request),
+                repeat,
+                validated,
+            ),
+            "is_valid": timed(lambda form: form.is_valid(), repeat, bound),
+            "form_save": timed(lambda form: form.save(), repeat, validated),
+        }
+
+        def unsaved():
+            return self.model(**synthetic.answers(rng), submitted_at=timezone.now())
+
+        def save(response, model_save=self.model.save):
+            # Like the views, one transaction per response
+            with transaction.atomic():
+                model_save(response)
+
+        # What save() adds to a submission: the derived columns are worked out
+        # in the request, and the q12 places are written with the response
+        cases["derived_columns"] = timed(self.fill_derived, repeat, unsaved)
+        cases["save"] = timed(save, repeat, unsaved)
+        cases["save_without_derived"] = timed(
+            lambda response: save(response, Model.save),
+            repeat,
+            unsaved,
+        )
+
+        response = self.model.objects.first()
+        checkbox_fields = [
+            self.model._meta.get_field(name)
+            for name, spec in schema.field_specs().items()
+            if spec.kind == schema.CHECKBOX
+        ]
+        cases["display_custom"] = timed(
+            lambda _: [
+                response._get_FIELD_display_custom(field) for field in checkbox_fields
+            ],
+            repeat,
+        )
+
+        results = [self.summarize(name, times) for name, times in cases.items()]
+        results.append(self.run_export(options["rows"], rng))
+        results.extend(
+            self.run_export(options["rows"], rng, workers)
+            for workers in options["workers"]
+        )
+        results.extend(self.run_bulk_read())
+        return results
+
+    def fill_derived(self, response):
+        canonical.fill_codes(response)
+        geocode.fill_location(response)
+        fingerprint.fill_hash(response)
+
+    def run_export(self, rows, rng, workers=1):
+        existing = self.model.objects.count()
+        missing = max(0, rows - existing)
+        self.model.objects.bulk_create(
+            (self.model(**synthetic.answers(rng)) for _ in range(missing)),
+            batch_size=500,
+        )
+        rows = self.model.objects.count()
+
+        descriptor, path = tempfile.mkstemp(suffix=".csv")
+        os.close(descriptor)
+        try:
+            started = time.perf_counter()
+            call_command(
+                "export_survey",
+                f"--workers={workers}",
+                output=path,
+                stdout=io.StringIO(),
+            )
+            elapsed = time.perf_counter() - started
+        finally:
+            for leftover in (path, export.manifest_path(path)):
+                if os.path.exists(leftover):
+                    os.unlink(leftover)
+
+        name = "export" if workers == 1 else f"export_workers_{workers}"
+        result = self.summarize(name, [elapsed * 1000])
+        result["rows"] = rows
+        result["rows_per_second"] = round(rows / elapsed, 1)
+        return result
+
+    def run_bulk_read(self):
+        """
+        Reads every row as model instances and as bulk tuples of the exported
+        columns, timing each and tracing the memory they take.
+        """
+        queryset = self.model.objects.order_by("pk")
+        readers = {
+            "read_instances": lambda: queryset.iterator(chunk_size=export.CHUNK_SIZE),
+            "read_tuples": lambda: bulk.rows(export.DATA_COLUMNS, queryset),
+        }
+        rows = queryset.count()
+        results = []
+        for name, read in readers.items():
+            started = time.perf_counter()
+            for _ in read():
+                pass
+            elapsed = time.perf_counter() - started
+            # Traced on a second pass, tracemalloc slows everything down. The
+            # rows are kept, like an analysis holding a season in memory would
+            tracemalloc.start()
+            kept = list(read())
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            del kept
+
+            result = self.summarize(name, [elapsed * 1000])
+            result["rows"] = rows
+            result["ms_per_100k_rows"] = round(
+                elapsed * 1000 * 100_000 / max(1, rows), 1
+            )
+            result["peak_mb_per_100k_rows"] = round(
+                peak / 1024 / 1024 * 100_000 / max(1, rows), 1
+            )
+            results.append(result)
+        return results
+
+    def summarize(self, name, times):
+        return {
+            "name": name,
+            "runs": len(times),
+            "min_ms": round(min(times), 3),
+            "median_ms": round(statistics.median(times), 3),
+            "mean_ms": round(statistics.fmean(times), 3),
+            "max_ms": round(max(times), 3),
+        }
+
+    def compare(self, results, path):
+        with open(path) as file:
+            baseline = {result["name"]: result for result in json.load(file)["results"]}
+        for result in results:
+            old = baseline.get(result["name"])
+            if old is None or not old["median_ms"]:
+                continue
+            result["baseline_median_ms"] = old["median_ms"]
+            result["change"] = round(result["median_ms"] / old["median_ms"] - 1, 3)
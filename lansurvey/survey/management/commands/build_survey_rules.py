@@ -0,0 +1,52 @@
+import json
+import logging
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from survey import rules
+
+logger = logging.getLogger(__name__)
+
+HEADER = "// Generated by `python3 manage.py build_survey_rules`, do not edit.\n"
+
+
+class Command(BaseCommand):
+    help = "Command to build the client side survey rules bundle."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--output",
+            default=str(settings.BASE_DIR / "static" / "js" / "survey-rules.js"),
+            help="Where to write the bundle.",
+        )
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="Fail if the bundle on disk is out of date instead of writing it.",
+        )
+
+    def handle(self, *args, **options):
+        bundle = (
+            HEADER
+            + "window.SURVEY_RULES = "
+            + json.dumps(rules.compile_rules(), separators=(",", ":"))
+            + ";\n"
+        )
+
+        if options["check"]:
+            try:
+                with open(options["output"], mode="r") as file:
+                    current = file.read()
+            except FileNotFoundError:
+                current = ""
+            if current != bundle:
+                raise CommandError(
+                    f"{options['output']} is out of date, run build_survey_rules."
+                )
+            return
+
+        with open(options["output"], mode="w") as file:
+            file.write(bundle)
+        self.stdout.write(
+            f"Wrote rules {rules.compile_rules()['version']} to {options['output']}"
+        )
@@ -0,0 +1,62 @@
+import csv
+import logging
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from survey import geocode
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Command to build the offline ZIP code index from a postal code table."
+
+    def add_arguments(self, parser):
+        parser.add_argument("source", help="Postal code file to read.")
+        parser.add_argument(
+            "--format",
+            choices=["csv", "geonames"],
+            default="csv",
+            help=(
+                "csv has zip, latitude, longitude, county and state columns. "
+                "geonames is the tab separated US.txt from the GeoNames postal code dump."
+            ),
+        )
+        parser.add_argument("--output", default=str(settings.SURVEY_ZIP_INDEX))
+
+    def handle(self, *args, **options):
+        with open(options["source"], mode="r", newline="", encoding="utf-8") as file:
+            match options["format"]:
+                case "geonames":
+                    rows = self.read_geonames(file)
+                case _:
+                    rows = self.read_csv(file)
+
+            os.makedirs(os.path.dirname(options["output"]) or ".", exist_ok=True)
+            try:
+                count = geocode.build_index(rows, options["output"])
+            except (KeyError, ValueError) as e:
+                raise CommandError(f"Could not read {options['source']}: {e}")
+
+        self.stdout.write(f"Wrote {count} ZIP codes to {options['output']}")
+
+    def read_csv(self, file):
+        for row in csv.DictReader(file):
+            if not row["zip"].strip().isdigit():
+                continue
+            yield (
+                row["zip"],
+                row["latitude"],
+                row["longitude"],
+                row["county"],
+                row["state"],
+            )
+
+    def read_geonames(self, file):
+        # country, postal code, place, state, state code, county, county code,
+        # community, community code, latitude, longitude, accuracy
+        for row in csv.reader(file, delimiter="\t"):
+            if len(row) < 11 or not row[1].isdigit():
+                continue
+            yield row[1], row[9], row[10], row[5], row[4]
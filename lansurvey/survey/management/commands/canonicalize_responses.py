@@ -0,0 +1,70 @@
+import logging
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from survey import canonical, models
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Command to fill in the canonical country and state codes."
+    model = models.NationalParkSatisfactionBehavior
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="Redo every response, not just the ones without codes.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=5000,
+            help="Responses updated per transaction, submissions wait while one "
+            "is written.",
+        )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        queryset = self.model.objects.all()
+        if not options["all"]:
+            queryset = queryset.filter(country_code__isnull=True, state_code__isnull=True)
+        # Read everything first so the updates don't race the open select
+        rows = list(
+            queryset.values_list("id", "q9", "q10_1", "country_code", "state_code")
+        )
+
+        table = connection.ops.quote_name(self.model._meta.db_table)
+        sql = f"UPDATE {table} SET country_code = %s, state_code = %s WHERE id = %s"
+
+        seen = changed = 0
+        updates = []
+
+        def write():
+            # Each batch commits on its own, so the write lock is only held
+            # for one batch at a time
+            nonlocal changed, updates
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.executemany(sql, updates)
+            changed += len(updates)
+            updates = []
+
+        for pk, country, state, old_country, old_state in rows:
+            seen += 1
+            codes = (canonical.country_code(country), canonical.state_code(state))
+            if codes == (old_country, old_state):
+                continue
+            updates.append((*codes, pk))
+            if len(updates) >= options["batch_size"]:
+                write()
+        if updates:
+            write()
+
+        self.stdout.write(
+            f"Checked {seen} responses, updated {changed} "
+            f"in {time.perf_counter() - started:.2f}s "
+            f"(fuzzy cache {canonical.country_code.fuzzy.cache_info().currsize} "
+            f"countries, {canonical.state_code.fuzzy.cache_info().currsize} states)"
+        )
@@ -0,0 +1,61 @@
+import logging
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from survey import models
+
+logger = logging.getLogger(__name__)
+
+# Read by merge_responses to name the device and check for gaps
+DELTA_TABLE = "survey_delta"
+
+
+class Command(BaseCommand):
+    help = "Command to write the responses after an id to a small SQLite file."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--after-id",
+            type=int,
+            default=0,
+            help="The id merge_responses says this device was merged up to.",
+        )
+        parser.add_argument(
+            "--output", help="Defaults to <SURVEY_DEVICE>-delta.sqlite3."
+        )
+
+    def handle(self, *args, **options):
+        output = options["output"] or f"{settings.SURVEY_DEVICE}-delta.sqlite3"
+        if os.path.exists(output):
+            raise CommandError(f"{output} already exists.")
+        table = connection.ops.quote_name(
+            models.NationalParkSatisfactionBehavior._meta.db_table
+        )
+
+        with connection.cursor() as cursor:
+            cursor.execute("ATTACH DATABASE %s AS delta", [output])
+            try:
+                cursor.execute(
+                    f"CREATE TABLE delta.{table} AS "
+                    f"SELECT * FROM main.{table} WHERE id > %s ORDER BY id",
+                    [options["after_id"]],
+                )
+                cursor.execute(f"SELECT count(*) FROM delta.{table}")
+                count = cursor.fetchone()[0]
+                cursor.execute(
+                    f"CREATE TABLE delta.{DELTA_TABLE} (device TEXT, after_id INTEGER)"
+                )
+                cursor.execute(
+                    f"INSERT INTO delta.{DELTA_TABLE} VALUES (%s, %s)",
+                    [settings.SURVEY_DEVICE, options["after_id"]],
+                )
+            finally:
+                cursor.execute("DETACH DATABASE delta")
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Wrote {count} responses after id {options['after_id']} to {output}"
+            )
+        )
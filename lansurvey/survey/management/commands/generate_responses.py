@@ -0,0 +1,116 @@
+import logging
+import random
+import time
+from datetime import datetime, timedelta, timezone
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connection, connections, transaction
+from survey import canonical, fingerprint, geocode, models, synthetic
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Command to fill the database with synthetic survey responses."
+    model = models.NationalParkSatisfactionBehavior
+
+    def add_arguments(self, parser):
+        parser.add_argument("count", type=int, help="Number of responses to add.")
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--batch-size", type=int, default=1000, help="Responses per executemany."
+        )
+        parser.add_argument(
+            "--transaction-size",
+            type=int,
+            default=100_000,
+            help="Responses per transaction, bigger is faster but holds the lock longer.",
+        )
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=120,
+            help="Spread the submission times over this many days back from now.",
+        )
+
+    def handle(self, *args, **options):
+        if options["count"] < 1 or options["batch_size"] < 1:
+            raise CommandError("count and --batch-size must be positive.")
+        rng = random.Random(options["seed"])
+        now = datetime.now(timezone.utc)
+        seconds = options["days"] * 86400
+        count = options["count"]
+
+        fields = self.model._meta.concrete_fields
+        response_sql = self.insert_sql(self.model, [field.column for field in fields])
+        place_sql = self.insert_sql(models.ResponsePlace, ["response_id", "code"])
+
+        started = time.perf_counter()
+        done = 0
+        while done < count:
+            chunk = min(options["transaction_size"], count - done)
+            with transaction.atomic(), connection.cursor() as cursor:
+                # The ids are given out here, so the places can refer to them.
+                # Another writer taking one first fails the insert.
+                cursor.execute(f"SELECT max(id) FROM {self.model._meta.db_table}")
+                next_id = (cursor.fetchone()[0] or 0) + 1
+                for start in range(0, chunk, options["batch_size"]):
+                    size = min(options["batch_size"], chunk - start)
+                    responses = [self.build(rng, now, seconds) for _ in range(size)]
+                    for response in responses:
+                        response.pk = next_id
+                        next_id += 1
+                    cursor.executemany(
+                        response_sql,
+                        [self.values(fields, response) for response in responses],
+                    )
+                    cursor.executemany(
+                        place_sql,
+                        [
+                            (response.pk, code)
+                            for response in responses
+                            for code in dict.fromkeys(response.q12 or [])
+                            if code
+                        ],
+                    )
+            done += chunk
+            elapsed = time.perf_counter() - started
+            self.stdout.write(
+                f"{done}/{count} responses, {done / elapsed:.0f} per second"
+            )
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Added {count} responses in {time.perf_counter() - started:.1f}s"
+            )
+        )
+
+    def insert_sql(self, model, columns):
+        # One row per statement with executemany. bulk_create fits only a few
+        # responses into SQLite's 999 parameters and builds the SQL every time.
+        quote = connection.ops.quote_name
+        return (
+            f"INSERT INTO {quote(model._meta.db_table)} "
+            f"({', '.join(quote(column) for column in columns)}) "
+            f"VALUES ({', '.join(['%s'] * len(columns))})"
+        )
+
+    def values(self, fields, response):
+        # The connection itself, the django.db.connection proxy is slow in a
+        # loop over every field of every row.
+        db = connections[DEFAULT_DB_ALIAS]
+        return [
+            field.get_db_prep_save(getattr(response, field.attname), db)
+            for field in fields
+        ]
+
+    def build(self, rng, now, seconds):
+        # The inserts skip save(), so fill in what it would have
+        response = self.model(
+            **synthetic.answers(rng),
+            submitted_at=now - timedelta(seconds=rng.randrange(seconds)),
+        )
+        canonical.fill_codes(response)
+        geocode.fill_location(response)
+        fingerprint.fill_hash(response)
+        return response
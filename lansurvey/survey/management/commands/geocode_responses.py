@@ -0,0 +1,78 @@
+import logging
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from survey import geocode, models
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Command to add ZIP code locations to the responses and report distances."
+    model = models.NationalParkSatisfactionBehavior
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="Redo every response, not just the ones without a location.",
+        )
+        parser.add_argument(
+            "--distance",
+            action="append",
+            choices=sorted(geocode.PARK_LOCATIONS),
+            help="Print distance travelled to this q12 place, can be given more than once.",
+        )
+        parser.add_argument("--batch-size", type=int, default=5000)
+
+    def handle(self, *args, **options):
+        index = geocode.get_index()
+        if index is None:
+            raise CommandError("No ZIP index, build one with build_zip_index first.")
+
+        started = time.perf_counter()
+        queryset = self.model.objects.filter(q10_2__isnull=False)
+        if not options["all"]:
+            queryset = queryset.filter(origin_latitude__isnull=True)
+        rows = list(queryset.values_list("id", "q10_2"))
+        locations = index.geocode(zip_code for _, zip_code in rows)
+
+        table = connection.ops.quote_name(self.model._meta.db_table)
+        sql = (
+            f"UPDATE {table} SET origin_latitude = %s, origin_longitude = %s, "
+            "origin_county = %s, origin_state = %s WHERE id = %s"
+        )
+        updates = [
+            (
+                location.latitude,
+                location.longitude,
+                location.county,
+                location.state,
+                pk,
+            )
+            for pk, zip_code in rows
+            if (location := locations.get(zip_code)) is not None
+        ]
+        with transaction.atomic(), connection.cursor() as cursor:
+            for start in range(0, len(updates), options["batch_size"]):
+                cursor.executemany(sql, updates[start : start + options["batch_size"]])
+
+        self.stdout.write(
+            f"Geocoded {len(updates)} of {len(rows)} responses "
+            f"in {time.perf_counter() - started:.2f}s"
+        )
+
+        for park in options["distance"] or []:
+            visited = self.model.objects.filter(places__code=park)
+            distances = sorted(geocode.distances_to_park(park, visited).values())
+            if not distances:
+                self.stdout.write(f"{park}: no geocoded responses")
+                continue
+            self.stdout.write(
+                f"{park}: {len(distances)} responses, "
+                f"median {statistics.median(distances):.0f} km, "
+                f"mean {statistics.fmean(distances):.0f} km, "
+                f"90th percentile {distances[int(len(distances) * 0.9)]:.0f} km"
+            )
@@ -0,0 +1,127 @@
+import json
+import logging
+import os
+import statistics
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+logger = logging.getLogger(__name__)
+
+# What a gunicorn worker does before its first request. ru_maxrss survives exec
+# on Linux, so it would include this process, VmHWM is the child's own peak.
+BOOT = """
+import resource, time
+started = time.perf_counter()
+from django.core.wsgi import get_wsgi_application
+get_wsgi_application()
+from django.urls import get_resolver
+get_resolver().url_patterns
+elapsed = time.perf_counter() - started
+try:
+    with open("/proc/self/status") as status:
+        peak = next(line for line in status if line.startswith("VmHWM:")).split()[1]
+except (OSError, StopIteration):
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(elapsed, peak)
+"""
+
+
+def parse_importtime(text):
+    """
+    Returns a list of (module, self us, cumulative us, depth) from -X importtime output.
+    """
+    modules = []
+    for line in text.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        modules.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return modules
+
+
+class Command(BaseCommand):
+    help = "Command to report the import time and memory of booting a worker."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--compare",
+            nargs="*",
+            default=[],
+            metavar="SETTINGS",
+            help="Other settings modules to boot, like lansurvey.settings_field.",
+        )
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument("--top", type=int, default=15)
+        parser.add_argument(
+            "--json", action="store_true", help="Print the results as JSON."
+        )
+
+    def handle(self, *args, **options):
+        if options["repeat"] < 1:
+            raise CommandError("--repeat must be at least 1.")
+        profiles = [settings.SETTINGS_MODULE, *options["compare"]]
+        reports = [self.profile(module, options) for module in profiles]
+
+        if options["json"]:
+            self.stdout.write(json.dumps(reports))
+            return
+
+        for report in reports:
+            self.stdout.write(
+                f"{report['settings']}: {report['boot_ms']:.0f} ms boot, "
+                f"{report['imports_ms']:.0f} ms imports, "
+                f"{report['modules']} modules, {report['max_rss_kb'] / 1024:.1f} MB"
+            )
+            for module in report["top"]:
+                self.stdout.write(
+                    f"  {module['cumulative_ms']:>8.1f} ms  {module['module']}"
+                )
+        base = reports[0]
+        for report in reports[1:]:
+            extra = set(base["module_names"]) - set(report["module_names"])
+            self.stdout.write(
+                f"{report['settings']} vs {base['settings']}: "
+                f"{report['boot_ms'] - base['boot_ms']:+.0f} ms, "
+                f"{(report['max_rss_kb'] - base['max_rss_kb']) / 1024:+.1f} MB, "
+                f"{len(extra)} fewer modules"
+            )
+
+    def boot(self, module, *flags):
+        result = subprocess.run(
+            [sys.executable, *flags, "-c", BOOT],
+            env={**os.environ, "DJANGO_SETTINGS_MODULE": module},
+            cwd=settings.BASE_DIR,
+            capture_output=True,
+            text=True,
+        )
+        if result.returncode:
+            raise CommandError(f"{module} failed to boot:\n{result.stderr}")
+        elapsed, max_rss = result.stdout.split()
+        return float(elapsed), int(max_rss), result.stderr
+
+    def profile(self, module, options):
+        """
+        Boots fresh interpreters and keeps the median time and memory. The
+        import tree comes from a separate -X importtime run, which is slower.
+        """
+        runs = [self.boot(module) for _ in range(options["repeat"])]
+        modules = parse_importtime(self.boot(module, "-X", "importtime")[2])
+        top = sorted(
+            (m for m in modules if m[3] == 0), key=lambda m: m[2], reverse=True
+        )
+        return {
+            "settings": module,
+            "boot_ms": round(statistics.median(run[0] for run in runs) * 1000, 1),
+            "imports_ms": round(sum(m[1] for m in modules) / 1000, 1),
+            "modules": len(modules),
+            "max_rss_kb": statistics.median(run[1] for run in runs),
+            "top": [
+                {"module": name, "cumulative_ms": round(cumulative / 1000, 1)}
+                for name, _, cumulative, _ in top[: options["top"]]
+            ],
+            "module_names": sorted(m[0] for m in modules),
+        }
@@ -0,0 +1,282 @@
+import asyncio
+import json
+import logging
+import random
+import re
+import time
+from http.cookies import SimpleCookie
+from urllib.parse import urlencode, urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+from survey import synthetic
+
+logger = logging.getLogger(__name__)
+
+CSRF_INPUT = re.compile(rb'name="csrfmiddlewaretoken" value="([^"]+)"')
+TOKEN_INPUT = re.compile(rb'name="submission_token" value="([^"]+)"')
+STEPS = ("get", "post")
+
+
+def percentile(values, fraction):
+    """
+    Nearest rank percentile of a sorted list.
+    """
+    if not values:
+        return None
+    index = min(len(values) - 1, max(0, round(fraction * len(values)) - 1))
+    return round(values[index], 1)
+
+
+class Shaper:
+    """
+    Adds a fixed latency and a bandwidth limit to every request, like a tablet
+    at the far end of the hotspot.
+    """
+
+    def __init__(self, latency_ms=0, kbit=0):
+        self.latency = latency_ms / 1000
+        self.bytes_per_second = kbit * 1000 / 8
+
+    async def transfer(self, size, elapsed=0.0):
+        delay = self.latency
+        if self.bytes_per_second:
+            delay += size / self.bytes_per_second
+        if delay > elapsed:
+            await asyncio.sleep(delay - elapsed)
+
+
+class Client:
+    """
+    A very small HTTP/1.1 client, one connection per request, with cookies.
+    """
+
+    def __init__(self, url, unix_socket, shaper):
+        parts = urlsplit(url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.netloc = parts.netloc
+        self.unix_socket = unix_socket
+        self.shaper = shaper
+        self.cookies = {}
+
+    async def request(self, method, path, body=b"", headers=None):
+        if self.unix_socket:
+            reader, writer = await asyncio.open_unix_connection(self.unix_socket)
+        else:
+            reader, writer = await asyncio.open_connection(self.host, self.port)
+        lines = [
+            f"{method} {path} HTTP/1.1",
+            f"Host: {self.netloc}",
+            "Connection: close",
+            "User-Agent: lansurvey-load-test",
+        ]
+        if self.cookies:
+            lines.append(
+                "Cookie: " + "; ".join(f"{k}={v}" for k, v in self.cookies.items())
+            )
+        for name, value in (headers or {}).items():
+            lines.append(f"{name}: {value}")
+        if body:
+            lines.append(f"Content-Length: {len(body)}")
+        request = ("\r\n".join(lines) + "\r\n\r\n").encode() + body
+
+        await self.shaper.transfer(len(request))
+        writer.write(request)
+        await writer.drain()
+        started = time.perf_counter()
+        raw = await reader.read()
+        writer.close()
+        await self.shaper.transfer(len(raw), time.perf_counter() - started)
+        return self.parse(raw)
+
+    def parse(self, raw):
+        head, _, body = raw.partition(b"\r\n\r\n")
+        status_line, *header_lines = head.decode("latin-1").split("\r\n")
+        status = int(status_line.split()[1])
+        headers = {}
+        for line in header_lines:
+            name, _, value = line.partition(":")
+            name, value = name.strip().lower(), value.strip()
+            if name == "set-cookie":
+                cookie = SimpleCookie(value)
+                for key, morsel in cookie.items():
+                    self.cookies[key] = morsel.value
+            headers[name] = value
+        if headers.get("transfer-encoding") == "chunked":
+            body = self.unchunk(body)
+        return status, headers, body
+
+    def unchunk(self, body):
+        chunks = []
+        while body:
+            size, _, body = body.partition(b"\r\n")
+            size = int(size.split(b";")[0], 16)
+            if size == 0:
+                break
+            chunks.append(body[:size])
+            body = body[size + 2 :]
+        return b"".join(chunks)
+
+
+class Command(BaseCommand):
+    help = "Command to load test a running survey server with simulated tablets."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--url", default="http://127.0.0.1")
+        parser.add_argument(
+            "--unix-socket", help="Connect to gunicorn's socket instead of --url."
+        )
+        parser.add_argument("--path", default="/park/survey")
+        parser.add_argument("--clients", type=int, default=10)
+        parser.add_argument(
+            "--sessions", type=int, default=5, help="Surveys per client."
+        )
+        parser.add_argument(
+            "--duration",
+            type=float,
+            help="Stop starting new surveys after this many seconds.",
+        )
+        parser.add_argument(
+            "--think", type=float, default=5.0, help="Mean seconds spent answering."
+        )
+        parser.add_argument("--latency", type=float, default=0, help="Added ms.")
+        parser.add_argument("--bandwidth", type=float, default=0, help="kbit/s.")
+        parser.add_argument("--timeout", type=float, default=30)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--json", action="store_true", help="Print the results as JSON."
+        )
+
+    def handle(self, *args, **options):
+        if options["clients"] < 1:
+            raise CommandError("--clients must be at least 1.")
+        self.options = options
+        self.shaper = Shaper(options["latency"], options["bandwidth"])
+        self.results = {step: [] for step in STEPS}
+        self.attempts = {step: 0 for step in STEPS}
+        self.errors = {step: {} for step in STEPS}
+        self.sessions = 0
+
+        started = time.perf_counter()
+        asyncio.run(self.run())
+        elapsed = time.perf_counter() - started
+
+        report = self.report(elapsed)
+        if options["json"]:
+            self.stdout.write(json.dumps(report))
+            return
+
+        self.stdout.write(
+            f"{options['clients']} clients, {report['sessions']} surveys in "
+            f"{elapsed:.1f}s ({report['sessions_per_second']}/s)"
+        )
+        self.stdout.write(
+            f"{'step':<6}{'count':>7}{'errors':>8}{'p50 ms':>9}{'p95 ms':>9}"
+            f"{'p99 ms':>9}{'max ms':>9}"
+        )
+        for step in STEPS:
+            result = report["steps"][step]
+            self.stdout.write(
+                f"{step:<6}{result['count']:>7}{result['error_rate']:>8.1%}"
+                + "".join(
+                    f"{result[key] if result[key] is not None else '-':>9}"
+                    for key in ("p50_ms", "p95_ms", "p99_ms", "max_ms")
+                )
+            )
+            for error, count in result["errors"].items():
+                self.stdout.write(f"      {error}: {count}")
+
+    async def run(self):
+        options = self.options
+        deadline = None
+        if options["duration"]:
+            deadline = time.perf_counter() + options["duration"]
+        await asyncio.gather(
+            *(
+                self.client(random.Random(options["seed"] + i), deadline)
+                for i in range(options["clients"])
+            )
+        )
+
+    async def client(self, rng, deadline):
+        # Tablets don't all start at once
+        await asyncio.sleep(rng.uniform(0, self.options["think"]))
+        for _ in range(self.options["sessions"]):
+            if deadline and time.perf_counter() > deadline:
+                return
+            await self.session(rng)
+
+    async def session(self, rng):
+        options = self.options
+        client = Client(options["url"], options["unix_socket"], self.shaper)
+
+        response = await self.step("get", client.request("GET", options["path"]))
+        if response is None:
+            return
+        match = CSRF_INPUT.search(response[2])
+        if match is None:
+            self.error("get", "no csrf token")
+            return
+
+        await asyncio.sleep(rng.expovariate(1 / options["think"]))
+
+        data = synthetic.form_data(synthetic.answers(rng))
+        data["csrfmiddlewaretoken"] = match.group(1).decode()
+        token = TOKEN_INPUT.search(response[2])
+        if token is not None:
+            data["submission_token"] = token.group(1).decode()
+        body = urlencode(data, doseq=True).encode()
+        headers = {
+            "Content-Type": "application/x-www-form-urlencoded",
+            "Referer": f"{options['url']}{options['path']}",
+        }
+        response = await self.step(
+            "post", client.request("POST", options["path"], body, headers)
+        )
+        if response is not None:
+            if response[0] == 200:
+                self.error("post", "form errors")
+            else:
+                self.sessions += 1
+
+    async def step(self, step, request):
+        self.attempts[step] += 1
+        started = time.perf_counter()
+        try:
+            response = await asyncio.wait_for(request, self.options["timeout"])
+        except asyncio.TimeoutError:
+            self.error(step, "timeout")
+            return None
+        except (OSError, ValueError, IndexError) as e:
+            self.error(step, type(e).__name__)
+            return None
+        self.results[step].append((time.perf_counter() - started) * 1000)
+        if response[0] >= 400:
+            self.error(step, f"HTTP {response[0]}")
+            return None
+        return response
+
+    def error(self, step, kind):
+        self.errors[step][kind] = self.errors[step].get(kind, 0) + 1
+
+    def report(self, elapsed):
+        steps = {}
+        for step in STEPS:
+            times = sorted(self.results[step])
+            errors = sum(self.errors[step].values())
+            steps[step] = {
+                "count": self.attempts[step],
+                "errors": self.errors[step],
+                "error_rate": round(errors / max(1, self.attempts[step]), 4),
+                "p50_ms": percentile(times, 0.5),
+                "p95_ms": percentile(times, 0.95),
+                "p99_ms": percentile(times, 0.99),
+                "max_ms": round(times[-1], 1) if times else None,
+            }
+        return {
+            "clients": self.options["clients"],
+            "sessions": self.sessions,
+            "seconds": round(elapsed, 3),
+            "sessions_per_second": round(self.sessions / elapsed, 2),
+            "steps": steps,
+        }
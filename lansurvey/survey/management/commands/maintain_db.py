@@ -0,0 +1,193 @@
+import logging
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.utils import timezone
+from survey import models
+
+logger = logging.getLogger(__name__)
+
+SESSION_TABLE = "django_session"
+
+
+class Command(BaseCommand):
+    help = "Command to analyze, vacuum and check the database in short steps."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--budget",
+            type=float,
+            default=60,
+            help="Seconds to spend, what's left over is done on the next run.",
+        )
+        parser.add_argument(
+            "--step-pages",
+            type=int,
+            default=256,
+            help="Free pages given back per incremental vacuum step.",
+        )
+        parser.add_argument(
+            "--session-batch",
+            type=int,
+            default=500,
+            help="Sessions or drafts deleted per step.",
+        )
+        parser.add_argument(
+            "--pause", type=float, default=0.05, help="Seconds between steps."
+        )
+        parser.add_argument(
+            "--enable-incremental-vacuum",
+            action="store_true",
+            help="Switch the file to incremental vacuum. This runs one full VACUUM, "
+            "which locks the database, stop gunicorn first.",
+        )
+
+    def handle(self, *args, **options):
+        self.connection = connections[DEFAULT_DB_ALIAS]
+        if self.connection.vendor != "sqlite":
+            raise CommandError("maintain_db only works with SQLite.")
+        self.options = options
+        self.deadline = time.monotonic() + options["budget"]
+        started = time.perf_counter()
+        size = self.size()
+
+        if options["enable_incremental_vacuum"]:
+            self.step("enable incremental vacuum", self.enable_incremental_vacuum)
+        self.step("purge expired sessions", self.purge_sessions)
+        self.step("purge abandoned drafts", self.purge_drafts)
+        self.step("analyze", self.analyze)
+        self.step("incremental vacuum", self.incremental_vacuum)
+        self.step("quick check", self.quick_check)
+
+        reclaimed = size - self.size()
+        message = (
+            f"Done in {time.perf_counter() - started:.1f}s, "
+            f"reclaimed {reclaimed / 1e6:.1f} MB, file is {self.size() / 1e6:.1f} MB"
+        )
+        logger.info(message)
+        self.stdout.write(self.style.SUCCESS(message))
+
+    def step(self, name, function):
+        if time.monotonic() > self.deadline:
+            message = f"{name}: skipped, out of time"
+        else:
+            started = time.perf_counter()
+            result = function()
+            message = f"{name}: {result} in {time.perf_counter() - started:.2f}s"
+        logger.info(message)
+        self.stdout.write(message)
+
+    def pragma(self, statement):
+        with self.connection.cursor() as cursor:
+            cursor.execute(f"PRAGMA {statement}")
+            return cursor.fetchall()
+
+    def size(self):
+        return self.pragma("page_count")[0][0] * self.pragma("page_size")[0][0]
+
+    def pause(self):
+        time.sleep(self.options["pause"])
+        return time.monotonic() < self.deadline
+
+    def enable_incremental_vacuum(self):
+        self.pragma("auto_vacuum = INCREMENTAL")
+        # Only takes effect on a rebuilt file
+        with self.connection.cursor() as cursor:
+            cursor.execute("VACUUM")
+        return f"auto_vacuum is {self.pragma('auto_vacuum')[0][0]}"
+
+    def purge_sessions(self):
+        """
+        Deletes expired database sessions a batch at a time, so a submission
+        never waits on one long delete.
+        """
+        with self.connection.cursor() as cursor:
+            tables = self.connection.introspection.table_names(cursor)
+        if SESSION_TABLE not in tables:
+            return "no session table"
+        deleted = 0
+        while True:
+            with self.connection.cursor() as cursor:
+                cursor.execute(
+                    f"DELETE FROM {SESSION_TABLE} WHERE session_key IN ("
+                    f"SELECT session_key FROM {SESSION_TABLE} "
+                    "WHERE expire_date < %s LIMIT %s)",
+                    [timezone.now(), self.options["session_batch"]],
+                )
+                deleted += cursor.rowcount
+            if cursor.rowcount < self.options["session_batch"] or not self.pause():
+                break
+        return f"deleted {deleted}"
+
+    def purge_drafts(self):
+        """
+        Deletes the autosaved drafts nobody came back to within a session's
+        lifetime, and those of submitted responses, a batch at a time like the
+        sessions.
+        """
+        cutoff = timezone.now() - timedelta(seconds=settings.SESSION_COOKIE_AGE)
+        abandoned = models.SurveyDraft.objects.filter(updated__lt=cutoff)
+        deleted = 0
+        while True:
+            batch = list(
+                abandoned.values_list("pk", flat=True)[: self.options["session_batch"]]
+            )
+            models.SurveyDraft.objects.filter(pk__in=batch).delete()
+            deleted += len(batch)
+            if len(batch) < self.options["session_batch"] or not self.pause():
+                break
+        return f"deleted {deleted}"
+
+    def analyze(self):
+        # SQLite 3.40's PRAGMA optimize only analyzes tables this connection
+        # has queried, so run ANALYZE with a row limit to keep it short instead
+        self.pragma("analysis_limit = 1000")
+        with self.connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+        self.pragma("optimize")
+        return "updated statistics"
+
+    def incremental_vacuum(self):
+        """
+        Gives free pages back to the file system a few at a time. Needs
+        auto_vacuum INCREMENTAL, see --enable-incremental-vacuum.
+        """
+        free = self.pragma("freelist_count")[0][0]
+        if self.pragma("auto_vacuum")[0][0] != 2:
+            return (
+                f"{free} free pages, auto_vacuum isn't incremental, "
+                "run once with --enable-incremental-vacuum"
+            )
+        freed = 0
+        while free:
+            # Each step of the statement frees one page, run it to the end
+            self.connection.ensure_connection()
+            self.connection.connection.executescript(
+                f"PRAGMA incremental_vacuum({self.options['step_pages']})"
+            )
+            left = self.pragma("freelist_count")[0][0]
+            freed += free - left
+            free = left
+            if not free or not self.pause():
+                break
+        return f"freed {freed} pages, {free} left"
+
+    def quick_check(self):
+        """
+        Checks one table at a time so the read lock is never held for long.
+        """
+        with self.connection.cursor() as cursor:
+            tables = self.connection.introspection.table_names(cursor)
+        checked = 0
+        for table in tables:
+            result = self.pragma(f'quick_check("{table}")')
+            problems = [row[0] for row in result if row[0] != "ok"]
+            if problems:
+                raise CommandError(f"quick_check failed on {table}: {problems[:10]}")
+            checked += 1
+            if not self.pause():
+                break
+        return f"{checked} of {len(tables)} tables ok"
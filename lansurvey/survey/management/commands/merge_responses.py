@@ -0,0 +1,198 @@
+import logging
+import time
+from itertools import islice
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from survey import archive, canonical, fingerprint, geocode, models
+from survey.management.commands.export_delta import DELTA_TABLE
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Command to merge the responses from other Pis' databases into this one."
+    model = models.NationalParkSatisfactionBehavior
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "sources",
+            nargs="+",
+            metavar="[DEVICE=]PATH",
+            help="Copies of db.sqlite3 or files from export_delta. The device "
+            "defaults to the name in the delta, or else the file name.",
+        )
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument(
+            "--transaction-size",
+            type=int,
+            default=100_000,
+            help="Responses per transaction, bigger is faster but holds the lock longer.",
+        )
+
+    def handle(self, *args, **options):
+        if options["batch_size"] < 1:
+            raise CommandError("--batch-size must be positive.")
+        self.options = options
+        self.fill_missing_hashes()
+        for source in options["sources"]:
+            device, _, path = source.rpartition("=")
+            if not Path(path).is_file():
+                raise CommandError(f"{path} doesn't exist.")
+            alias = f"merge-{path}"
+            connections.databases[alias] = {
+                **connections.databases[DEFAULT_DB_ALIAS],
+                "NAME": Path(path).resolve().as_uri() + "?mode=ro",
+            }
+            try:
+                self.merge(alias, device or None, path)
+            finally:
+                connections[alias].close()
+                del connections[alias]
+                del connections.databases[alias]
+
+    def fill_missing_hashes(self):
+        """
+        Hashes the responses saved before there was a content_hash, once.
+        """
+        missing = self.model.objects.filter(
+            content_hash__isnull=True, submitted_at__isnull=False
+        ).order_by("pk")
+        count = 0
+        with transaction.atomic():
+            for batch in self.batches(missing.iterator(self.options["batch_size"])):
+                for response in batch:
+                    fingerprint.fill_hash(response)
+                self.model.objects.bulk_update(batch, ["content_hash"])
+                count += len(batch)
+        if count:
+            self.stdout.write(f"Hashed {count} existing responses")
+
+    def merge(self, alias, device, path):
+        connection = connections[alias]
+        table = self.model._meta.db_table
+        with connection.cursor() as cursor:
+            tables = connection.introspection.table_names(cursor)
+            if table not in tables:
+                raise CommandError(f"{path} has no survey responses.")
+            after_id = None
+            if DELTA_TABLE in tables:
+                cursor.execute(f"SELECT device, after_id FROM {DELTA_TABLE}")
+                delta_device, after_id = cursor.fetchone()
+                device = device or delta_device
+            columns = {
+                column.name
+                for column in connection.introspection.get_table_description(
+                    cursor, table
+                )
+            }
+        device = device or Path(path).stem
+
+        progress, _ = models.MergeCursor.objects.get_or_create(device=device)
+        if after_id is not None and after_id > progress.last_id:
+            raise CommandError(
+                f"{path} starts after id {after_id}, but {device} is only merged up "
+                f"to {progress.last_id}. Export a delta with --after-id "
+                f"{progress.last_id}."
+            )
+        # Older snapshots may not have every field, the codes are filled below
+        fields = [
+            field.attname
+            for field in self.model._meta.concrete_fields
+            if field.column in columns
+        ]
+        rows = (
+            self.model.objects.using(alias)
+            .filter(pk__gt=progress.last_id)
+            .order_by("pk")
+            .values(*fields)
+            .iterator(self.options["batch_size"])
+        )
+
+        started = time.perf_counter()
+        merged = duplicates = 0
+        batches = self.batches(rows)
+        while True:
+            with transaction.atomic():
+                size = 0
+                for batch in batches:
+                    new = self.dedupe([self.build(device, row) for row in batch])
+                    self.model.objects.bulk_create(new)
+                    models.ResponsePlace.sync(new, replace=False)
+                    merged += len(new)
+                    duplicates += len(batch) - len(new)
+                    progress.merged += len(new)
+                    progress.duplicates += len(batch) - len(new)
+                    progress.last_id = batch[-1]["id"]
+                    size += len(batch)
+                    if size >= self.options["transaction_size"]:
+                        break
+                # Saved with the rows, so a failed merge picks up where it stopped
+                progress.save()
+            if size < self.options["transaction_size"]:
+                break
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{device}: merged {merged} responses, skipped {duplicates} "
+                f"duplicates, up to id {progress.last_id} in {elapsed:.1f}s"
+            )
+        )
+
+    def batches(self, rows):
+        rows = iter(rows)
+        while batch := list(islice(rows, self.options["batch_size"])):
+            yield batch
+
+    def build(self, device, row):
+        row = dict(row)
+        source_id = row.pop("id")
+        response = self.model(**row)
+        # Responses a device merged from another keep where they came from
+        if not response.source_device:
+            response.source_device = device
+            response.source_id = source_id
+        # bulk_create skips save(), so fill in what it would have
+        canonical.fill_codes(response)
+        geocode.fill_location(response)
+        fingerprint.fill_hash(response)
+        return response
+
+    def dedupe(self, responses):
+        """
+        Drops responses that are already here, by device and id or by content,
+        including the archived seasons. Responses without a hash, from before
+        there was a submission time, only by device and id.
+        """
+        # The default connection also sees this merge's earlier batches
+        aliases = [DEFAULT_DB_ALIAS]
+        if archive.exists():
+            aliases.append(archive.ALIAS)
+        new_hashes = [r.content_hash for r in responses if r.content_hash]
+        hashes = set()
+        sources = set()
+        for alias in aliases:
+            existing = self.model.objects.using(alias)
+            hashes.update(
+                existing.filter(content_hash__in=new_hashes).values_list(
+                    "content_hash", flat=True
+                )
+            )
+            sources.update(
+                existing.filter(
+                    source_device__in={r.source_device for r in responses},
+                    source_id__in=[r.source_id for r in responses],
+                ).values_list("source_device", "source_id")
+            )
+        new = []
+        for response in responses:
+            source = (response.source_device, response.source_id)
+            if response.content_hash in hashes or source in sources:
+                continue
+            if response.content_hash:
+                hashes.add(response.content_hash)
+            sources.add(source)
+            new.append(response)
+        return new
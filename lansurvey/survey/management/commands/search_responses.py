@@ -0,0 +1,61 @@
+import logging
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError
+from survey import search
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Command to search the open ended survey answers."
+
+    def add_arguments(self, parser):
+        parser.add_argument("term", nargs="?", help="Word or phrase, end with * for a prefix.")
+        parser.add_argument(
+            "--field",
+            action="append",
+            choices=search.SEARCH_FIELDS,
+            help="Only search this field, can be given more than once.",
+        )
+        parser.add_argument("--limit", type=int, default=50)
+        parser.add_argument(
+            "--count", action="store_true", help="Only print the number of matches."
+        )
+        parser.add_argument(
+            "--raw", action="store_true", help="Treat the term as an FTS5 query."
+        )
+        parser.add_argument(
+            "--rebuild",
+            action="store_true",
+            help="Recreate the search triggers if needed and reindex every response.",
+        )
+
+    def handle(self, *args, **options):
+        if options["rebuild"]:
+            search.install()
+            self.stdout.write("Rebuilt the search index.")
+            if not options["term"]:
+                return
+        if not options["term"]:
+            raise CommandError("Give a term to search for.")
+
+        try:
+            if options["count"]:
+                total = search.count(
+                    options["term"], fields=options["field"], raw=options["raw"]
+                )
+                self.stdout.write(str(total))
+                return
+
+            hits = search.search(
+                options["term"],
+                fields=options["field"],
+                limit=options["limit"],
+                raw=options["raw"],
+            )
+        except OperationalError as e:
+            raise CommandError(f"Search failed: {e}")
+
+        for hit in hits:
+            self.stdout.write(f"{hit.id}\t{hit.rank:.2f}\t{hit.snippet}")
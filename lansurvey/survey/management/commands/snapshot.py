@@ -0,0 +1,123 @@
+import logging
+import os
+import sqlite3
+import time
+from datetime import datetime
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+logger = logging.getLogger(__name__)
+
+
+class Restarted(Exception):
+    pass
+
+
+def backup(source, target, pages, pause):
+    """
+    Copies source into target a few pages at a time and returns the number of
+    steps and the pages per step it ended with.
+
+    Each step holds the read lock for a moment. A write from another
+    connection makes SQLite start the copy over, so when writes keep coming
+    the steps get bigger until one copy finishes before the next write.
+    """
+    steps = 0
+    last_remaining = None
+
+    def progress(status, remaining, total):
+        nonlocal steps, last_remaining
+        steps += 1
+        # Every step copies pages, so anything but less left is a restart
+        if last_remaining is not None and remaining >= last_remaining:
+            raise Restarted
+        last_remaining = remaining
+        if remaining:
+            time.sleep(pause)
+
+    while True:
+        try:
+            source.backup(target, pages=pages, progress=progress)
+            return steps, pages
+        except Restarted:
+            pages *= 4
+            last_remaining = None
+
+
+class Command(BaseCommand):
+    help = "Command to copy the database to a read only snapshot while it's in use."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "destination",
+            nargs="?",
+            default=".",
+            help="A file, or a directory like a USB stick to put a dated file in.",
+        )
+        parser.add_argument(
+            "--pages",
+            type=int,
+            default=256,
+            help="Pages copied per step, the database is only locked during a step.",
+        )
+        parser.add_argument(
+            "--pause",
+            type=float,
+            default=0.02,
+            help="Seconds between steps for the workers to write.",
+        )
+
+    def handle(self, *args, **options):
+        if options["pages"] < 1:
+            raise CommandError("--pages must be at least 1.")
+        connection = connections[DEFAULT_DB_ALIAS]
+        if connection.vendor != "sqlite":
+            raise CommandError("Snapshots only work with SQLite.")
+        source_path = Path(connection.settings_dict["NAME"]).resolve()
+
+        destination = Path(options["destination"])
+        if destination.is_dir():
+            stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+            destination = destination / f"{settings.SURVEY_DEVICE}-{stamp}.sqlite3"
+        if destination.exists():
+            raise CommandError(f"{destination} already exists.")
+        partial = destination.with_name(destination.name + ".part")
+
+        started = time.perf_counter()
+        source = sqlite3.connect(f"{source_path.as_uri()}?mode=ro", uri=True)
+        target = sqlite3.connect(partial)
+        try:
+            steps, pages = backup(source, target, options["pages"], options["pause"])
+            copied = time.perf_counter() - started
+
+            # Analysts open the snapshot directly, make it small and give the
+            # query planner statistics
+            target.execute("PRAGMA journal_mode=DELETE")
+            target.execute("VACUUM")
+            target.execute("ANALYZE")
+            result = target.execute("PRAGMA quick_check").fetchone()[0]
+            if result != "ok":
+                raise CommandError(f"The snapshot failed its check: {result}")
+        except BaseException:
+            target.close()
+            partial.unlink(missing_ok=True)
+            raise
+        finally:
+            source.close()
+        target.close()
+
+        with open(partial, "rb") as file:
+            os.fsync(file.fileno())
+        partial.chmod(0o444)
+        partial.rename(destination)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Wrote {destination} ({destination.stat().st_size / 1e6:.1f} MB) "
+                f"in {time.perf_counter() - started:.1f}s, copied in {steps} steps "
+                f"of up to {pages} pages over {copied:.1f}s"
+            )
+        )
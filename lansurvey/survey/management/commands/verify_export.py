@@ -0,0 +1,73 @@
+import csv
+import hashlib
+import io
+import json
+import logging
+
+from django.core.management.base import BaseCommand, CommandError
+from survey import export
+
+logger = logging.getLogger(__name__)
+
+READ_SIZE = 1024 * 1024
+
+
+class Command(BaseCommand):
+    help = "Command to check an exported file against its manifest."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="The exported file.")
+        parser.add_argument(
+            "--manifest", help="Defaults to the file's .manifest.json next to it."
+        )
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        try:
+            with open(options["manifest"] or export.manifest_path(path)) as file:
+                manifest = json.load(file)
+        except (OSError, ValueError) as e:
+            raise CommandError(f"Can't read the manifest: {e}")
+
+        digest = hashlib.sha256()
+        size = 0
+        with open(path, mode="rb") as file:
+            while block := file.read(READ_SIZE):
+                digest.update(block)
+                size += len(block)
+        # A copy that was decompressed after the transfer is checked against the CSV
+        found = (size, digest.hexdigest())
+        if found == (manifest["bytes"], manifest["sha256"]):
+            compress = manifest["compression"]
+        elif found == (manifest["csv_bytes"], manifest["csv_sha256"]):
+            compress = "none"
+        else:
+            raise CommandError(
+                f"{path} doesn't match its manifest: {size} bytes, sha256 "
+                f"{digest.hexdigest()}, expected {manifest['bytes']} bytes, "
+                f"sha256 {manifest['sha256']}."
+            )
+
+        rows = self.count_rows(path, compress)
+        if rows != manifest["rows"]:
+            raise CommandError(
+                f"{path} has {rows} responses, expected {manifest['rows']}."
+            )
+        if manifest["schema_version"] != export.schema_version():
+            self.stdout.write(
+                self.style.WARNING(
+                    f"Exported with schema {manifest['schema_version']}, this "
+                    f"version exports {export.schema_version()}."
+                )
+            )
+        self.stdout.write(self.style.SUCCESS(f"{path} is intact, {rows} responses"))
+
+    def count_rows(self, path, compress):
+        with open(path, mode="rb") as file:
+            try:
+                stream = export.decompressor(file, compress)
+            except ValueError as e:
+                raise CommandError(e)
+            text = io.TextIOWrapper(stream, encoding="utf-8", newline="")
+            # Minus the three header rows
+            return sum(1 for _ in csv.reader(text)) - 3
@@ -0,0 +1,313 @@
+"""
+Prometheus style metrics for the survey service.
+
+Every process keeps its metrics in memory. The gunicorn workers, and only
+they, see start(), also write them to their own file in SURVEY_METRICS_DIR
+at most once a second. The /metrics view adds the files up, so the numbers
+cover all the workers. Tests and management commands keep theirs to
+themselves.
+"""
+
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from django.conf import settings
+from django.db import OperationalError
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+WRITE_INTERVAL = 1.0
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = {}
+        self.lock = threading.Lock()
+        self.timer = None
+        self.last_write = 0.0
+        self.writing = False
+
+    def register(self, metric):
+        self.metrics[metric.name] = metric
+
+    def reset(self):
+        """
+        Forget the values, used in forked children so the parent's aren't counted twice.
+        """
+        self.lock = threading.Lock()
+        self.timer = None
+        self.writing = False
+        for metric in self.metrics.values():
+            metric.values = {}
+
+    def changed(self):
+        with self.lock:
+            if self.writing and self.timer is None:
+                delay = max(0.0, WRITE_INTERVAL - (time.monotonic() - self.last_write))
+                self.timer = threading.Timer(delay, self.write)
+                self.timer.daemon = True
+                self.timer.start()
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                name: {
+                    "kind": metric.kind,
+                    "help": metric.help,
+                    "buckets": getattr(metric, "buckets", None),
+                    "values": [
+                        [dict(labels), value] for labels, value in metric.values.items()
+                    ],
+                }
+                for name, metric in self.metrics.items()
+                if metric.values
+            }
+
+    def write(self):
+        with self.lock:
+            if self.timer is not None:
+                self.timer.cancel()
+            self.timer = None
+            self.last_write = time.monotonic()
+            if not self.writing:
+                return
+        data = self.snapshot()
+        if not data:
+            return
+        directory = Path(settings.SURVEY_METRICS_DIR)
+        try:
+            directory.mkdir(parents=True, exist_ok=True)
+            path = directory / f"{os.getpid()}.json"
+            temp = path.with_suffix(".tmp")
+            temp.write_text(json.dumps(data))
+            os.replace(temp, path)
+        except OSError:
+            logger.exception("Could not write metrics to %s", directory)
+
+
+registry = Registry()
+os.register_at_fork(after_in_child=registry.reset)
+
+
+def start():
+    """
+    Writes this process's metrics to SURVEY_METRICS_DIR from now on, called
+    by each gunicorn worker, see deploy/gunicorn.conf.py.
+    """
+    registry.writing = True
+    atexit.register(registry.write)
+
+
+def remove(pid):
+    """
+    Deletes the metrics file of a process that has exited.
+    """
+    try:
+        os.unlink(Path(settings.SURVEY_METRICS_DIR) / f"{pid}.json")
+    except FileNotFoundError:
+        pass
+
+
+def _running(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, name, help):
+        self.name = name
+        self.help = help
+        self.values = {}
+        registry.register(self)
+
+    @staticmethod
+    def key(labels):
+        return tuple(sorted(labels.items()))
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self.key(labels)
+        with registry.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+        registry.changed()
+
+
+class Gauge(Metric):
+    """
+    Keeps the last value set, across processes the most recent one wins.
+    """
+
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        with registry.lock:
+            self.values[self.key(labels)] = [value, time.time()]
+        registry.changed()
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help, buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self.key(labels)
+        with registry.lock:
+            state = self.values.get(key)
+            if state is None:
+                state = self.values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][i] += 1
+            state[1] += value
+            state[2] += 1
+        registry.changed()
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+
+def collect():
+    """
+    Adds up the metrics files of every running process, and deletes the
+    files of the ones that have gone.
+    """
+    merged = {}
+    for path in Path(settings.SURVEY_METRICS_DIR).glob("*.json"):
+        if path.stem.isdigit() and not _running(int(path.stem)):
+            remove(path.stem)
+            continue
+        try:
+            data = json.loads(path.read_text())
+        except (OSError, ValueError):
+            continue
+        for name, metric in data.items():
+            target = merged.setdefault(name, {**metric, "values": {}})
+            for labels, value in metric["values"]:
+                key = Metric.key(labels)
+                current = target["values"].get(key)
+                if current is None:
+                    target["values"][key] = value
+                elif metric["kind"] == "counter":
+                    target["values"][key] = current + value
+                elif metric["kind"] == "gauge":
+                    target["values"][key] = max(current, value, key=lambda v: v[1])
+                else:
+                    target["values"][key] = [
+                        [a + b for a, b in zip(current[0], value[0])],
+                        current[1] + value[1],
+                        current[2] + value[2],
+                    ]
+    return merged
+
+
+def _labels(key, **extra):
+    labels = dict(key, **extra)
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{value}"' for name, value in labels.items()) + "}"
+
+
+def render(merged):
+    """
+    Returns the merged metrics in the Prometheus text format.
+    """
+    lines = []
+    for name in sorted(merged):
+        metric = merged[name]
+        lines.append(f"# HELP {name} {metric['help']}")
+        lines.append(f"# TYPE {name} {metric['kind']}")
+        for key, value in sorted(metric["values"].items()):
+            match metric["kind"]:
+                case "counter":
+                    lines.append(f"{name}{_labels(key)} {value}")
+                case "gauge":
+                    lines.append(f"{name}{_labels(key)} {value[0]}")
+                case "histogram":
+                    counts, total, count = value
+                    for bound, bucket in zip(metric["buckets"], counts):
+                        lines.append(f"{name}_bucket{_labels(key, le=bound)} {bucket}")
+                    lines.append(f'{name}_bucket{_labels(key, le="+Inf")} {count}')
+                    lines.append(f"{name}_sum{_labels(key)} {total}")
+                    lines.append(f"{name}_count{_labels(key)} {count}")
+    return "\n".join(lines) + "\n"
+
+
+FORM_BUILD = Histogram("survey_form_build_seconds", "Time to build the survey form.")
+TEMPLATE_RENDER = Histogram(
+    "survey_template_render_seconds", "Time to render the survey page."
+)
+FORM_SAVE = Histogram("survey_form_save_seconds", "Time to save a response.")
+SUBMISSIONS = Counter("survey_submissions_total", "Responses saved.")
+DUPLICATE_SUBMISSIONS = Counter(
+    "survey_duplicate_submissions_total",
+    "Resubmitted surveys answered without saving them again.",
+)
+SQLITE_WRITE = Histogram(
+    "survey_sqlite_write_seconds", "Time of SQLite inserts, updates and deletes."
+)
+SQLITE_LOCKED = Counter(
+    "survey_sqlite_locked_total",
+    "SQLite writes that failed with database is locked.",
+)
+EXPORT_DURATION = Histogram(
+    "survey_export_seconds",
+    "Time to export the responses.",
+    buckets=(1, 5, 10, 30, 60, 120, 300, 600),
+)
+EXPORT_ROWS = Counter("survey_export_rows_total", "Responses exported.")
+EXPORT_ROW_RATE = Gauge(
+    "survey_export_rows_per_second", "Rows per second of the last export."
+)
+
+WRITE_STATEMENTS = ("INSERT", "UPDATE", "DELETE", "REPLACE")
+
+
+def sqlite_wrapper(execute, sql, params, many, context):
+    """
+    Database execute wrapper that times writes and counts the ones that
+    gave up waiting for the lock. A slow write alone could just as well be
+    the SD card, so only the errors are counted.
+    """
+    if not sql.lstrip()[:7].upper().startswith(WRITE_STATEMENTS):
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    except OperationalError as e:
+        if "database is locked" in str(e):
+            SQLITE_LOCKED.inc()
+        raise
+    finally:
+        SQLITE_WRITE.observe(time.perf_counter() - started)
+
+
+def install_wrapper(sender, connection, **kwargs):
+    if connection.vendor != "sqlite":
+        return
+    if sqlite_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(sqlite_wrapper)
@@ -0,0 +1,118 @@
+"""
+Sampling profiler for the survey pages.
+
+Off by default. Turn it on with SURVEY_PROFILE=1, or send SIGUSR2 to a worker
+to switch it on or off while it runs. A sampled request gets a thread that
+reads the request's stack every SURVEY_PROFILE_INTERVAL seconds and writes the
+stacks in the collapsed format (one "a;b;c count" line per stack) to
+SURVEY_PROFILE_DIR, ready for flamegraph.pl or speedscope.
+"""
+
+import logging
+import os
+import random
+import signal
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+enabled = settings.SURVEY_PROFILE
+
+
+def toggle(signum=None, frame=None):
+    global enabled
+    enabled = not enabled
+    logger.warning("Profiling %s in %s", "on" if enabled else "off", os.getpid())
+
+
+def install_signal():
+    """
+    Lets SIGUSR2 switch profiling on and off. gunicorn resets the signals in
+    each worker, so deploy/gunicorn.conf.py calls this as a worker starts,
+    before it could get the signal.
+    """
+    signal.signal(signal.SIGUSR2, toggle)
+
+
+def frame_label(frame):
+    code = frame.f_code
+    path = code.co_filename
+    if "site-packages/" in path:
+        path = path.rsplit("site-packages/", 1)[1]
+    elif path.startswith(str(settings.BASE_DIR)):
+        path = os.path.relpath(path, settings.BASE_DIR)
+    return f"{path}:{code.co_qualname}"
+
+
+class StackSampler(threading.Thread):
+    """
+    Counts the stacks of another thread until stopped.
+    """
+
+    def __init__(self, thread_id, interval):
+        super().__init__(daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(frame_label(frame))
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+    def write(self, path):
+        with open(path, mode="w") as file:
+            for stack, count in self.stacks.most_common():
+                file.write(f"{stack} {count}\n")
+
+
+class ProfilingMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if (
+            not enabled
+            or not request.path.startswith(settings.SURVEY_PROFILE_PATHS)
+            or random.random() >= settings.SURVEY_PROFILE_RATE
+        ):
+            return self.get_response(request)
+
+        sampler = StackSampler(threading.get_ident(), settings.SURVEY_PROFILE_INTERVAL)
+        started = time.time()
+        sampler.start()
+        try:
+            return self.get_response(request)
+        finally:
+            sampler.stop()
+            self.save(request, sampler, started)
+
+    def save(self, request, sampler, started):
+        directory = Path(settings.SURVEY_PROFILE_DIR)
+        slug = request.path.strip("/").replace("/", "-") or "index"
+        name = (
+            f"{time.strftime('%Y%m%d-%H%M%S', time.localtime(started))}"
+            f"-{os.getpid()}-{request.method.lower()}-{slug}"
+            f"-{int((time.time() - started) * 1000)}ms.folded"
+        )
+        try:
+            directory.mkdir(parents=True, exist_ok=True)
+            sampler.write(directory / name)
+        except OSError:
+            logger.exception("Could not write the profile to %s", directory)
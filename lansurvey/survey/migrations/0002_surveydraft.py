@@ -0,0 +1,33 @@
+# Generated by Django 5.0.6 on 2026-10-19 16:22
+
+import survey.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('survey', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SurveyDraft',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.CharField(max_length=64, unique=True)),
+                ('data', models.JSONField(default=dict)),
+                ('updated', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='nationalparksatisfactionbehavior',
+            name='q1',
+            field=survey.models.RadioSelect(choices=[('1', '18 - 24'), ('2', '25 - 34'), ('3', '35 - 44'), ('4', '45 - 54'), ('5', '55 - 64'), ('6', '65 or older')], default='', max_length=1, null=True, verbose_name='Please indicate your age.'),
+        ),
+        migrations.AlterField(
+            model_name='nationalparksatisfactionbehavior',
+            name='q12',
+            field=survey.models.CheckBoxSelectOther(choices=[('A', 'Arches National Park'), ('B', 'Bryce Canyon National park'), ('C', 'Canyonlands National Park'), ('CR', 'Capitol Reef National Park'), ('Z', 'Zion National Park'), ('G', 'Grand Canyon National Park'), ('R', 'Rocky Mountain National Park'), ('M', 'Mesa Verde National Park'), ('RB', 'Rainbow Bridge National Monument'), ('NB', 'Natural Bridges National Monument'), ('GC', 'Glen Canyon National Recreation Area/ Lake Powell'), ('BE', 'Bear Ears National Monument'), ('H', 'Hovenweep National Monument'), ('GS', 'Grand Staircase/Escalante National Monument'), ('CB', 'Cedar Breaks National Monument'), ('MV', 'Monument Valley'), ('FC', 'Four Corners Monument'), ('LV', 'Las Vegas'), ('SL', 'Salt Lake City'), ('P', 'Pheonix'), ('D', 'Denver'), ('PS', 'Pipe Spring National Monument'), ('OTHER', 'Other')], default='', max_length=78, null=True, verbose_name='Please indicate the following places you have visited or will visit on this trip.'),
+        ),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 5.0.6 on 2026-10-19 16:24
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def index_places(apps, schema_editor):
+    Response = apps.get_model("survey", "NationalParkSatisfactionBehavior")
+    ResponsePlace = apps.get_model("survey", "ResponsePlace")
+    db = schema_editor.connection.alias
+    places = [
+        ResponsePlace(response_id=pk, code=code)
+        for pk, q12 in Response.objects.using(db).values_list("id", "q12").iterator()
+        for code in dict.fromkeys(q12 or [])
+        if code
+    ]
+    ResponsePlace.objects.using(db).bulk_create(places, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('survey', '0002_surveydraft'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResponsePlace',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('code', models.CharField(max_length=5)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='nationalparksatisfactionbehavior',
+            name='submitted_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Submitted at'),
+        ),
+        migrations.AddIndex(
+            model_name='nationalparksatisfactionbehavior',
+            index=models.Index(fields=['submitted_at'], name='survey_submitted_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='nationalparksatisfactionbehavior',
+            index=models.Index(fields=['q1', 'submitted_at'], name='survey_q1_submitted_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='nationalparksatisfactionbehavior',
+            index=models.Index(fields=['q8', 'submitted_at'], name='survey_q8_submitted_idx'),
+        ),
+        migrations.AddField(
+            model_name='responseplace',
+            name='response',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='places', to='survey.nationalparksatisfactionbehavior'),
+        ),
+        migrations.AddIndex(
+            model_name='responseplace',
+            index=models.Index(fields=['code', 'response'], name='survey_place_code_idx'),
+        ),
+        migrations.RunPython(index_places, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.0.6 on 2026-10-19 16:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('survey', '0004_response_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='nationalparksatisfactionbehavior',
+            name='country_code',
+            field=models.CharField(blank=True, editable=False, max_length=2, null=True, verbose_name='ISO country code'),
+        ),
+        migrations.AddField(
+            model_name='nationalparksatisfactionbehavior',
+            name='state_code',
+            field=models.CharField(blank=True, editable=False, max_length=2, null=True, verbose_name='US state code'),
+        ),
+    ]
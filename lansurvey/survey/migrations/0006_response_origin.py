@@ -0,0 +1,33 @@
+# Generated by Django 5.0.6 on 2026-10-19 16:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('survey', '0005_canonical_codes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='nationalparksatisfactionbehavior',
+            name='origin_county',
+            field=models.CharField(blank=True, editable=False, max_length=100, null=True),
+        ),
+        migrations.AddField(
+            model_name='nationalparksatisfactionbehavior',
+            name='origin_latitude',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='nationalparksatisfactionbehavior',
+            name='origin_longitude',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='nationalparksatisfactionbehavior',
+            name='origin_state',
+            field=models.CharField(blank=True, editable=False, max_length=2, null=True),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.0.6 on 2026-10-19 16:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('survey', '0006_response_origin'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MergeCursor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('device', models.CharField(max_length=64, unique=True)),
+                ('last_id', models.IntegerField(default=0)),
+                ('merged', models.IntegerField(default=0)),
+                ('duplicates', models.IntegerField(default=0)),
+                ('updated', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='nationalparksatisfactionbehavior',
+            name='content_hash',
+            field=models.CharField(blank=True, editable=False, max_length=64, null=True),
+        ),
+        migrations.AddField(
+            model_name='nationalparksatisfactionbehavior',
+            name='source_device',
+            field=models.CharField(blank=True, editable=False, max_length=64, null=True),
+        ),
+        migrations.AddField(
+            model_name='nationalparksatisfactionbehavior',
+            name='source_id',
+            field=models.IntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='nationalparksatisfactionbehavior',
+            constraint=models.UniqueConstraint(condition=models.Q(('source_device__isnull', False)), fields=('source_device', 'source_id'), name='survey_source_unique'),
+        ),
+        migrations.AddConstraint(
+            model_name='nationalparksatisfactionbehavior',
+            constraint=models.UniqueConstraint(condition=models.Q(('content_hash__isnull', False)), fields=('content_hash',), name='survey_content_hash_unique'),
+        ),
+    ]
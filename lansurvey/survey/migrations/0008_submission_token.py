@@ -0,0 +1,22 @@
+# Generated by Django 5.0.6 on 2026-10-19 16:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('survey', '0007_merge_sources'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='nationalparksatisfactionbehavior',
+            name='submission_token',
+            field=models.CharField(blank=True, editable=False, max_length=64, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='nationalparksatisfactionbehavior',
+            constraint=models.UniqueConstraint(condition=models.Q(('submission_token__isnull', False)), fields=('submission_token',), name='survey_submission_token_unique'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.0.6 on 2026-10-19 17:40
+
+import survey.models
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('survey', '0008_submission_token'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='nationalparksatisfactionbehavior',
+            name='q1',
+            field=survey.models.RadioSelect(choices=[('1', '18 - 24'), ('2', '25 - 34'), ('3', '35 - 44'), ('4', '45 - 54'), ('5', '55 - 64'), ('6', '65 or older')], default='', max_length=1, null=True, verbose_name='Please indicate your age.'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.6 on 2026-10-19 17:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('survey', '0009_alter_q1_choices'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='surveydraft',
+            name='submitted',
+            field=models.BooleanField(default=False),
+        ),
+    ]
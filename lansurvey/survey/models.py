@@ -10,11 +10,16 @@ from django.forms import (
     RadioSelect,
     TypedChoiceField,
 )
+from django.utils import timezone
 from django.utils.encoding import force_str
 from django.utils.hashable import make_hashable
 
+from . import canonical, fingerprint, geocode
+
 logger = logging.getLogger(__name__)
 
+OTHER_CHOICE = ("OTHER", "Other")
+
 
 class RadioSelectField(TypedChoiceField):
     widget = RadioSelect
@@ -39,8 +44,9 @@ class CheckBoxSelectOtherField(CheckBoxSelectField):
     widget = CheckboxSelectMultiple
 
     def __init__(self, *args, **kwargs):
-        # Add the other field
-        kwargs["choices"] += [("OTHER", "Other")]
+        # Add the other field, the model field normally has it already
+        if OTHER_CHOICE not in kwargs["choices"]:
+            kwargs["choices"] = [*kwargs["choices"], OTHER_CHOICE]
         super().__init__(*args, **kwargs)
 
 
@@ -123,6 +129,15 @@ class MultipleChoiceField(models.CharField):
 
 
 class CheckBoxSelectOther(MultipleChoiceField):
+    def __init__(self, *args, **kwargs):
+        # Keep the other choice on the model so it validates and displays,
+        # without adding it again every time a form class is built
+        choices = list(kwargs.get("choices") or [])
+        if OTHER_CHOICE not in choices:
+            choices.append(OTHER_CHOICE)
+        kwargs["choices"] = choices
+        super().__init__(*args, **kwargs)
+
     def formfield(self, **kwargs):
         choices_form_class = CheckBoxSelectOtherField
         return super().formfield(choices_form_class=choices_form_class, **kwargs)
@@ -1417,6 +1432,86 @@ class NationalParkSatisfactionBehavior(models.Model):
         verbose_name="They make me feel better physically and/or mentally.",
     )
 
+    submitted_at = models.DateTimeField(
+        blank=True,
+        null=True,
+        editable=False,
+        verbose_name="Submitted at",
+    )
+
+    # Canonical codes for q9 and q10_1, see survey.canonical
+    country_code = models.CharField(
+        max_length=2,
+        blank=True,
+        null=True,
+        editable=False,
+        verbose_name="ISO country code",
+    )
+    state_code = models.CharField(
+        max_length=2,
+        blank=True,
+        null=True,
+        editable=False,
+        verbose_name="US state code",
+    )
+
+    # Where the q10_2 ZIP code is, see survey.geocode
+    origin_latitude = models.FloatField(blank=True, null=True, editable=False)
+    origin_longitude = models.FloatField(blank=True, null=True, editable=False)
+    origin_county = models.CharField(
+        max_length=100, blank=True, null=True, editable=False
+    )
+    origin_state = models.CharField(max_length=2, blank=True, null=True, editable=False)
+
+    # Set on responses merged from another Pi, see merge_responses
+    source_device = models.CharField(
+        max_length=64, blank=True, null=True, editable=False
+    )
+    source_id = models.IntegerField(blank=True, null=True, editable=False)
+    content_hash = models.CharField(
+        max_length=64, blank=True, null=True, editable=False
+    )
+    # From the rendered form, a resubmitted form has the same one
+    submission_token = models.CharField(
+        max_length=64, blank=True, null=True, editable=False
+    )
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["submitted_at"], name="survey_submitted_idx"),
+            # Lead with the filter column so counts never touch the table
+            models.Index(fields=["q1", "submitted_at"], name="survey_q1_submitted_idx"),
+            models.Index(fields=["q8", "submitted_at"], name="survey_q8_submitted_idx"),
+        ]
+        # Partial unique indexes, SQLite can add them without rebuilding the table
+        constraints = [
+            models.UniqueConstraint(
+                fields=["source_device", "source_id"],
+                condition=models.Q(source_device__isnull=False),
+                name="survey_source_unique",
+            ),
+            models.UniqueConstraint(
+                fields=["content_hash"],
+                condition=models.Q(content_hash__isnull=False),
+                name="survey_content_hash_unique",
+            ),
+            models.UniqueConstraint(
+                fields=["submission_token"],
+                condition=models.Q(submission_token__isnull=False),
+                name="survey_submission_token_unique",
+            ),
+        ]
+
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        if adding and self.submitted_at is None:
+            self.submitted_at = timezone.now()
+        canonical.fill_codes(self)
+        geocode.fill_location(self)
+        fingerprint.fill_hash(self)
+        super().save(*args, **kwargs)
+        ResponsePlace.sync([self], replace=not adding)
+
     def _get_FIELD_display_custom(self, field):
         """
         This is a custom field to display the many checkbox fields in a easy way
@@ -1432,3 +1527,70 @@ class NationalParkSatisfactionBehavior(models.Model):
             )
             display_values.append(display_value)
         return ",".join(display_values)
+
+
+class ResponsePlace(models.Model):
+    """
+    One row for every place selected in q12.
+    q12 is stored as a comma separated string, this lets "visited X" use an index.
+    """
+
+    response = models.ForeignKey(
+        NationalParkSatisfactionBehavior,
+        on_delete=models.CASCADE,
+        related_name="places",
+    )
+    code = models.CharField(max_length=5)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["code", "response"], name="survey_place_code_idx"),
+        ]
+
+    @classmethod
+    def sync(cls, responses, replace=True, using=None):
+        """
+        Rebuilds the place rows for the given responses.
+        Use replace=False for new responses to skip the delete.
+        """
+        responses = [response for response in responses if response.pk is not None]
+        manager = cls.objects.db_manager(using)
+        if replace:
+            manager.filter(response__in=[r.pk for r in responses]).delete()
+        manager.bulk_create(
+            [
+                cls(response_id=response.pk, code=code)
+                for response in responses
+                for code in dict.fromkeys(response.q12 or [])
+                if code
+            ],
+            batch_size=500,
+        )
+
+
+class MergeCursor(models.Model):
+    """
+    How far merge_responses got with each device, so merging a newer
+    snapshot of it only reads the rows added since.
+    """
+
+    device = models.CharField(max_length=64, unique=True)
+    # Highest id in the device's own database that has been merged
+    last_id = models.IntegerField(default=0)
+    merged = models.IntegerField(default=0)
+    duplicates = models.IntegerField(default=0)
+    updated = models.DateTimeField(auto_now=True)
+
+
+class SurveyDraft(models.Model):
+    """
+    An unfinished response saved by the autosave endpoint.
+    The answers are kept as the raw form values keyed by question name.
+    Once the response is submitted the answers are cleared and the draft is
+    kept as submitted, so autosaves still on their way don't bring it back.
+    """
+
+    token = models.CharField(max_length=64, unique=True)
+    data = models.JSONField(default=dict)
+    updated = models.DateTimeField(auto_now=True)
+    submitted = models.BooleanField(default=False)
@@ -0,0 +1,65 @@
+"""
+Common filters over the survey responses, written so SQLite can answer them
+from the indexes on NationalParkSatisfactionBehavior and ResponsePlace instead
+of scanning the wide response table.
+"""
+
+import logging
+
+from django.db.models import Count
+
+from . import models
+
+logger = logging.getLogger(__name__)
+
+
+def responses(parks=None, ages=None, resident=None, since=None, until=None, using=None):
+    """
+    Returns a queryset of responses matching all of the given filters.
+
+    parks: q12 place codes, matches responses that selected any of them
+    ages: q1 age band codes
+    resident: q8 code, "Y" or "N"
+    since, until: submitted_at range, since is inclusive and until is not
+    """
+    queryset = models.NationalParkSatisfactionBehavior.objects.using(using)
+    if ages:
+        queryset = queryset.filter(q1__in=list(ages))
+    if resident:
+        queryset = queryset.filter(q8=resident)
+    if since is not None:
+        queryset = queryset.filter(submitted_at__gte=since)
+    if until is not None:
+        queryset = queryset.filter(submitted_at__lt=until)
+    if parks:
+        places = models.ResponsePlace.objects.using(using).filter(code__in=list(parks))
+        queryset = queryset.filter(id__in=places.values("response_id"))
+    return queryset
+
+
+def count(**filters):
+    return responses(**filters).count()
+
+
+def counts_by(field, **filters):
+    """
+    Returns a dict of answer code to number of responses for a radio question.
+    """
+    rows = (
+        responses(**filters)
+        .order_by()
+        .values_list(field)
+        .annotate(total=Count("id"))
+    )
+    return {code: total for code, total in rows}
+
+
+def park_counts(**filters):
+    """
+    Returns a dict of q12 place code to number of responses that selected it.
+    """
+    places = models.ResponsePlace.objects.using(filters.get("using"))
+    if any(value for name, value in filters.items() if name != "using"):
+        places = places.filter(response__in=responses(**filters).values("id"))
+    rows = places.order_by().values_list("code").annotate(total=Count("id"))
+    return {code: total for code, total in rows}
@@ -0,0 +1,131 @@
+"""
+Validation and skip logic for the national park survey.
+
+The same compiled rules are shipped to the browser (see the build_survey_rules
+command) and checked on the server in NationalParkSatisfactionBehaviorForm.clean
+so both sides agree on which answers are kept.
+"""
+
+import hashlib
+import json
+import logging
+from functools import cache
+
+from . import schema
+
+logger = logging.getLogger(__name__)
+
+# Display logic from National_Park_Visitor_Satisfaction_and_Behavior.qsf
+# QID9 is shown when QID8 is "No", QID10 when QID8 is "Yes" and QID20 when
+# "Airplane" is selected in QID19. The "Other" text boxes follow their choice.
+# Order matters, a question hidden earlier hides the ones that depend on it.
+DISPLAY_LOGIC = {
+    "q9": ("q8", "N"),
+    "q10_1": ("q8", "Y"),
+    "q10_2": ("q8", "Y"),
+    "q12_23_text": ("q12", "OTHER"),
+    "q19_6_text": ("q19", "OTHER"),
+    "q20": ("q19", "AP"),
+    "q20_10_text": ("q20", "O"),
+}
+
+# Questions where every answer can only be given once.
+# q11 is "pick your top three", q28 ranks the aspects from 1 to 10.
+UNIQUE_ANSWER_GROUPS = {
+    "q11": tuple(f"q11_{i}" for i in range(1, 12)),
+    "q28": tuple(f"q28_{i}" for i in range(1, 11)),
+}
+
+# (min, max) for the number fields, everything else just can't be negative
+INTEGER_BOUNDS = {
+    "q10_2": (0, 99999),
+}
+DEFAULT_INTEGER_BOUNDS = (0, 9999)
+
+EMPTY_VALUES = (None, "", [], ())
+
+
+@cache
+def compile_rules():
+    """
+    Returns the rules as a plain dict that can be dumped to JSON.
+    """
+    fields = {}
+    for name, spec in schema.field_specs().items():
+        field = {"kind": spec.kind}
+        if spec.choices:
+            field["choices"] = list(spec.codes)
+        if spec.kind == schema.INTEGER:
+            field["min"], field["max"] = INTEGER_BOUNDS.get(
+                name, DEFAULT_INTEGER_BOUNDS
+            )
+        fields[name] = field
+
+    rules = {
+        "fields": fields,
+        "showIf": {name: list(cond) for name, cond in DISPLAY_LOGIC.items()},
+        "unique": {name: list(group) for name, group in UNIQUE_ANSWER_GROUPS.items()},
+    }
+    rules["version"] = hashlib.sha1(
+        json.dumps(rules, sort_keys=True).encode()
+    ).hexdigest()[:12]
+    return rules
+
+
+def is_shown(name, data):
+    """
+    Returns whether a question is shown given the other answers.
+    """
+    condition = DISPLAY_LOGIC.get(name)
+    if condition is None:
+        return True
+    parent, code = condition
+    if not is_shown(parent, data):
+        return False
+    value = data.get(parent)
+    if isinstance(value, (list, tuple)):
+        return code in value
+    return value == code
+
+
+def check(data):
+    """
+    Checks the answers against the rules.
+
+    Answers to questions that are not shown are removed from data in place.
+    Returns a dict of field name to error message.
+    """
+    errors = {}
+
+    for name in DISPLAY_LOGIC:
+        if name in data and data[name] not in EMPTY_VALUES and not is_shown(name, data):
+            data[name] = [] if isinstance(data[name], (list, tuple)) else None
+
+    for name, (low, high) in _integer_bounds().items():
+        value = data.get(name)
+        if value in EMPTY_VALUES:
+            continue
+        if value < low or value > high:
+            errors[name] = f"Please enter a number between {low} and {high}."
+
+    for group in UNIQUE_ANSWER_GROUPS.values():
+        seen = set()
+        for name in group:
+            value = data.get(name)
+            if value in EMPTY_VALUES:
+                continue
+            if value in seen:
+                errors[name] = "This answer has already been used."
+            seen.add(value)
+
+    return errors
+
+
+@cache
+def _integer_bounds():
+    fields = compile_rules()["fields"]
+    return {
+        name: (field["min"], field["max"])
+        for name, field in fields.items()
+        if field["kind"] == schema.INTEGER
+    }
@@ -0,0 +1,67 @@
+import logging
+from dataclasses import dataclass
+from functools import cache
+
+from django.db import models as django_models
+from django.utils.encoding import force_str
+
+from . import models
+
+logger = logging.getLogger(__name__)
+
+RADIO = "radio"
+CHECKBOX = "checkbox"
+INTEGER = "integer"
+TEXT = "text"
+
+
+@dataclass(frozen=True)
+class FieldSpec:
+    """
+    A compact, precomputed description of one survey question.
+    Built once per process so callers don't walk the model _meta on every use.
+    """
+
+    name: str
+    kind: str
+    choices: tuple
+    labels: dict
+
+    @property
+    def codes(self):
+        return tuple(code for code, _ in self.choices)
+
+
+def _field_kind(field):
+    match field:
+        case models.RadioSelect():
+            return RADIO
+        case models.MultipleChoiceField():
+            return CHECKBOX
+        case django_models.IntegerField():
+            return INTEGER
+        case _:
+            return TEXT
+
+
+def _field_choices(field):
+    return tuple((str(code), force_str(label)) for code, label in field.flatchoices)
+
+
+@cache
+def field_specs():
+    """
+    Returns a dict of question name to FieldSpec in model order.
+    """
+    specs = {}
+    for field in models.NationalParkSatisfactionBehavior._meta.concrete_fields:
+        if not field.name.startswith("q"):
+            continue
+        choices = _field_choices(field)
+        specs[field.name] = FieldSpec(
+            name=field.name,
+            kind=_field_kind(field),
+            choices=choices,
+            labels=dict(choices),
+        )
+    return specs
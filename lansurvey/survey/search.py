@@ -0,0 +1,124 @@
+"""
+Full text search over the open ended answers.
+
+The answers are indexed in an SQLite FTS5 table that triggers on the response
+table keep up to date, so finding the responses that mention a word is an
+index lookup instead of a LIKE scan over every row.
+"""
+
+import logging
+from dataclasses import dataclass
+
+from django.db import connections
+from django.db.models.expressions import RawSQL
+
+from . import models
+
+logger = logging.getLogger(__name__)
+
+SEARCH_TABLE = "survey_response_search"
+SEARCH_FIELDS = ("q9", "q10_1", "q12_23_text", "q19_6_text", "q20_10_text")
+
+
+_TABLE = models.NationalParkSatisfactionBehavior._meta.db_table
+_COLUMNS = ", ".join(SEARCH_FIELDS)
+_NEW = ", ".join(f"new.{name}" for name in SEARCH_FIELDS)
+_OLD = ", ".join(f"old.{name}" for name in SEARCH_FIELDS)
+
+# The search table and the triggers that keep it up to date, also run by the
+# 0004_response_search migration
+CREATE_SQL = [
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5("
+    f"{_COLUMNS}, content='{_TABLE}', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+    f"CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_insert AFTER INSERT ON {_TABLE} "
+    f"BEGIN INSERT INTO {SEARCH_TABLE}(rowid, {_COLUMNS}) VALUES (new.id, {_NEW}); END",
+    f"CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_delete AFTER DELETE ON {_TABLE} "
+    f"BEGIN INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}, rowid, {_COLUMNS}) "
+    f"VALUES ('delete', old.id, {_OLD}); END",
+    f"CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_update AFTER UPDATE OF {_COLUMNS} "
+    f"ON {_TABLE} BEGIN "
+    f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}, rowid, {_COLUMNS}) "
+    f"VALUES ('delete', old.id, {_OLD}); "
+    f"INSERT INTO {SEARCH_TABLE}(rowid, {_COLUMNS}) VALUES (new.id, {_NEW}); END",
+]
+# Indexes the responses already in the table
+REBUILD_SQL = f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}) VALUES ('rebuild')"
+DROP_SQL = [
+    f"DROP TRIGGER IF EXISTS {SEARCH_TABLE}_insert",
+    f"DROP TRIGGER IF EXISTS {SEARCH_TABLE}_delete",
+    f"DROP TRIGGER IF EXISTS {SEARCH_TABLE}_update",
+    f"DROP TABLE IF EXISTS {SEARCH_TABLE}",
+]
+
+
+def install(using="default"):
+    """
+    Creates the search table and triggers if they are missing and reindexes.
+    Django rebuilds a table for some schema changes, which drops its triggers,
+    so run this (search_responses --rebuild) after such a migration.
+    """
+    with connections[using].cursor() as cursor:
+        for statement in [*CREATE_SQL, REBUILD_SQL]:
+            cursor.execute(statement)
+
+
+@dataclass(frozen=True)
+class SearchHit:
+    id: int
+    rank: float
+    snippet: str
+
+
+def build_query(term, fields=None, raw=False):
+    """
+    Turns a search term into an FTS5 query.
+    The term is matched as a phrase, a trailing * matches it as a prefix.
+    raw=True passes the term through as FTS5 query syntax.
+    """
+    if not raw:
+        prefix = term.endswith("*")
+        term = term.rstrip("*").replace('"', '""')
+        term = f'"{term}"' + ("*" if prefix else "")
+    if fields:
+        unknown = set(fields) - set(SEARCH_FIELDS)
+        if unknown:
+            raise ValueError(f"Not a searchable field: {', '.join(sorted(unknown))}")
+        term = "{" + " ".join(fields) + "} : " + f"({term})"
+    return term
+
+
+def search(term, fields=None, limit=50, raw=False, using="default"):
+    """
+    Returns the best matching responses as a list of SearchHit.
+    """
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            f"SELECT rowid, rank, snippet({SEARCH_TABLE}, -1, '[', ']', '...', 8) "
+            f"FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s "
+            "ORDER BY rank LIMIT %s",
+            [build_query(term, fields, raw), limit],
+        )
+        return [SearchHit(*row) for row in cursor.fetchall()]
+
+
+def count(term, fields=None, raw=False, using="default"):
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            f"SELECT count(*) FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s",
+            [build_query(term, fields, raw)],
+        )
+        return cursor.fetchone()[0]
+
+
+def responses(term, fields=None, raw=False, using="default"):
+    """
+    Returns a queryset of all the responses matching the term.
+    """
+    matches = RawSQL(
+        f"SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s",
+        [build_query(term, fields, raw)],
+    )
+    return models.NationalParkSatisfactionBehavior.objects.using(using).filter(
+        id__in=matches
+    )
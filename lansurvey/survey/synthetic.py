@@ -0,0 +1,193 @@
+"""
+Plausible, valid survey responses for benchmarks, load tests and scale tests.
+
+The Likert questions are found by matching each question's choices to the
+TextChoices on NationalParkSatisfactionBehavior. Every respondent gets a
+general mood, so their answers on a scale lean the same way instead of being
+independent coin flips. Rankings are permutations and the skip logic is
+applied, so every response would pass the form.
+"""
+
+import logging
+from functools import cache
+
+from django.db import models as django_models
+
+from . import models, rules, schema
+
+logger = logging.getLogger(__name__)
+
+# TextChoices that are ordered scales, with the codes that are off the scale
+LIKERT_SCALES = {
+    "Importance": (),
+    "Importance2": (),
+    "Achieve": ("1",),
+    "Quality": ("5",),
+    "Crowded": (),
+    "Frequently": ("6",),
+}
+OFF_SCALE_RATE = 0.05
+# How far one answer strays from the respondent's mood, in scale steps
+ANSWER_SPREAD = 0.7
+
+RESIDENT_RATE = 0.8
+# (ways people write the state, ZIP codes, weight)
+STATES = (
+    (("Utah", "UT", "utah", "Utah "), (84101, 84047, 84532, 84741, 84770, 84604), 30),
+    (("California", "CA", "Calif", "california"), (90012, 94103, 92101, 95814), 20),
+    (("Colorado", "CO", "colorado"), (80202, 80301, 81301), 8),
+    (("Arizona", "AZ", "Arizona"), (85004, 86001, 85701), 8),
+    (("Nevada", "NV"), (89101, 89501), 5),
+    (("Texas", "TX", "texas"), (73301, 77002, 75201), 7),
+    (("Idaho", "ID"), (83702, 83201), 3),
+    (("Washington", "WA"), (98101, 99201), 4),
+    (("New York", "NY", "new york"), (10001, 14201), 5),
+    (("Illinois", "IL"), (60601, 62701), 4),
+    (("Florida", "FL", "Flordia"), (33101, 32801), 6),
+)
+# (ways people write the country, weight)
+COUNTRIES = (
+    (("Canada", "canada", "CA"), 25),
+    (("Germany", "Deutschland", "germany"), 20),
+    (("United Kingdom", "UK", "England", "Great Britain"), 18),
+    (("France", "france", "Frnace"), 14),
+    (("Netherlands", "Holland"), 6),
+    (("Mexico", "México"), 6),
+    (("Japan",), 4),
+    (("Australia", "australia"), 5),
+    (("China",), 2),
+)
+OTHER_PLACES = ("Goblin Valley", "Dead Horse Point", "Kodachrome Basin", "Snow Canyon")
+# Hotel/Lodge, Short-term rental, Camping and Family/friends
+LODGING = ("q21_1", "q21_4", "q21_5", "q21_6")
+NIGHTS_WEIGHTS = (3, 8, 12, 14, 14, 12, 10, 4, 4, 4, 4, 4, 4, 4, 4)
+OTHER_TRANSPORTATION = ("Motorcycle", "Bicycle", "Train", "Hitchhiked")
+OTHER_AIRPORTS = ("Boise", "Reno", "Albuquerque", "Grand Junction")
+# Chance of writing in an "Other" answer on the questions that have one
+OTHER_RATE = 0.08
+
+
+@cache
+def choice_classes():
+    """
+    Returns a dict of question name to the name of its TextChoices class.
+    """
+    model = models.NationalParkSatisfactionBehavior
+    # Match on the labels too, most scales share the codes "1" to "5"
+    classes = {
+        tuple((str(code), str(label)) for code, label in value.choices): name
+        for name, value in vars(model).items()
+        if isinstance(value, type) and issubclass(value, django_models.Choices)
+    }
+    names = {}
+    for name, spec in schema.field_specs().items():
+        choices = tuple(
+            choice for choice in spec.choices if choice != models.OTHER_CHOICE
+        )
+        if choices in classes:
+            names[name] = classes[choices]
+    return names
+
+
+@cache
+def likert_questions():
+    """
+    Returns a dict of question name to (scale codes, off scale codes).
+    """
+    questions = {}
+    for name, class_name in choice_classes().items():
+        if class_name in LIKERT_SCALES:
+            off_scale = LIKERT_SCALES[class_name]
+            codes = schema.field_specs()[name].codes
+            questions[name] = (
+                tuple(code for code in codes if code not in off_scale),
+                off_scale,
+            )
+    return questions
+
+
+def _weighted(rng, items):
+    *values, weights = zip(*items)
+    return rng.choices(list(zip(*values)), weights)[0]
+
+
+def _likert(rng, mood, codes, off_scale):
+    if off_scale and rng.random() < OFF_SCALE_RATE:
+        return rng.choice(off_scale)
+    position = mood * (len(codes) - 1) + rng.gauss(0, ANSWER_SPREAD)
+    return codes[min(len(codes) - 1, max(0, round(position)))]
+
+
+def answers(rng):
+    """
+    Returns a dict of question name to a random answer that passes the survey rules.
+    Checkbox answers are lists, numbers are ints and everything else is a string.
+    """
+    specs = schema.field_specs()
+    likert = likert_questions()
+    unique = {name for group in rules.UNIQUE_ANSWER_GROUPS.values() for name in group}
+    # Happy visitors rate everything higher, and each scale drifts a little
+    mood = rng.betavariate(3, 1.8)
+    moods = {}
+
+    data = {}
+    for name, spec in specs.items():
+        if name in unique or spec.kind in (schema.INTEGER, schema.TEXT):
+            continue
+        if name in likert:
+            scale = choice_classes()[name]
+            if scale not in moods:
+                moods[scale] = min(1, max(0, mood + rng.gauss(0, 0.15)))
+            data[name] = _likert(rng, moods[scale], *likert[name])
+        elif spec.kind == schema.CHECKBOX:
+            codes = [code for code in spec.codes if code != models.OTHER_CHOICE[0]]
+            count = min(len(codes), rng.choice((1, 1, 2, 2, 3, 4)))
+            data[name] = rng.sample(codes, count)
+            if models.OTHER_CHOICE[0] in spec.codes and rng.random() < OTHER_RATE:
+                data[name].append(models.OTHER_CHOICE[0])
+        else:
+            data[name] = rng.choice(spec.codes)
+
+    # Each answer once per group, q11 only has three to give
+    for group in rules.UNIQUE_ANSWER_GROUPS.values():
+        codes = specs[group[0]].codes
+        names = rng.sample(group, len(codes))
+        data.update(zip(names, rng.sample(codes, len(codes))))
+
+    data["q8"] = "Y" if rng.random() < RESIDENT_RATE else "N"
+    if data["q8"] == "Y":
+        spellings, zip_codes = _weighted(rng, STATES)
+        data["q10_1"] = rng.choice(spellings)
+        data["q10_2"] = rng.choice(zip_codes)
+    else:
+        (spellings,) = _weighted(rng, COUNTRIES)
+        data["q9"] = rng.choice(spellings)
+    data["q12_23_text"] = rng.choice(OTHER_PLACES)
+    data["q19_6_text"] = rng.choice(OTHER_TRANSPORTATION)
+    data["q20_10_text"] = rng.choice(OTHER_AIRPORTS)
+
+    data["q7"] = rng.choices(range(1, 7), (25, 35, 15, 15, 7, 3))[0]
+    data["q15"] = rng.choices(range(1, 9), (10, 40, 15, 18, 8, 5, 2, 2))[0]
+    data["q13"] = nights = rng.choices(range(len(NIGHTS_WEIGHTS)), NIGHTS_WEIGHTS)[0]
+    data["q14"] = in_utah = rng.randint(min(nights, 1), nights)
+    for i in range(1, 9):
+        data[f"q21_{i}"] = 0
+    stays = rng.sample(LODGING, rng.choice((1, 1, 2)))
+    for _ in range(in_utah):
+        data[rng.choice(stays)] += 1
+    data["q25"] = min(60, int(rng.expovariate(1 / 8)) + 1)
+
+    for name in rules.DISPLAY_LOGIC:
+        if not rules.is_shown(name, data):
+            data.pop(name, None)
+    return data
+
+
+def form_data(answers):
+    """
+    Turns answers into the strings a browser would post.
+    """
+    data = {}
+    for name, value in answers.items():
+        data[name] = [str(v) for v in value] if isinstance(value, list) else str(value)
+    return data
@@ -1,3 +1,1164 @@
-from django.test import TestCase
+import gc
+import gzip
+import hashlib
+import io
+import json
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import IntegrityError, OperationalError, connection, connections
+from django.http import HttpResponse
+from django.test import (
+    RequestFactory,
+    SimpleTestCase,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from . import (
+    archive,
+    browse,
+    bulk,
+    canonical,
+    drafts,
+    export,
+    forms,
+    geocode,
+    metrics,
+    middleware,
+    models,
+    rules,
+    schema,
+    search,
+    synthetic,
+    views,
+    warmup,
+)
+from .management.commands import snapshot
+
+Response = models.NationalParkSatisfactionBehavior
+
+
+class SnapshotTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = Path(directory.name) / "source.sqlite3"
+        with sqlite3.connect(self.path) as db:
+            db.execute("CREATE TABLE rows (value TEXT)")
+            db.executemany("INSERT INTO rows VALUES (?)", [("x" * 500,)] * 4000)
+
+    def backup(self, pages):
+        source = sqlite3.connect(self.path)
+        target = sqlite3.connect(":memory:")
+        self.addCleanup(source.close)
+        self.addCleanup(target.close)
+        return snapshot.backup(source, target, pages, 0.02), target
+
+    def test_copies_in_steps(self):
+        (steps, pages), target = self.backup(64)
+        self.assertGreater(steps, 1)
+        self.assertEqual(pages, 64)
+        count = target.execute("SELECT count(*) FROM rows").fetchone()[0]
+        self.assertEqual(count, 4000)
+
+    def test_steps_grow_until_it_finishes_under_writes(self):
+        stop = threading.Event()
+
+        def write():
+            # Updates keep the page count the same, so a restart reports the
+            # same pages remaining. Gives up after a while rather than hang.
+            db = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            deadline = time.monotonic() + 10
+            count = 0
+            while not stop.is_set() and time.monotonic() < deadline:
+                count += 1
+                db.execute("UPDATE rows SET value = ? WHERE rowid = 1", (count,))
+                time.sleep(0.005)
+            db.close()
+
+        writer = threading.Thread(target=write)
+        writer.start()
+        try:
+            (steps, pages), target = self.backup(8)
+            writer_running = writer.is_alive()
+        finally:
+            stop.set()
+            writer.join()
+        self.assertGreater(pages, 8)
+        self.assertTrue(writer_running)
+        self.assertEqual(target.execute("PRAGMA quick_check").fetchone(), ("ok",))
+        self.assertGreaterEqual(
+            target.execute("SELECT count(*) FROM rows").fetchone()[0], 4000
+        )
+
+
+class MergeTests(TransactionTestCase):
+    # export_delta attaches a database, which SQLite won't do in a transaction
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name)
+        self.rng = random.Random(0)
+
+    def add(self, count):
+        for _ in range(count):
+            Response(**synthetic.answers(self.rng)).save()
+
+    def delta(self, device, after_id=0):
+        path = self.directory / f"{device}-{after_id}.sqlite3"
+        with override_settings(SURVEY_DEVICE=device):
+            call_command(
+                "export_delta",
+                f"--after-id={after_id}",
+                f"--output={path}",
+                stdout=io.StringIO(),
+            )
+        return path
+
+    def merge(self, *sources):
+        output = io.StringIO()
+        call_command("merge_responses", *map(str, sources), stdout=output)
+        return output.getvalue()
+
+    def test_merge_again_skips_what_was_merged(self):
+        self.add(3)
+        last_id = Response.objects.latest("pk").pk
+        path = self.delta("pi-b")
+        Response.objects.all().delete()
+
+        self.assertIn("merged 3 responses", self.merge(path))
+        self.assertEqual(
+            set(Response.objects.values_list("source_device", flat=True)), {"pi-b"}
+        )
+        self.assertEqual(models.MergeCursor.objects.get(device="pi-b").last_id, last_id)
+
+        self.assertIn("merged 0 responses", self.merge(path))
+        self.assertEqual(Response.objects.count(), 3)
+
+    def test_merge_skips_the_same_response_from_another_device(self):
+        self.add(2)
+        path = self.delta("pi-b")
+        self.assertIn("merged 0 responses, skipped 2 duplicates", self.merge(path))
+        self.assertEqual(Response.objects.count(), 2)
+
+    def test_refuses_a_delta_that_leaves_a_gap(self):
+        self.add(1)
+        path = self.delta("pi-b", after_id=5)
+        with self.assertRaisesMessage(CommandError, "only merged up to 0"):
+            self.merge(path)
+        self.assertFalse(models.MergeCursor.objects.filter(last_id__gt=0).exists())
+
+    def test_responses_without_a_submission_time(self):
+        # Saved before there was a submission time, with the same answers
+        answers = synthetic.answers(self.rng)
+        Response.objects.bulk_create(
+            [Response(**answers, submitted_at=None) for _ in range(2)]
+        )
+        path = self.delta("pi-b")
+
+        self.assertIn("merged 2 responses", self.merge(path))
+        self.assertEqual(Response.objects.count(), 4)
+        self.assertFalse(Response.objects.filter(content_hash__isnull=False).exists())
+        self.assertIn("merged 0 responses", self.merge(path))
+
+
+class CanonicalTests(SimpleTestCase):
+    def test_country_codes(self):
+        for text, code in [
+            ("United States", "US"),
+            ("usa", "US"),
+            ("US", "US"),
+            ("AUS", "AU"),
+            ("Aus", "AU"),
+            ("GBR", "GB"),
+            ("CHN", "CN"),
+            ("JPN", "JP"),
+            ("IRL", "IE"),
+            ("united sta", "US"),
+            ("Untied States", "US"),
+            ("Germny", "DE"),
+        ]:
+            with self.subTest(text=text):
+                self.assertEqual(canonical.country_code(text), code)
+
+    def test_short_answers_are_not_fuzzy_matched(self):
+        self.assertIsNone(canonical.country_code("XQZ"))
+        self.assertIsNone(canonical.country_code("Zz"))
+
+    def test_state_codes(self):
+        for text, code in [("Utah", "UT"), ("ut", "UT"), ("Califronia", "CA")]:
+            with self.subTest(text=text):
+                self.assertEqual(canonical.state_code(text), code)
+
+
+class CanonicalizeResponsesTests(TransactionTestCase):
+    def setUp(self):
+        rng = random.Random(0)
+        for _ in range(5):
+            Response(**{**synthetic.answers(rng), "q9": "Canada"}).save()
+        Response.objects.update(country_code=None, state_code=None)
+
+    def test_fills_in_the_codes(self):
+        call_command("canonicalize_responses", "--batch-size=2", stdout=io.StringIO())
+        self.assertEqual(
+            list(Response.objects.values_list("country_code", flat=True).distinct()),
+            ["CA"],
+        )
+
+    def test_each_batch_is_committed(self):
+        country_code = canonical.country_code
+        with (
+            mock.patch.object(
+                canonical,
+                "country_code",
+                side_effect=[country_code("Canada")] * 2 + [RuntimeError],
+            ),
+            self.assertRaises(RuntimeError),
+        ):
+            call_command(
+                "canonicalize_responses", "--batch-size=2", stdout=io.StringIO()
+            )
+        self.assertEqual(Response.objects.filter(country_code="CA").count(), 2)
+
+
+class GeocodeTests(TestCase):
+    ROWS = (
+        "zip,latitude,longitude,county,state\n"
+        "84532,38.5733,-109.5498,Grand,UT\n"
+        "84101,40.7563,-111.9,Salt Lake,UT\n"
+        "86023,36.0544,-112.1401,Coconino,AZ\n"
+        "84101,40.7561,-111.8999,Salt Lake,UT\n"
+        "none,0,0,,\n"
+    )
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        source = Path(directory.name) / "zipcodes.csv"
+        source.write_text(self.ROWS)
+        path = Path(directory.name) / "zipcodes.idx"
+        output = io.StringIO()
+        call_command("build_zip_index", str(source), f"--output={path}", stdout=output)
+        self.assertIn("Wrote 3 ZIP codes", output.getvalue())
+
+        settings_patcher = override_settings(SURVEY_ZIP_INDEX=path)
+        settings_patcher.enable()
+        self.addCleanup(settings_patcher.disable)
+        geocode.get_index.cache_clear()
+        self.addCleanup(geocode.get_index.cache_clear)
+
+    def test_lookup(self):
+        index = geocode.get_index()
+        self.assertEqual(len(index), 3)
+        moab = index.lookup(84532)
+        self.assertEqual((moab.county, moab.state), ("Grand", "UT"))
+        self.assertAlmostEqual(moab.latitude, 38.5733, places=4)
+        # The later row for a repeated code wins
+        self.assertAlmostEqual(index.lookup("84101").latitude, 40.7561, places=4)
+        for missing in (None, 10001, 84200, 99999):
+            self.assertIsNone(index.lookup(missing))
+        self.assertEqual(sorted(geocode.geocode([86023, 10001, None])), [86023])
+
+    def test_geocode_responses(self):
+        rng = random.Random(0)
+        # bulk_create skips save(), which would fill in the location itself
+        responses = Response.objects.bulk_create(
+            Response(**{**synthetic.answers(rng), "q10_2": zip_code, "q12": ["A"]})
+            for zip_code in (84532, 84101, 10001)
+        )
+        models.ResponsePlace.sync(responses, replace=False)
+        output = io.StringIO()
+        call_command("geocode_responses", "--distance=A", stdout=output)
+        self.assertIn("Geocoded 2 of 3 responses", output.getvalue())
+        self.assertIn("A: 2 responses", output.getvalue())
+        self.assertEqual(
+            set(Response.objects.values_list("q10_2", "origin_county")),
+            {(84532, "Grand"), (84101, "Salt Lake"), (10001, None)},
+        )
+
+    def test_distances(self):
+        # Moab to Salt Lake City is about 320 km
+        (distance,) = geocode.distances_km([38.5733], [-109.5498], (40.7561, -111.9))
+        self.assertAlmostEqual(distance, 320, delta=5)
+
+
+class RangeTests(SimpleTestCase):
+    def test_parse_range(self):
+        for header, expected in [
+            ("bytes=0-99", (0, 99)),
+            ("bytes=100-", (100, 999)),
+            ("bytes=900-5000", (900, 999)),
+            ("bytes=-100", (900, 999)),
+            ("bytes=-5000", (0, 999)),
+            ("bytes=1000-", False),
+            ("bytes=500-400", False),
+            ("bytes=0-1,5-6", None),
+            ("bytes=-", None),
+            ("items=0-1", None),
+        ]:
+            with self.subTest(header=header):
+                self.assertEqual(views.parse_range(header, 1000), expected)
+
+    def test_read_range(self):
+        data = bytes(range(256)) * 3
+        with tempfile.NamedTemporaryFile() as file:
+            file.write(data)
+            file.flush()
+            for start, end in [(0, 767), (5, 5), (10, 700), (700, 767)]:
+                with (
+                    self.subTest(start=start, end=end),
+                    mock.patch.object(export, "BLOCK_SIZE", 100),
+                ):
+                    blocks = list(export.read_range(open(file.name, "rb"), start, end))
+                    self.assertTrue(all(len(block) <= 100 for block in blocks))
+                    self.assertEqual(b"".join(blocks), data[start : end + 1])
+
+
+class BulkTests(TransactionTestCase):
+    def setUp(self):
+        rng = random.Random(0)
+        Response.objects.bulk_create(
+            [Response(**synthetic.answers(rng)) for _ in range(30)]
+        )
+
+    def expected(self, response, labels):
+        values = []
+        for name in export.DATA_COLUMNS:
+            spec = schema.field_specs().get(name)
+            kind = spec.kind if spec is not None else None
+            value = getattr(response, name)
+            if labels and kind == schema.CHECKBOX:
+                # get_FIELD_display_custom can't handle NULL, the export writes ""
+                field = response._meta.get_field(name)
+                value = response._get_FIELD_display_custom(field) if value else ""
+            elif labels and kind == schema.RADIO:
+                value = getattr(response, f"get_{name}_display")()
+            values.append(value)
+        return tuple(values)
+
+    def test_same_values_as_the_model(self):
+        # Unanswered questions and codes that aren't among the choices
+        blank = {name: None for name in export.DATA_COLUMNS}
+        Response.objects.bulk_create(
+            [
+                Response(**blank),
+                Response(**{**blank, "q1": "9", "q4": ["A", "ZZ"], "q12": [""]}),
+            ]
+        )
+        responses = list(Response.objects.order_by("pk"))
+        self.assertEqual(len(responses), 32)
+        for labels in (False, True):
+            with self.subTest(labels=labels):
+                self.assertEqual(
+                    list(bulk.rows(export.DATA_COLUMNS, labels=labels, chunk_size=7)),
+                    [self.expected(response, labels) for response in responses],
+                )
+
+    def test_paused_reader_does_not_block_writes(self):
+        reader = bulk.rows(export.DATA_COLUMNS, chunk_size=10)
+        next(reader)
+        # Another connection, like a submission in another worker
+        db = sqlite3.connect(connection.settings_dict["NAME"], uri=True, timeout=0.1)
+        self.addCleanup(db.close)
+        with db:
+            db.execute(f"UPDATE {Response._meta.db_table} SET q1 = '1'")
+        self.assertEqual(sum(1 for _ in reader), 29)
+
+
+class ManifestTests(TestCase):
+    def setUp(self):
+        rng = random.Random(0)
+        for _ in range(5):
+            Response(**synthetic.answers(rng)).save()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = Path(directory.name) / "import.csv.gz"
+        call_command(
+            "export_survey",
+            f"--output={self.path}",
+            "--compress=gzip",
+            stdout=io.StringIO(),
+        )
+
+    def verify(self, path):
+        output = io.StringIO()
+        call_command(
+            "verify_export",
+            str(path),
+            f"--manifest={self.path}.manifest.json",
+            stdout=output,
+        )
+        return output.getvalue()
+
+    def test_manifest_matches_the_file(self):
+        manifest = json.loads(Path(f"{self.path}.manifest.json").read_text())
+        data = self.path.read_bytes()
+        content = gzip.decompress(data)
+        self.assertEqual(manifest["file"], "import.csv.gz")
+        self.assertEqual(manifest["rows"], 5)
+        self.assertEqual(manifest["schema_version"], export.schema_version())
+        self.assertEqual(
+            (manifest["bytes"], manifest["sha256"]),
+            (len(data), hashlib.sha256(data).hexdigest()),
+        )
+        self.assertEqual(
+            (manifest["csv_bytes"], manifest["csv_sha256"]),
+            (len(content), hashlib.sha256(content).hexdigest()),
+        )
+
+    def test_verify_export(self):
+        self.assertIn("is intact, 5 responses", self.verify(self.path))
+        # A copy that was unzipped after the transfer checks out too
+        unzipped = self.path.with_suffix("")
+        unzipped.write_bytes(gzip.decompress(self.path.read_bytes()))
+        self.assertIn("is intact, 5 responses", self.verify(unzipped))
+
+        unzipped.write_bytes(unzipped.read_bytes()[:-1])
+        with self.assertRaisesMessage(CommandError, "doesn't match its manifest"):
+            self.verify(unzipped)
+
+
+@override_settings(SURVEY_EXPORT_TOKEN="secret")
+class ExportViewTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name)
+        settings_patcher = override_settings(SURVEY_EXPORT_DIR=directory.name)
+        settings_patcher.enable()
+        self.addCleanup(settings_patcher.disable)
+        self.rng = random.Random(0)
+        for _ in range(20):
+            Response(**synthetic.answers(self.rng)).save()
+
+    def get(self, path="/export?gzip=1", **headers):
+        headers = {"Authorization": "Bearer secret", **headers}
+        return self.client.get(path, headers=headers)
+
+    def test_needs_the_token(self):
+        self.assertEqual(self.client.get("/export").status_code, 401)
+
+    def test_resumed_gzip_download_matches_the_full_one(self):
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        full = b"".join(response.streaming_content)
+        self.assertEqual(int(response["Content-Length"]), len(full))
+        expected = self.directory / "expected.csv"
+        export.write_csv(expected)
+        self.assertEqual(gzip.decompress(full), expected.read_bytes())
+
+        cut = len(full) // 3
+        response = self.get(Range=f"bytes={cut}-", **{"If-Range": response["ETag"]})
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(
+            response["Content-Range"], f"bytes {cut}-{len(full) - 1}/{len(full)}"
+        )
+        self.assertEqual(full[:cut] + b"".join(response.streaming_content), full)
+
+    def test_changed_export_sends_everything(self):
+        full = b"".join(self.get().streaming_content)
+        response = self.get(Range="bytes=10-", **{"If-Range": '"0-0-gz"'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b"".join(response.streaming_content), full)
+
+    def test_multiple_ranges_send_everything(self):
+        full = b"".join(self.get().streaming_content)
+        response = self.get(Range="bytes=0-9,20-29")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b"".join(response.streaming_content), full)
+
+    def test_export_is_written_once_per_etag(self):
+        first = b"".join(self.get().streaming_content)
+        with mock.patch.object(export, "write_csv") as write_csv:
+            self.assertEqual(b"".join(self.get().streaming_content), first)
+        write_csv.assert_not_called()
+
+        Response(**synthetic.answers(self.rng)).save()
+        response = self.get()
+        self.assertNotEqual(b"".join(response.streaming_content), first)
+        self.assertEqual(
+            [path.name for path in self.directory.glob("export-*")],
+            [f"export-{Response.objects.latest('pk').pk}-21.csv.gz"],
+        )
+
+    def test_hands_the_file_to_nginx(self):
+        with override_settings(SURVEY_EXPORT_ACCEL="/export-files/"):
+            response = self.get()
+        self.assertEqual(response.status_code, 200)
+        name = response["X-Accel-Redirect"].removeprefix("/export-files/")
+        self.assertTrue((self.directory / name).is_file())
+        self.assertEqual(response.content, b"")
+
+    def test_unsatisfiable_range(self):
+        size = len(b"".join(self.get().streaming_content))
+        response = self.get(Range=f"bytes={size}-")
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response["Content-Range"], f"bytes */{size}")
+
+
+class RulesTests(SimpleTestCase):
+    def test_hidden_answers_are_cleared(self):
+        data = {
+            "q8": "Y",
+            "q9": "Canada",
+            "q12": ["A"],
+            "q12_23_text": "Somewhere",
+            "q19": ["PV"],
+            "q20": "O",
+            "q20_10_text": "Provo",
+        }
+        self.assertEqual(rules.check(data), {})
+        self.assertIsNone(data["q9"])
+        self.assertIsNone(data["q12_23_text"])
+        # q20_10_text follows q20, which is hidden because q19 isn't "Airplane"
+        self.assertIsNone(data["q20"])
+        self.assertIsNone(data["q20_10_text"])
+
+    def test_shown_answers_are_kept(self):
+        data = {"q8": "N", "q9": "Canada", "q19": ["AP"], "q20": "O"}
+        data["q20_10_text"] = "Provo"
+        rules.check(data)
+        self.assertEqual(data["q9"], "Canada")
+        self.assertEqual(data["q20_10_text"], "Provo")
+
+    def test_repeated_and_out_of_range_answers_are_rejected(self):
+        errors = rules.check({"q11_1": "1", "q11_2": "1", "q8": "Y", "q10_2": 100000})
+        self.assertEqual(set(errors), {"q11_2", "q10_2"})
+
+    def test_bundle_is_up_to_date(self):
+        call_command("build_survey_rules", "--check")
+
+    def test_survey_js_reads_the_same_rules(self):
+        with open(settings.BASE_DIR / "static" / "js" / "survey.js") as file:
+            script = file.read()
+        for key in rules.compile_rules():
+            if key != "version":
+                self.assertIn(f"rules.{key}", script)
+        for kind in (schema.CHECKBOX, schema.RADIO, schema.INTEGER):
+            self.assertIn(f'"{kind}"', script)
+        self.assertIn("This answer has already been used.", script)
+        self.assertIn('"Please enter a number between "', script)
+
+
+class SurveyFormRulesTests(TestCase):
+    def form_data(self, **changes):
+        data = synthetic.form_data(synthetic.answers(random.Random(0)))
+        data.update(changes)
+        return data
+
+    def test_hidden_answer_is_not_saved(self):
+        form = forms.NationalParkSatisfactionBehaviorForm(
+            data=self.form_data(q8="Y", q10_1="Utah", q9="Canada")
+        )
+        self.assertTrue(form.is_valid(), form.errors)
+        self.assertIsNone(form.save().q9)
+
+    def test_repeated_rank_is_an_error(self):
+        form = forms.NationalParkSatisfactionBehaviorForm(
+            data=self.form_data(q28_1="1", q28_2="1")
+        )
+        self.assertFalse(form.is_valid())
+        self.assertIn("q28_2", form.errors)
+
+    def test_page_has_a_container_for_every_hidden_question(self):
+        content = self.client.get("/park/survey").content.decode()
+        for name in rules.DISPLAY_LOGIC:
+            self.assertIn(f'id="div_id_{name}"', content)
+
+
+def post_section(client, section, data, **extra):
+    fields = {
+        name: data[name] for name in forms.SECTION_FIELDS[section] if name in data
+    }
+    return client.post(f"/park/survey/step/{section}", {**fields, **extra})
+
+
+class PagedSurveyTests(TestCase):
+    def test_draft_is_kept_in_the_session_until_submitted(self):
+        data = synthetic.form_data(synthetic.answers(random.Random(0)))
+        first, *rest = forms.SECTIONS
+        response = post_section(self.client, first, data)
+        self.assertRedirects(
+            response, f"/park/survey/step/{rest[0]}", fetch_redirect_response=False
+        )
+        draft = self.client.session[views.DRAFT_SESSION_KEY]
+        self.assertTrue(draft)
+        self.assertLessEqual(set(draft), set(forms.SECTION_FIELDS[first]))
+        self.assertFalse(Response.objects.exists())
+
+        # Going back shows the answers from the draft
+        page = self.client.get(f"/park/survey/step/{first}")
+        self.assertEqual(
+            {name: page.context["form"].initial[name] for name in draft}, draft
+        )
+
+        for section in rest:
+            response = post_section(
+                self.client, section, data, submission_token="paged-1"
+            )
+            self.assertEqual(response.status_code, 302)
+        self.assertRedirects(response, "/", fetch_redirect_response=False)
+        self.assertNotIn(views.DRAFT_SESSION_KEY, self.client.session)
+
+        form = forms.NationalParkSatisfactionBehaviorForm(data=data)
+        self.assertTrue(form.is_valid(), form.errors)
+        expected = form.save(commit=False)
+        saved = Response.objects.get(submission_token="paged-1")
+        for name in data:
+            self.assertEqual(getattr(saved, name), getattr(expected, name), name)
+
+
+class CookieSessionTests(TestCase):
+    def test_paged_survey_does_not_touch_the_sessions_table(self):
+        data = synthetic.form_data(synthetic.answers(random.Random(0)))
+        with CaptureQueriesContext(connection) as queries:
+            for section in forms.SECTIONS:
+                response = post_section(self.client, section, data)
+                self.assertIn(settings.SESSION_COOKIE_NAME, response.cookies)
+            self.assertIn("messages", response.cookies)
+            page = self.client.get("/")
+        self.assertContains(page, "Survey submitted successfully.")
+        self.assertFalse(
+            [query["sql"] for query in queries if "django_session" in query["sql"]]
+        )
+        self.assertEqual(Response.objects.count(), 1)
+
+
+class SearchTests(TestCase):
+    def add(self, **answers):
+        response = Response(**synthetic.answers(random.Random(0)))
+        for name in search.SEARCH_FIELDS:
+            setattr(response, name, None)
+        for name, value in answers.items():
+            setattr(response, name, value)
+        response.save()
+        return response
+
+    def ids(self, term):
+        return [hit.id for hit in search.search(term)]
+
+    def test_triggers_keep_the_index_in_sync(self):
+        response = self.add(q9="Saskatchewan")
+        self.assertEqual(self.ids("saskatch*"), [response.pk])
+
+        response.q9 = "Manitoba"
+        response.save()
+        self.assertEqual(self.ids("saskatch*"), [])
+        self.assertEqual(self.ids("manitoba"), [response.pk])
+
+        response.delete()
+        self.assertEqual(self.ids("manitoba"), [])
+
+    def test_install_leaves_the_migrated_index_alone(self):
+        response = self.add(q20_10_text="Provo")
+        search.install()
+        self.assertEqual(self.ids("provo"), [response.pk])
+        self.assertEqual(search.count("provo", fields=["q20_10_text"]), 1)
+        self.assertEqual(search.count("provo", fields=["q9"]), 0)
+
+
+class ArchiveTests(TransactionTestCase):
+    # Attaching the archive and vacuuming it can't happen in a transaction
+    databases = {"default", archive.ALIAS}
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = Path(directory.name) / "archive.sqlite3"
+        settings_patcher = override_settings(SURVEY_ARCHIVE=self.path)
+        settings_patcher.enable()
+        self.addCleanup(settings_patcher.disable)
+
+        rng = random.Random(0)
+        for index in range(7):
+            answers = synthetic.answers(rng)
+            answers["q9"] = f"Oldplace{index}" if index < 5 else "Newplace"
+            Response(**answers).save()
+        last_season = timezone.now() - timedelta(days=365)
+        self.old = list(Response.objects.order_by("pk").values_list("pk", flat=True))
+        self.old = self.old[:5]
+        Response.objects.filter(pk__in=self.old).update(submitted_at=last_season)
+
+    def archive(self, *args):
+        before = (timezone.now() - timedelta(days=30)).date().isoformat()
+        call_command(
+            "archive_responses",
+            f"--before={before}",
+            "--batch-size=2",
+            *args,
+            stdout=io.StringIO(),
+        )
+
+    def archived_ids(self):
+        with sqlite3.connect(self.path) as db:
+            table = Response._meta.db_table
+            return sorted(id for id, in db.execute(f"SELECT id FROM {table}"))
+
+    def test_moves_the_old_season(self):
+        self.archive()
+        self.assertEqual(self.archived_ids(), self.old)
+        self.assertFalse(Response.objects.filter(pk__in=self.old).exists())
+        self.assertEqual(Response.objects.count(), 2)
+        # Archived responses are gone from the live search index too
+        self.assertEqual(search.count("oldplace*"), 0)
+        self.assertEqual(search.count("newplace"), 2)
+
+    def test_all_seasons_reads_both(self):
+        self.archive()
+        # The in-memory test connection outlives the tests, so it may have been
+        # opened before there was an archive, and must not keep it attached
+        with connections[archive.ALIAS].cursor() as cursor:
+            cursor.execute("PRAGMA database_list")
+            if archive.SCHEMA not in [row[1] for row in cursor.fetchall()]:
+                archive.attach(cursor)
+                archive.create_views(cursor)
+        self.addCleanup(self.detach_all_seasons)
+        self.assertEqual(Response.objects.using(archive.ALIAS).count(), 7)
+        self.assertEqual(Response.objects.count(), 2)
+
+    def detach_all_seasons(self):
+        with connections[archive.ALIAS].cursor() as cursor:
+            for model in archive.MODELS:
+                cursor.execute(f"DROP VIEW IF EXISTS temp.{model._meta.db_table}")
+            archive.detach(cursor)
+
+    def test_rerun_after_an_interruption(self):
+        from .management.commands import archive_responses
+
+        move = archive_responses.Command.move
+        calls = []
+
+        def interrupted(command, cursor, tables, ids):
+            calls.append(ids)
+            if len(calls) == 2:
+                raise KeyboardInterrupt
+            return move(command, cursor, tables, ids)
+
+        with (
+            mock.patch.object(archive_responses.Command, "move", interrupted),
+            self.assertRaises(KeyboardInterrupt),
+        ):
+            self.archive()
+        # The first batch was moved, the second left where it was
+        self.assertEqual(self.archived_ids(), self.old[:2])
+        self.assertEqual(Response.objects.count(), 5)
+
+        self.archive()
+        self.assertEqual(self.archived_ids(), self.old)
+        self.assertEqual(Response.objects.count(), 2)
+
+
+class SubmissionTokenTests(TestCase):
+    def form_data(self):
+        data = synthetic.form_data(synthetic.answers(random.Random(0)))
+        data["submission_token"] = "token-1"
+        return data
+
+    def test_posting_twice_saves_once(self):
+        for _ in range(2):
+            response = self.client.post("/park/survey", self.form_data())
+            self.assertRedirects(response, "/", fetch_redirect_response=False)
+        self.assertEqual(Response.objects.filter(submission_token="token-1").count(), 1)
+
+    def test_saved_by_another_request_in_between(self):
+        self.client.post("/park/survey", self.form_data())
+        # Both requests got past the lookup before either had saved
+        with mock.patch.object(
+            views.SubmissionTokenMixin, "is_duplicate", side_effect=[False, True]
+        ):
+            response = self.client.post("/park/survey", self.form_data())
+        self.assertRedirects(response, "/", fetch_redirect_response=False)
+        self.assertEqual(Response.objects.count(), 1)
+
+    def test_other_integrity_errors_are_raised(self):
+        with (
+            mock.patch.object(
+                views.SubmissionTokenMixin, "is_duplicate", return_value=False
+            ),
+            mock.patch.object(Response, "save", side_effect=IntegrityError),
+            self.assertRaises(IntegrityError),
+        ):
+            self.client.post("/park/survey", self.form_data())
+
+
+class ParallelExportTests(TransactionTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name)
+        rng = random.Random(0)
+        responses = [Response(**synthetic.answers(rng)) for _ in range(300)]
+        Response.objects.bulk_create(responses)
+        # Small parts, so the rows are split over several of them, and as if
+        # there were enough cores and rows for the workers
+        for patcher in (
+            mock.patch.object(export, "CHUNK_SIZE", 50),
+            mock.patch.object(export, "PARALLEL_MIN_ROWS", 100),
+            mock.patch("os.cpu_count", return_value=4),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def write(self, workers, compress="none"):
+        path = self.directory / f"{workers}.csv{export.EXTENSIONS[compress]}"
+        manifest = export.write_csv(path, compress=compress, workers=workers)
+        manifest.pop("file")
+        return path.read_bytes(), manifest
+
+    def test_same_bytes_and_manifest_as_one_worker(self):
+        for compress in ("none", "gzip"):
+            with self.subTest(compress=compress):
+                expected_content, expected_manifest = self.write(1, compress)
+                self.assertEqual(expected_manifest["rows"], 300)
+                content, manifest = self.write(3, compress)
+                # The manifest has the SHA-256, and a diff of the files is huge
+                self.assertEqual(manifest, expected_manifest)
+                self.assertTrue(content == expected_content)
+
+    def test_no_responses(self):
+        Response.objects.all().delete()
+        content, manifest = self.write(3)
+        self.assertEqual(manifest["rows"], 0)
+        self.assertEqual((content, manifest), self.write(1))
+
+    def test_one_process_for_a_small_table_or_one_core(self):
+        with mock.patch.object(export, "_write_parallel") as write_parallel:
+            with mock.patch.object(export, "PARALLEL_MIN_ROWS", 301):
+                self.write(3)
+            with mock.patch("os.cpu_count", return_value=1):
+                self.write(3)
+        write_parallel.assert_not_called()
+
+
+class MetricsTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name)
+        settings_patcher = override_settings(SURVEY_METRICS_DIR=directory.name)
+        settings_patcher.enable()
+        self.addCleanup(settings_patcher.disable)
+
+    def test_only_started_processes_write(self):
+        metrics.SUBMISSIONS.inc(view="test")
+        metrics.registry.write()
+        self.assertEqual(list(self.directory.iterdir()), [])
+        with mock.patch.object(metrics.registry, "writing", True):
+            metrics.registry.write()
+        self.assertEqual(
+            [path.name for path in self.directory.iterdir()], [f"{os.getpid()}.json"]
+        )
+
+    def test_collect_drops_the_files_of_exited_processes(self):
+        gone = self.directory / f"{2**31 - 1}.json"
+        gone.write_text("{}")
+        self.assertEqual(metrics.collect(), {})
+        self.assertFalse(gone.exists())
+
+    def write_worker(self, pid, submissions, rate, seconds):
+        data = {
+            "t_submissions_total": {
+                "kind": "counter",
+                "help": "Responses saved.",
+                "buckets": None,
+                "values": [[{"view": view}, n] for view, n in submissions.items()],
+            },
+            "t_rows_per_second": {
+                "kind": "gauge",
+                "help": "Rows per second.",
+                "buckets": None,
+                "values": [[{}, rate]],
+            },
+            "t_save_seconds": {
+                "kind": "histogram",
+                "help": "Time to save.",
+                "buckets": [0.1, 1],
+                "values": [[{}, seconds]],
+            },
+        }
+        (self.directory / f"{pid}.json").write_text(json.dumps(data))
+
+    def test_collect_adds_up_the_workers(self):
+        # Both processes are running, so neither file is removed
+        self.write_worker(os.getpid(), {"full": 2}, [10, 200.0], [[1, 2], 0.55, 2])
+        self.write_worker(
+            os.getppid(), {"full": 3, "step": 1}, [20, 100.0], [[0, 1], 0.5, 1]
+        )
+        self.assertEqual(
+            metrics.render(metrics.collect()),
+            "# HELP t_rows_per_second Rows per second.\n"
+            "# TYPE t_rows_per_second gauge\n"
+            "t_rows_per_second 10\n"
+            "# HELP t_save_seconds Time to save.\n"
+            "# TYPE t_save_seconds histogram\n"
+            't_save_seconds_bucket{le="0.1"} 1\n'
+            't_save_seconds_bucket{le="1"} 3\n'
+            't_save_seconds_bucket{le="+Inf"} 3\n'
+            "t_save_seconds_sum 1.05\n"
+            "t_save_seconds_count 3\n"
+            "# HELP t_submissions_total Responses saved.\n"
+            "# TYPE t_submissions_total counter\n"
+            't_submissions_total{view="full"} 5\n'
+            't_submissions_total{view="step"} 1\n',
+        )
+
+    def test_counts_locked_errors_not_slow_writes(self):
+        def locked(*args):
+            raise OperationalError("database is locked")
+
+        def slow(*args):
+            time.sleep(0.06)
+
+        before = metrics.SQLITE_LOCKED.values.get((), 0)
+        metrics.sqlite_wrapper(slow, "UPDATE t SET a = 1", (), False, {})
+        with self.assertRaises(OperationalError):
+            metrics.sqlite_wrapper(locked, "INSERT INTO t VALUES (1)", (), False, {})
+        self.assertEqual(metrics.SQLITE_LOCKED.values[()], before + 1)
+
+
+def slow_view(request):
+    time.sleep(0.05)
+    return HttpResponse("ok")
+
+
+class ProfilingMiddlewareTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name)
+        settings_patcher = override_settings(
+            SURVEY_PROFILE_DIR=directory.name,
+            SURVEY_PROFILE_RATE=1.0,
+            SURVEY_PROFILE_INTERVAL=0.001,
+        )
+        settings_patcher.enable()
+        self.addCleanup(settings_patcher.disable)
+        self.middleware = middleware.ProfilingMiddleware(slow_view)
+
+    def test_writes_the_sampled_stacks(self):
+        with mock.patch.object(middleware, "enabled", True):
+            response = self.middleware(RequestFactory().get("/park/survey"))
+        self.assertEqual(response.content, b"ok")
+
+        (path,) = self.directory.iterdir()
+        self.assertRegex(path.name, r"-get-park-survey-\d+ms\.folded$")
+        lines = path.read_text().splitlines()
+        self.assertTrue(lines)
+        for line in lines:
+            _, count = line.rsplit(" ", 1)
+            self.assertGreater(int(count), 0)
+        self.assertIn("survey/tests.py:slow_view", lines[0])
+
+    def test_off_or_other_pages_are_not_sampled(self):
+        self.middleware(RequestFactory().get("/park/survey"))
+        with mock.patch.object(middleware, "enabled", True):
+            self.middleware(RequestFactory().get("/metrics"))
+        self.assertEqual(list(self.directory.iterdir()), [])
+
+    def test_signal_switches_it_on_and_off(self):
+        with mock.patch.object(middleware, "enabled", False):
+            middleware.toggle()
+            self.assertTrue(middleware.enabled)
+            middleware.toggle()
+            self.assertFalse(middleware.enabled)
+
+
+class WarmUpTests(SimpleTestCase):
+    def test_fills_the_caches_the_first_request_needs(self):
+        for cached in (schema.field_specs, rules.compile_rules, forms.step_form_class):
+            cached.cache_clear()
+        self.addCleanup(gc.unfreeze)
+
+        # SimpleTestCase fails any query, the master must not open the database
+        self.assertGreater(warmup.warm_up(), 0)
+        self.assertEqual(schema.field_specs.cache_info().currsize, 1)
+        self.assertEqual(rules.compile_rules.cache_info().currsize, 1)
+        self.assertEqual(
+            forms.step_form_class.cache_info().currsize, len(forms.SECTIONS)
+        )
+        self.assertGreater(gc.get_freeze_count(), 0)
+
+
+class DraftTests(TestCase):
+    def test_changes_are_buffered_then_written(self):
+        other = drafts.DraftBuffer(60)
+        other.add("a", {"q1": "2"})
+        other.add("a", {"q4": ["A", "W"]})
+        self.assertFalse(models.SurveyDraft.objects.exists())
+        self.assertEqual(other.flush(), 1)
+        self.assertEqual(drafts.load("a"), {"q1": "2", "q4": ["A", "W"]})
+
+    def test_submitted_draft_stays_gone(self):
+        drafts.write_drafts({"a": {"q1": "2"}})
+        # Another worker still has changes for the draft when it's submitted
+        other = drafts.DraftBuffer(60)
+        other.add("a", {"q2": "1"})
+        drafts.delete("a")
+        other.flush()
+        self.assertIsNone(drafts.load("a"))
+        self.assertEqual(models.SurveyDraft.objects.get(token="a").data, {})
+
+    def test_delete_before_anything_was_written(self):
+        other = drafts.DraftBuffer(60)
+        other.add("b", {"q2": "1"})
+        drafts.delete("b")
+        other.flush()
+        self.assertIsNone(drafts.load("b"))
+
+    def test_idle_draft_is_not_given_back(self):
+        drafts.write_drafts({"a": {"q1": "2"}})
+        idle = timezone.now() - timedelta(seconds=settings.SURVEY_DRAFT_IDLE + 1)
+        models.SurveyDraft.objects.filter(token="a").update(updated=idle)
+        self.assertIsNone(drafts.load("a"))
+
+        response = self.client.get("/park/survey/autosave", {"token": "a"})
+        payload = response.json()
+        self.assertNotEqual(payload["token"], "a")
+        self.assertEqual(payload["data"], {})
+
+    def test_recent_draft_is_given_back(self):
+        drafts.write_drafts({"a": {"q1": "2"}})
+        response = self.client.get("/park/survey/autosave", {"token": "a"})
+        self.assertEqual(response.json(), {"token": "a", "data": {"q1": "2"}})
+
+    def test_new_token_has_no_answers(self):
+        response = self.client.get("/park/survey/autosave", {"token": "new"})
+        self.assertEqual(response.json(), {"token": "new", "data": {}})
+
+
+def maintain_db(*args):
+    output = io.StringIO()
+    call_command("maintain_db", "--session-batch=2", "--pause=0", *args, stdout=output)
+    return output.getvalue()
+
+
+class MaintainDbTests(TestCase):
+    def test_runs_every_step(self):
+        now = timezone.now()
+        Session.objects.bulk_create(
+            Session(
+                session_key=f"key{i}",
+                session_data="",
+                expire_date=now + timedelta(days=1 if i < 2 else -1),
+            )
+            for i in range(5)
+        )
+        output = maintain_db()
+        self.assertIn("purge expired sessions: deleted 3", output)
+        self.assertIn("purge abandoned drafts: deleted 0", output)
+        self.assertIn("analyze: updated statistics", output)
+        self.assertIn("auto_vacuum isn't incremental", output)
+        tables = len(connection.introspection.table_names())
+        self.assertIn(f"quick check: {tables} of {tables} tables ok", output)
+        self.assertEqual(
+            set(Session.objects.values_list("session_key", flat=True)),
+            {"key0", "key1"},
+        )
+
+    def test_steps_past_the_budget_are_skipped(self):
+        output = maintain_db("--budget=-1")
+        for step in ("purge expired sessions", "analyze", "quick check"):
+            self.assertIn(f"{step}: skipped, out of time", output)
+
+    def test_purges_abandoned_drafts(self):
+        models.SurveyDraft.objects.bulk_create(
+            models.SurveyDraft(token=str(i), data={"q1": "1"}) for i in range(7)
+        )
+        old = timezone.now() - timedelta(seconds=settings.SESSION_COOKIE_AGE + 60)
+        models.SurveyDraft.objects.filter(token__in=["0", "1", "2", "3", "4"]).update(
+            updated=old
+        )
+        self.assertIn("purge abandoned drafts: deleted 5", maintain_db())
+        self.assertEqual(
+            set(models.SurveyDraft.objects.values_list("token", flat=True)), {"5", "6"}
+        )
+
+
+class IncrementalVacuumTests(TransactionTestCase):
+    def tearDown(self):
+        with connection.cursor() as cursor:
+            cursor.execute("PRAGMA auto_vacuum = NONE")
+            cursor.execute("VACUUM")
+
+    def test_frees_pages_a_step_at_a_time(self):
+        output = maintain_db("--enable-incremental-vacuum")
+        self.assertIn("enable incremental vacuum: auto_vacuum is 2", output)
+
+        models.SurveyDraft.objects.bulk_create(
+            models.SurveyDraft(token=str(i), data={"q1": "x" * 500}) for i in range(500)
+        )
+        models.SurveyDraft.objects.all().delete()
+        output = maintain_db("--step-pages=10")
+        self.assertRegex(output, r"incremental vacuum: freed [1-9]\d* pages, 0 left")
+
+
+@override_settings(SURVEY_EXPORT_TOKEN="secret")
+class BrowseTests(TestCase):
+    def setUp(self):
+        rng = random.Random(0)
+        for _ in range(8):
+            Response(**synthetic.answers(rng)).save()
+        # A gap in the ids shouldn't lose or repeat a row
+        Response.objects.order_by("pk")[3].delete()
+        self.ids = list(Response.objects.order_by("-pk").values_list("pk", flat=True))
+
+    def ids_on(self, rows):
+        return [pk for pk, _ in rows]
+
+    def test_pages_older_and_back(self):
+        pages = []
+        rows, newer, older = browse.page(size=3)
+        self.assertIsNone(newer)
+        while True:
+            pages.append(self.ids_on(rows))
+            if older is None:
+                break
+            rows, newer, older = browse.page(before=older, size=3)
+            self.assertEqual(newer, self.ids_on(rows)[0])
+        self.assertEqual(pages, [self.ids[0:3], self.ids[3:6], self.ids[6:]])
+
+        # Back towards the newest from the last page
+        rows, newer, older = browse.page(after=newer, size=3)
+        self.assertEqual(self.ids_on(rows), self.ids[3:6])
+        rows, newer, older = browse.page(after=newer, size=3)
+        self.assertEqual(self.ids_on(rows), self.ids[0:3])
+        self.assertIsNone(newer)
+        self.assertEqual(older, self.ids[2])
+
+    def test_past_either_end(self):
+        self.assertEqual(browse.page(before=self.ids[-1], size=3), ([], None, None))
+        self.assertEqual(browse.page(after=self.ids[0], size=3), ([], None, None))
+
+    def test_views(self):
+        headers = {"Authorization": "Bearer secret"}
+        self.assertEqual(self.client.get("/responses").status_code, 401)
+        response = self.client.get("/responses?size=3", headers=headers)
+        self.assertEqual(response.context["rows"], browse.page(size=3)[0])
+        self.assertContains(response, f"before={self.ids[2]}")
+        self.assertEqual(
+            self.client.get("/responses?before=x", headers=headers).status_code, 400
+        )
+
+        pk = self.ids[0]
+        response = self.client.get(f"/responses/{pk}", headers=headers)
+        self.assertEqual(response.context["answers"], browse.answers(pk))
+        missing = max(self.ids) + 1
+        self.assertEqual(
+            self.client.get(f"/responses/{missing}", headers=headers).status_code, 404
+        )
@@ -1,6 +1,6 @@
 from django.urls import path
 
-from . import views
+from . import forms, views
 
 app_name = "survey"
 
@@ -14,4 +14,24 @@ urlpatterns = [
         view=views.NationalParkSatisfactionBehaviorView.as_view(),
         name="national_park",
     ),
+    path(
+        "park/survey/autosave",
+        view=views.SurveyAutosaveView.as_view(),
+        name="autosave",
+    ),
+    path(
+        "park/survey/step/",
+        view=views.NationalParkSurveyStepView.as_view(),
+        kwargs={"section": forms.SECTIONS[0]},
+        name="national_park_paged",
+    ),
+    path(
+        "park/survey/step/<slug:section>",
+        view=views.NationalParkSurveyStepView.as_view(),
+        name="national_park_step",
+    ),
+    path("metrics", view=views.metrics_view, name="metrics"),
+    path("export", view=views.export_view, name="export"),
+    path("responses", view=views.responses_view, name="responses"),
+    path("responses/<int:pk>", view=views.response_view, name="response"),
 ]
@@ -1,17 +1,357 @@
+import json
+import os
+import re
+
+from django.conf import settings
 from django.contrib import messages
-from django.shortcuts import render
-from django.views.generic import CreateView
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Max
+from django.http import (
+    Http404,
+    HttpResponse,
+    HttpResponseBadRequest,
+    HttpResponseRedirect,
+    JsonResponse,
+    StreamingHttpResponse,
+)
+from django.shortcuts import redirect, render
+from django.views.decorators.http import require_safe
+from django.views.generic import CreateView, FormView, View
+
+from . import browse, drafts, export, forms, metrics, models
+from .auth import token_required
+
+DRAFT_SESSION_KEY = "survey_draft"
+RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def delete_draft(request):
+    token = request.POST.get("draft_token")
+    if token:
+        drafts.delete(token)
+
+
+class SurveyMetricsMixin:
+    """
+    Times building the form and rendering the page for /metrics.
+    """
+
+    metrics_view = None
+
+    def get_form(self, form_class=None):
+        with metrics.FORM_BUILD.time(view=self.metrics_view):
+            return super().get_form(form_class)
+
+    def render_to_response(self, context, **response_kwargs):
+        response = super().render_to_response(context, **response_kwargs)
+        # Render here, otherwise it happens after the view returns
+        with metrics.TEMPLATE_RENDER.time(view=self.metrics_view):
+            response.render()
+        return response
+
+
+class SubmissionTokenMixin:
+    """
+    Answers a survey posted again, from a double tap on Submit or a retried
+    POST, like the first time without saving it twice. The form's
+    submission_token is unique in the table.
+    """
+
+    def post(self, request, *args, **kwargs):
+        # Checked before building the form, a duplicate costs one indexed lookup
+        if self.is_duplicate(request.POST.get("submission_token")):
+            return self.duplicate_submission()
+        return super().post(request, *args, **kwargs)
 
-from . import forms, models
+    def is_duplicate(self, token):
+        return bool(token) and (
+            models.NationalParkSatisfactionBehavior.objects.filter(
+                submission_token=token
+            ).exists()
+        )
 
+    def duplicate_submission(self):
+        metrics.DUPLICATE_SUBMISSIONS.inc(view=self.metrics_view)
+        self.request.session.pop(DRAFT_SESSION_KEY, None)
+        delete_draft(self.request)
+        messages.success(self.request, "Survey submitted successfully.")
+        return HttpResponseRedirect(self.success_url)
+
+    def save_response(self, response):
+        """
+        Returns False when another request saved the same submission first.
+        """
+        try:
+            with metrics.FORM_SAVE.time(view=self.metrics_view):
+                with transaction.atomic():
+                    response.save()
+        except IntegrityError:
+            if not self.is_duplicate(response.submission_token):
+                raise
+            return False
+        metrics.SUBMISSIONS.inc(view=self.metrics_view)
+        return True
 
-class NationalParkSatisfactionBehaviorView(CreateView):
+
+class NationalParkSatisfactionBehaviorView(
+    SubmissionTokenMixin, SurveyMetricsMixin, CreateView
+):
     template_name = "survey/national_park.html"
     model = models.NationalParkSatisfactionBehavior
     form_class = forms.NationalParkSatisfactionBehaviorForm
     success_url = "/"
+    metrics_view = "full"
+
+    def form_valid(self, form):
+        self.object = form.save(commit=False)
+        if not self.save_response(self.object):
+            return self.duplicate_submission()
+        delete_draft(self.request)
+        messages.success(self.request, "Survey submitted successfully.")
+        return HttpResponseRedirect(self.get_success_url())
+
+
+class NationalParkSurveyStepView(SubmissionTokenMixin, SurveyMetricsMixin, FormView):
+    """
+    The paged version of the survey, one section per request.
+    Answers are kept in the session until the last section is submitted.
+    """
+
+    template_name = "survey/national_park.html"
+    success_url = "/"
+    metrics_view = "step"
+
+    def dispatch(self, request, *args, **kwargs):
+        self.section = kwargs["section"]
+        if self.section not in forms.SECTIONS:
+            raise Http404("Unknown survey section.")
+        self.index = forms.SECTIONS.index(self.section)
+        return super().dispatch(request, *args, **kwargs)
+
+    def get_form_class(self):
+        return forms.step_form_class(self.section)
+
+    def get_draft(self):
+        return self.request.session.get(DRAFT_SESSION_KEY, {})
+
+    def get_initial(self):
+        draft = self.get_draft()
+        return {
+            name: draft[name]
+            for name in forms.SECTION_FIELDS[self.section]
+            if name in draft
+        }
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context["step"] = self.index + 1
+        context["step_count"] = len(forms.SECTIONS)
+        context["is_last_step"] = self.index == len(forms.SECTIONS) - 1
+        if self.index:
+            context["previous_section"] = forms.SECTIONS[self.index - 1]
+        return context
 
     def form_valid(self, form):
-        form.save()
+        # Only keep the answers that were given, the draft lives in the session
+        draft = {
+            name: value
+            for name, value in self.get_draft().items()
+            if name not in form.fields
+        }
+        draft.update(
+            {
+                name: value
+                for name, value in form.cleaned_data.items()
+                if value not in (None, "", []) and name != "submission_token"
+            }
+        )
+
+        if self.index < len(forms.SECTIONS) - 1:
+            self.request.session[DRAFT_SESSION_KEY] = draft
+            return redirect(
+                "survey:national_park_step", section=forms.SECTIONS[self.index + 1]
+            )
+
+        response = models.NationalParkSatisfactionBehavior(
+            **draft, submission_token=form.cleaned_data["submission_token"] or None
+        )
+        if not self.save_response(response):
+            return self.duplicate_submission()
+        self.request.session.pop(DRAFT_SESSION_KEY, None)
+        delete_draft(self.request)
         messages.success(self.request, "Survey submitted successfully.")
         return super().form_valid(form)
+
+
+class SurveyAutosaveView(View):
+    """
+    Saves the answers that changed since the last autosave.
+    POST {"token": "...", "changes": {"q1": "2", "q4": ["A", "W"]}}
+    GET ?token=... returns the saved answers, or a new token and no answers
+    when that draft can't be continued.
+    """
+
+    def get_token(self, token):
+        if not isinstance(token, str) or not 0 < len(token) <= drafts.MAX_TOKEN_LENGTH:
+            return None
+        return token
+
+    def get(self, request, *args, **kwargs):
+        token = self.get_token(request.GET.get("token"))
+        if token is None:
+            return HttpResponseBadRequest("Missing or invalid token.")
+        data = drafts.load(token)
+        if data is None:
+            token, data = drafts.new_token(), {}
+        return JsonResponse({"token": token, "data": data})
+
+    def post(self, request, *args, **kwargs):
+        try:
+            payload = json.loads(request.body)
+        except ValueError:
+            return HttpResponseBadRequest("Invalid JSON.")
+        if not isinstance(payload, dict) or not isinstance(payload.get("changes"), dict):
+            return HttpResponseBadRequest("Missing changes.")
+        token = self.get_token(payload.get("token"))
+        if token is None:
+            return HttpResponseBadRequest("Missing or invalid token.")
+
+        changes = drafts.clean_changes(payload["changes"])
+        if changes:
+            drafts.save_changes(token, changes)
+        return HttpResponse(status=204)
+
+
+def metrics_view(request):
+    """
+    The metrics of every worker in the Prometheus text format.
+    Only reachable from the Pi itself, see deploy/survey.
+    """
+    return HttpResponse(
+        metrics.render(metrics.collect()),
+        content_type="text/plain; version=0.0.4; charset=utf-8",
+    )
+
+
+def parse_range(header, size):
+    """
+    Returns (start, end) for a single byte range, None to send everything and
+    False when it can't be satisfied.
+    """
+    match = RANGE.match(header.replace(" ", ""))
+    if match is None or match.groups() == ("", ""):
+        return None
+    first, last = match.groups()
+    if not first:
+        start, end = max(0, size - int(last)), size - 1
+    else:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        return False
+    return start, end
+
+
+@require_safe
+@token_required
+def export_view(request):
+    """
+    Sends the same CSV as export_survey, written to a file the first time
+    it's asked for and read from there by every download after it.
+    ?gzip=1 sends it gzipped, and a Range header resumes a cut off download.
+    Responses added while it downloads are left for the next one.
+    With SURVEY_EXPORT_ACCEL nginx sends the file, ranges and all, so a slow
+    download doesn't keep a worker busy.
+    """
+    compress = request.GET.get("gzip", "") not in ("", "0")
+    latest = models.NationalParkSatisfactionBehavior.objects.aggregate(
+        max_id=Max("pk"), count=Count("pk")
+    )
+    until, count = latest["max_id"] or 0, latest["count"]
+    etag = f'"{until}-{count}-{"gz" if compress else "csv"}"'
+    path = export.export_file(until, count, compress)
+    content_type = "application/gzip" if compress else "text/csv; charset=utf-8"
+    filename = "export.csv.gz" if compress else "export.csv"
+    if settings.SURVEY_EXPORT_ACCEL:
+        response = HttpResponse(content_type=content_type)
+        response["Content-Disposition"] = f'attachment; filename="{filename}"'
+        name = os.path.basename(path)
+        response["X-Accel-Redirect"] = settings.SURVEY_EXPORT_ACCEL + name
+        return response
+
+    size = os.path.getsize(path)
+
+    status = 200
+    start, end = 0, size - 1
+    if "Range" in request.headers and request.headers.get("If-Range", etag) == etag:
+        match parse_range(request.headers["Range"], size):
+            case False:
+                response = HttpResponse(status=416)
+                response["Content-Range"] = f"bytes */{size}"
+                return response
+            case (start, end):
+                status = 206
+
+    response = StreamingHttpResponse(
+        export.read_range(open(path, mode="rb"), start, end),
+        status=status,
+        content_type=content_type,
+    )
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    response["ETag"] = etag
+    response["Accept-Ranges"] = "bytes"
+    if status == 206:
+        response["Content-Range"] = f"bytes {start}-{end}/{size}"
+    response["Content-Length"] = end - start + 1
+    # Don't let nginx hold the whole export before sending it on
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
+def page_param(request, name, default=None):
+    value = request.GET.get(name, "")
+    if not value:
+        return default
+    if not value.isdigit():
+        raise ValueError(name)
+    return int(value)
+
+
+@require_safe
+@token_required
+def responses_view(request):
+    """
+    Browses the responses newest first. ?before=<id> goes to older ones and
+    ?after=<id> back to newer ones, ?size sets how many are on a page.
+    """
+    try:
+        before = page_param(request, "before")
+        after = page_param(request, "after")
+        size = page_param(request, "size", browse.PAGE_SIZE)
+    except ValueError as e:
+        return HttpResponseBadRequest(f"{e} must be a whole number.")
+    size = min(max(size, 1), browse.MAX_PAGE_SIZE)
+    rows, newer, older = browse.page(before=before, after=after, size=size)
+    return render(
+        request,
+        "survey/responses.html",
+        {
+            "columns": [title for _, title in browse.COLUMNS],
+            "rows": rows,
+            "newer": newer,
+            "older": older,
+            "size": size if size != browse.PAGE_SIZE else None,
+        },
+    )
+
+
+@require_safe
+@token_required
+def response_view(request, pk):
+    """
+    Every answer of one response.
+    """
+    answers = browse.answers(pk)
+    if answers is None:
+        raise Http404
+    return render(request, "survey/response.html", {"pk": pk, "answers": answers})
@@ -0,0 +1,62 @@
+"""
+Does the one time work of the first survey request ahead of time.
+
+Called from the gunicorn master with preload_app (see deploy/gunicorn.conf.py)
+so the forked workers share the compiled templates, form classes and lookup
+tables copy-on-write and serve the first tablets as fast as the rest.
+"""
+
+import gc
+import logging
+import time
+
+from django.db import connections
+from django.http import HttpRequest
+from django.template.loader import render_to_string
+from django.urls import get_resolver
+
+from . import canonical, forms, geocode, rules, schema
+
+logger = logging.getLogger(__name__)
+
+TEMPLATE = "survey/national_park.html"
+
+
+def warm_up():
+    """
+    Returns the seconds it took.
+    """
+    started = time.perf_counter()
+    get_resolver().url_patterns
+    request = HttpRequest()
+    request.method = "GET"
+
+    schema.field_specs()
+    rules.compile_rules()
+    rules.check({})
+    render_to_string(
+        TEMPLATE, {"form": forms.NationalParkSatisfactionBehaviorForm()}, request
+    )
+    for index, section in enumerate(forms.SECTIONS):
+        render_to_string(
+            TEMPLATE,
+            {
+                "form": forms.step_form_class(section)(),
+                "step": index + 1,
+                "step_count": len(forms.SECTIONS),
+                "is_last_step": index == len(forms.SECTIONS) - 1,
+            },
+            request,
+        )
+    canonical.country_code("United States")
+    canonical.state_code("Utah")
+    geocode.get_index()
+
+    # Nothing from here should be shared with the workers
+    connections.close_all()
+    # Keep the garbage collector from touching, and so copying, the shared pages
+    gc.collect()
+    gc.freeze()
+    elapsed = time.perf_counter() - started
+    logger.info("Warmed up in %.2fs", elapsed)
+    return elapsed